@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Measure pairwise agreement between diarization systems and write to a
+dataframe.
+
+When combining diarization systems, it is useful to know how much they agree
+with each other, independently of any reference. To compare the output of
+three systems, each stored in a single RTTM file, and write the results to
+``agreement.tsv``:
+
+    python agreement.py agreement.tsv sys1.rttm sys2.rttm sys3.rttm
+
+Each system may also be given as a directory, in which case all ``.rttm``
+files it contains are pooled. Systems are named by the basename of their file
+(minus the ``.rttm`` extension) or directory. The output dataframe contains
+one row per pair of systems, with the following columns:
+
+- System1  --  name of the first system
+- System2  --  name of the second system
+- Disagreement  --  speaker-mapped disagreement rate
+- B3Precision  --  B-cubed precision
+- B3Recall  --  B-cubed recall
+- B3F1  --  B-cubed F1
+- GKT12  --  Goodman-Kruskal tau in the direction of the first system to the
+  second
+- GKT21  --  Goodman-Kruskal tau in the direction of the second system to the
+  first
+- H12  --  conditional entropy of the first system given the second (bits)
+- MI  --  mutual information (bits)
+- NMI  --  normalized mutual information (bits)
+
+The disagreement rate is DER computed with one system in place of the
+reference, without collars and including overlapped speech, and is expressed
+as a percent of the mean speaker time of the two systems so that it does not
+depend on their order. The remaining metrics are the clustering metrics of
+``score.py`` with the first system in place of the reference.
+
+Each system is framed only once, and pairs are scored in parallel using the
+number of processes given by the ``-j`` flag. By default, each recording is
+scored from time 0 to the end of the last turn of any system; alternately,
+scoring regions may be given by a UEM file via the ``-u`` flag. The format of
+the output dataframe is determined as in ``score_batch.py``.
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import glob
+import os
+import sys
+
+from scorelib import __version__ as VERSION
+from scorelib.dataframe import check_format, FORMATS
+from scorelib.logging import getLogger
+
+logger = getLogger()
+
+COL_NAMES = ['System1', 'System2', 'Disagreement', 'B3Precision', 'B3Recall',
+             'B3F1', 'GKT12', 'GKT21', 'H12', 'MI', 'NMI']
+
+
+def system_name(path):
+    """Return name of system stored in RTTM file or directory ``path``."""
+    name = os.path.basename(os.path.normpath(path))
+    if name.endswith('.rttm'):
+        name = name[:-len('.rttm')]
+    return name
+
+
+def load_system(path):
+    """Return mapping from recording ids to turns of system stored in RTTM
+    file or directory ``path``.
+    """
+    from scorelib.score import rttm_to_turns
+    if not os.path.isdir(path):
+        return rttm_to_turns(path)
+    rec_id_to_turns = {}
+    for fn in sorted(glob.glob(os.path.join(path, '*.rttm'))):
+        for rec_id, turns in rttm_to_turns(fn).items():
+            rec_id_to_turns.setdefault(rec_id, []).extend(turns)
+    return rec_id_to_turns
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(
+        description='Measure pairwise agreement between systems.',
+        add_help=True,
+        usage='%(prog)s [options] outf sys_rttm sys_rttm [sys_rttm ...]')
+    parser.add_argument(
+        'outf', nargs=None, help='output dataframe')
+    parser.add_argument(
+        'sys_rttms', nargs='+', metavar='sys_rttm',
+        help='system RTTM file or directory')
+    parser.add_argument(
+        '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
+        help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    parser.add_argument(
+        '-j', nargs=None, default=1, type=int, metavar='INT', dest='n_jobs',
+        help='number of parallel jobs (Default: %(default)s)')
+    parser.add_argument(
+        '--format', nargs=None, default=None, choices=FORMATS, dest='fmt',
+        help='output format (Default: determined from extension of outf, '
+             'else tsv)')
+    parser.add_argument(
+        '--version', action='version',
+        version='%(prog)s ' + VERSION)
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    if len(args.sys_rttms) < 2:
+        parser.error('at least two systems are required')
+    names = [system_name(path) for path in args.sys_rttms]
+    if len(set(names)) != len(names):
+        parser.error('system names must be unique: %s' % ', '.join(names))
+    try:
+        check_format(args.outf, args.fmt)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+    from scorelib.agreement import pairwise_agreement
+    from scorelib.dataframe import write_dataframe
+    from scorelib.score import load_uem
+    rec_id_to_uem = None if args.uemf is None else load_uem(args.uemf)
+    systems = [load_system(path) for path in args.sys_rttms]
+    results = pairwise_agreement(
+        systems, args.step, rec_id_to_uem, n_jobs=args.n_jobs)
+    rows = [[names[ii], names[jj]] + list(metrics)
+            for ii, jj, metrics in results]
+    write_dataframe(args.outf, COL_NAMES, rows, args.fmt)
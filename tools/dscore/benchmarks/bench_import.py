@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Benchmark interpreter startup and import times of the scoring tools.
+
+Each measurement is made in a fresh interpreter and repeated ``-n`` times,
+with the minimum and median over repeats reported in seconds:
+
+    python benchmarks/bench_import.py
+
+Measured are the wall-clock times of ``--version`` invocations of the command
+line tools (which should not import NumPy) and the times taken to import
+each ``scorelib`` module as well as the heavy third-party dependencies. If
+the ``--output`` flag is given, results are additionally written to a JSON
+file.
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
+DSCORE_DIR = os.path.dirname(SCRIPT_DIR)
+
+MODULES = ['numpy', 'scipy.sparse', 'scipy.optimize', 'tabulate',
+           'scorelib', 'scorelib.logging', 'scorelib.metrics',
+           'scorelib.score', 'scorelib.dataframe']
+SCRIPTS = ['score.py', 'confusion_matrix.py', 'score_batch.py']
+
+IMPORT_TEMPLATE = '''
+import time
+t0 = time.time()
+import %s
+print(time.time() - t0)
+'''
+
+
+def time_import(module, n_repeats=5):
+    """Return times in seconds to import ``module`` in fresh interpreters."""
+    times = []
+    for _ in range(n_repeats):
+        out = subprocess.check_output(
+            [sys.executable, '-c', IMPORT_TEMPLATE % module], cwd=DSCORE_DIR)
+        times.append(float(out.decode('utf-8').strip()))
+    return times
+
+
+def time_script(script, n_repeats=5):
+    """Return wall-clock times in seconds of ``script --version``."""
+    times = []
+    with open(os.devnull, 'wb') as f:
+        for _ in range(n_repeats):
+            t0 = time.time()
+            subprocess.check_call(
+                [sys.executable, script, '--version'], cwd=DSCORE_DIR,
+                stdout=f, stderr=f)
+            times.append(time.time() - t0)
+    return times
+
+
+def summarize(times):
+    times = sorted(times)
+    return {'min': times[0], 'median': times[len(times) // 2],
+            'times': times}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark import times.', add_help=True)
+    parser.add_argument(
+        '-n', nargs=None, default=5, type=int, metavar='N', dest='n_repeats',
+        help='number of repeats (Default: %(default)s)')
+    parser.add_argument(
+        '--output', nargs=None, default=None, metavar='FILE',
+        help='write results to JSON file (Default: None)')
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0],
+               'imports': {},
+               'scripts': {}}
+    print('%-30s %10s %10s' % ('TARGET', 'MIN (s)', 'MEDIAN (s)'))
+    for script in SCRIPTS:
+        res = summarize(time_script(script, args.n_repeats))
+        results['scripts'][script] = res
+        print('%-30s %10.4f %10.4f' % (script + ' --version', res['min'],
+                                       res['median']))
+    for module in MODULES:
+        try:
+            res = summarize(time_import(module, args.n_repeats))
+        except subprocess.CalledProcessError:
+            print('%-30s %10s %10s' % ('import ' + module, 'N/A', 'N/A'))
+            continue
+        results['imports'][module] = res
+        print('%-30s %10.4f %10.4f' % ('import ' + module, res['min'],
+                                       res['median']))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
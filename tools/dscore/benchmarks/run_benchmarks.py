@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+"""Run scoring benchmarks on synthetic diarization corpora.
+
+To run all benchmarks on all synthetic corpora and save the results to
+``results.json``:
+
+    python benchmarks/run_benchmarks.py --output results.json
+
+Corpora are generated by ``benchmarks/synth.py`` into a temporary directory
+(or, if specified, the directory given by the ``--data_dir`` flag, in which
+case they are reused by subsequent runs). For each corpus, the following are
+timed:
+
+- rttm_to_turns  --  parsing reference and system RTTMs
+- turns_to_frames  --  framing reference and system turns
+- contingency_matrix  --  computing contingency matrices from frame labels
+- bcubed, goodman_kruskal_tau, conditional_entropy, mutual_information  --
+  computing each metric from contingency matrices
+- der  --  computing DER with ``md-eval.pl``
+- frame_der  --  computing DER in-process
+- score_turns  --  computing all metrics in-process
+- score_prepared  --  as score_turns, but against references prepared in
+  advance with ``PreparedReference``, as when sweeping over many systems
+- score_batch  --  end-to-end run of ``score_batch.py``
+
+Each benchmark is repeated ``-n`` times and the minimum and median wall-clock
+times in seconds are recorded along with, where it can be measured, the peak
+memory in MB allocated over the course of a run as reported by
+``tracemalloc``. Subsets of corpora and benchmarks may be selected via the
+``--corpora`` and ``--benchmarks`` flags, and results from a previous run
+(e.g., for a different commit) may be compared against via the ``--compare``
+flag:
+
+    python benchmarks/run_benchmarks.py --output new.json --compare old.json
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
+DSCORE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, DSCORE_DIR)
+sys.path.insert(0, SCRIPT_DIR)
+
+import numpy as np
+
+from scorelib import metrics
+from scorelib.score import (frame_der, rttm_to_turns, score_turns,
+                            turns_to_frames, PreparedReference)
+import synth
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class Corpus(object):
+    """Synthetic corpus and intermediate representations needed by the
+    benchmarks, computed lazily.
+
+    Parameters
+    ----------
+    name : str
+        Corpus type. One of the keys of ``synth.CORPORA``.
+
+    data_dir : str
+        Directory containing ``ref`` and ``sys`` subdirectories of RTTMs.
+    """
+    def __init__(self, name, data_dir):
+        self.name = name
+        self.data_dir = data_dir
+        self.ref_dir = os.path.join(data_dir, 'ref')
+        self.sys_dir = os.path.join(data_dir, 'sys')
+        self.rec_ids = sorted(
+            os.path.basename(fn)[:-5]
+            for fn in glob.glob(os.path.join(self.ref_dir, '*.rttm')))
+        self._turns = None
+        self._labels = None
+        self._cms = None
+        self._references = None
+
+    def rttm_pairs(self):
+        return [(os.path.join(self.ref_dir, rec_id + '.rttm'),
+                 os.path.join(self.sys_dir, rec_id + '.rttm'))
+                for rec_id in self.rec_ids]
+
+    @property
+    def turns(self):
+        if self._turns is None:
+            self._turns = load_turns(self)
+        return self._turns
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = frame_turns(self)
+        return self._labels
+
+    @property
+    def cms(self):
+        if self._cms is None:
+            self._cms = compute_cms(self)
+        return self._cms
+
+    @property
+    def references(self):
+        if self._references is None:
+            self._references = [
+                PreparedReference(ref_rec_id_to_turns)
+                for ref_rec_id_to_turns, _ in self.turns]
+        return self._references
+
+
+def load_turns(corpus):
+    turns = []
+    for ref_rttm_fn, sys_rttm_fn in corpus.rttm_pairs():
+        turns.append((rttm_to_turns(ref_rttm_fn), rttm_to_turns(sys_rttm_fn)))
+    return turns
+
+
+def frame_turns(corpus, step=0.010):
+    labels = []
+    for ref_rec_id_to_turns, sys_rec_id_to_turns in corpus.turns:
+        for rec_id, ref_turns in ref_rec_id_to_turns.items():
+            sys_turns = sys_rec_id_to_turns[rec_id]
+            dur = min(max(turn.offset for turn in ref_turns),
+                      max(turn.offset for turn in sys_turns))
+            labels.append((turns_to_frames(ref_turns, dur, step),
+                           turns_to_frames(sys_turns, dur, step)))
+    return labels
+
+
+def compute_cms(corpus):
+    return [metrics.contingency_matrix(ref_labels, sys_labels)[0]
+            for ref_labels, sys_labels in corpus.labels]
+
+
+def metric_benchmark(func):
+    def bench(corpus):
+        for cm in corpus.cms:
+            func(None, None, cm)
+    return bench
+
+
+def bench_der(corpus):
+    for ref_rttm_fn, sys_rttm_fn in corpus.rttm_pairs():
+        metrics.der(ref_rttm_fn, sys_rttm_fn)
+
+
+def bench_frame_der(corpus):
+    for ref_rec_id_to_turns, sys_rec_id_to_turns in corpus.turns:
+        frame_der(ref_rec_id_to_turns, sys_rec_id_to_turns)
+
+
+def bench_score_turns(corpus):
+    for ref_rec_id_to_turns, sys_rec_id_to_turns in corpus.turns:
+        score_turns(ref_rec_id_to_turns, sys_rec_id_to_turns)
+
+
+def bench_score_prepared(corpus):
+    for reference, (_, sys_rec_id_to_turns) in zip(
+            corpus.references, corpus.turns):
+        reference.score(sys_rec_id_to_turns)
+
+
+def bench_score_batch(corpus, n_jobs=1):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.devnull, 'wb') as f:
+            subprocess.check_call(
+                [sys.executable, os.path.join(DSCORE_DIR, 'score_batch.py'),
+                 '-j', str(n_jobs), os.path.join(tmp_dir, 'scores.tsv'),
+                 corpus.ref_dir, corpus.sys_dir], stdout=f, stderr=f)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+# Benchmarks as (name, function, whether peak memory is measurable,
+# attributes of Corpus to compute before timing) tuples. Memory is not
+# measurable for benchmarks that run in subprocesses.
+BENCHMARKS = [
+    ('rttm_to_turns', load_turns, True, ()),
+    ('turns_to_frames', frame_turns, True, ('turns', )),
+    ('contingency_matrix', compute_cms, True, ('labels', )),
+    ('bcubed', metric_benchmark(metrics.bcubed), True, ('cms', )),
+    ('goodman_kruskal_tau', metric_benchmark(metrics.goodman_kruskal_tau),
+     True, ('cms', )),
+    ('conditional_entropy', metric_benchmark(metrics.conditional_entropy),
+     True, ('cms', )),
+    ('mutual_information', metric_benchmark(metrics.mutual_information),
+     True, ('cms', )),
+    ('der', bench_der, False, ()),
+    ('frame_der', bench_frame_der, True, ('turns', )),
+    ('score_turns', bench_score_turns, True, ('turns', )),
+    ('score_prepared', bench_score_prepared, True, ('references', )),
+    ('score_batch', bench_score_batch, False, ()),
+    ]
+
+
+def run_benchmark(func, corpus, n_repeats=3, measure_mem=True):
+    """Run benchmark.
+
+    Parameters
+    ----------
+    func : callable
+        Benchmark function. Called with ``corpus`` as its only argument.
+
+    corpus : Corpus
+        Corpus.
+
+    n_repeats : int, optional
+        Number of timed repeats.
+        (Default: 3)
+
+    measure_mem : bool, optional
+        If True and ``tracemalloc`` is available, record peak memory
+        allocated during an additional untimed run.
+        (Default: True)
+
+    Returns
+    -------
+    result : dict
+        Timing and memory results.
+    """
+    peak_mem = None
+    if measure_mem and tracemalloc is not None:
+        tracemalloc.start()
+        func(corpus)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mem = peak / 2.**20
+    times = []
+    for _ in range(n_repeats):
+        t0 = timer()
+        func(corpus)
+        times.append(timer() - t0)
+    times = sorted(times)
+    return {'min': times[0],
+            'median': times[len(times) // 2],
+            'times': times,
+            'peak_mem_mb': peak_mem}
+
+
+def get_metadata():
+    """Return description of the environment in which benchmarks were run."""
+    try:
+        with open(os.devnull, 'wb') as f:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=DSCORE_DIR, stderr=f)
+        commit = commit.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def compare(results, baseline):
+    """Print ratios of median times in ``results`` to those in ``baseline``."""
+    print('')
+    print('%-12s %-22s %10s %10s %8s' % (
+        'CORPUS', 'BENCHMARK', 'OLD (s)', 'NEW (s)', 'RATIO'))
+    for corpus_name, corpus_results in sorted(results.items()):
+        base_results = baseline.get(corpus_name, {})
+        for bench_name, res in sorted(corpus_results.items()):
+            if bench_name not in base_results or 'error' in res:
+                continue
+            old = base_results[bench_name].get('median')
+            if old is None:
+                continue
+            print('%-12s %-22s %10.4f %10.4f %8.2f' % (
+                corpus_name, bench_name, old, res['median'],
+                res['median'] / old))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run scoring benchmarks.', add_help=True)
+    parser.add_argument(
+        '--corpora', nargs='+', default=sorted(synth.CORPORA.keys()),
+        choices=sorted(synth.CORPORA.keys()), metavar='CORPUS',
+        help='corpora to benchmark (Default: all)')
+    parser.add_argument(
+        '--benchmarks', nargs='+', default=[b[0] for b in BENCHMARKS],
+        choices=[b[0] for b in BENCHMARKS], metavar='BENCHMARK',
+        help='benchmarks to run (Default: all)')
+    parser.add_argument(
+        '--data_dir', nargs=None, default=None, metavar='DIR',
+        help='directory in which to generate/reuse corpora '
+             '(Default: temporary directory)')
+    parser.add_argument(
+        '--n_recordings', nargs=None, default=None, type=int, metavar='N',
+        help='number of recordings per corpus (Default: depends on corpus)')
+    parser.add_argument(
+        '--seed', nargs=None, default=0, type=int, metavar='INT',
+        help='random seed (Default: %(default)s)')
+    parser.add_argument(
+        '-n', nargs=None, default=3, type=int, metavar='N', dest='n_repeats',
+        help='number of repeats (Default: %(default)s)')
+    parser.add_argument(
+        '--output', nargs=None, default=None, metavar='FILE',
+        help='write results to JSON file (Default: None)')
+    parser.add_argument(
+        '--compare', nargs=None, default=None, metavar='FILE',
+        help='compare against results in JSON file (Default: None)')
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        data_dir = tempfile.mkdtemp()
+    results = {}
+    try:
+        print('%-12s %-22s %10s %10s %10s' % (
+            'CORPUS', 'BENCHMARK', 'MIN (s)', 'MEDIAN (s)', 'PEAK (MB)'))
+        for corpus_name in args.corpora:
+            corpus_dir = os.path.join(data_dir, corpus_name)
+            if not os.path.exists(corpus_dir):
+                synth.generate_corpus(
+                    corpus_name, corpus_dir, args.seed, args.n_recordings)
+            corpus = Corpus(corpus_name, corpus_dir)
+            results[corpus_name] = {}
+            for bench_name, func, measure_mem, requires in BENCHMARKS:
+                if bench_name not in args.benchmarks:
+                    continue
+                try:
+                    for attr in requires:
+                        getattr(corpus, attr)
+                    res = run_benchmark(
+                        func, corpus, args.n_repeats, measure_mem)
+                except Exception as e:
+                    res = {'error': '%s: %s' % (type(e).__name__, e)}
+                    print('%-12s %-22s %s' % (
+                        corpus_name, bench_name, res['error']))
+                else:
+                    peak_mem = res['peak_mem_mb']
+                    print('%-12s %-22s %10.4f %10.4f %10s' % (
+                        corpus_name, bench_name, res['min'], res['median'],
+                        'N/A' if peak_mem is None else '%.1f' % peak_mem))
+                results[corpus_name][bench_name] = res
+                sys.stdout.flush()
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': get_metadata(), 'results': results}, f,
+                      indent=2, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        compare(results, baseline)
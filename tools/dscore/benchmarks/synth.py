@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+"""Generate synthetic diarization corpora for benchmarking.
+
+To generate the reference and system RTTMs for the AMI-like corpus under the
+directory ``corpora/ami``:
+
+    python benchmarks/synth.py ami corpora/ami
+
+This will write one reference RTTM per recording to ``corpora/ami/ref`` and
+the corresponding system RTTM to ``corpora/ami/sys``, so that the output may
+be scored directly with ``score_batch.py``. Generation is deterministic given
+the ``--seed`` flag. The following corpus types are supported:
+
+- ami  --  30 minute meetings with 4 speakers
+- many  --  60 minute meetings with 20 speakers
+- homebank  --  16 hour day-long recordings with sparse speech from 4 speakers
+- fragmented  --  as ami, but with system output fragmented into many short
+  turns with frequent speaker changes
+
+Reference turns are sampled from a simple conversational process (turn
+durations and inter-turn gaps drawn from exponential distributions, with some
+proportion of turns overlapping the preceding turn). System output is
+obtained by perturbing the reference: jittering boundaries, dropping turns,
+relabeling speakers, and inserting false alarms.
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import os
+
+import numpy as np
+
+__all__ = ['generate_reference', 'generate_system', 'write_rttm', 'CORPORA']
+
+
+# Parameters for each corpus type:
+# - n_recordings  --  number of recordings
+# - dur  --  recording duration in seconds
+# - n_speakers  --  number of reference speakers
+# - mean_turn_dur  --  mean reference turn duration in seconds
+# - mean_gap  --  mean gap between consecutive turns in seconds
+# - p_overlap  --  probability that a turn overlaps the preceding turn
+# - fragment_dur  --  if not None, system turns are split into pieces of
+#   roughly this duration in seconds
+CORPORA = {
+    'ami': dict(n_recordings=8, dur=1800., n_speakers=4, mean_turn_dur=3.0,
+                mean_gap=0.5, p_overlap=0.15, fragment_dur=None),
+    'many': dict(n_recordings=4, dur=3600., n_speakers=20, mean_turn_dur=2.5,
+                 mean_gap=0.5, p_overlap=0.20, fragment_dur=None),
+    'homebank': dict(n_recordings=2, dur=57600., n_speakers=4,
+                     mean_turn_dur=1.2, mean_gap=8.0, p_overlap=0.05,
+                     fragment_dur=None),
+    'fragmented': dict(n_recordings=8, dur=1800., n_speakers=4,
+                       mean_turn_dur=3.0, mean_gap=0.5, p_overlap=0.15,
+                       fragment_dur=0.3),
+    }
+
+
+def generate_reference(rng, dur, n_speakers, mean_turn_dur, mean_gap,
+                       p_overlap):
+    """Return synthetic reference turns for a single recording.
+
+    Parameters
+    ----------
+    rng : numpy.random.RandomState
+        Random number generator.
+
+    dur : float
+        Recording duration in seconds.
+
+    n_speakers : int
+        Number of speakers.
+
+    mean_turn_dur : float
+        Mean turn duration in seconds.
+
+    mean_gap : float
+        Mean gap in seconds between the offset of a turn and the onset of the
+        next.
+
+    p_overlap : float
+        Probability that a turn starts before the preceding turn ends.
+
+    Returns
+    -------
+    onsets : ndarray, (n_turns,)
+        Turn onsets in seconds.
+
+    offsets : ndarray, (n_turns,)
+        Turn offsets in seconds.
+
+    speaker_inds : ndarray, (n_turns,)
+        Speaker indices.
+    """
+    # Sample more turns than needed, then truncate to recording duration.
+    n_turns = int(2*dur / (mean_turn_dur + mean_gap)) + 10
+    durs = 0.2 + rng.exponential(mean_turn_dur, n_turns)
+    gaps = rng.exponential(mean_gap, n_turns)
+    is_overlap = rng.uniform(size=n_turns) < p_overlap
+    # Overlapping turns start partway through the preceding turn.
+    shifts = np.where(
+        is_overlap, -rng.uniform(0.1, 0.9, n_turns)*np.roll(durs, 1), gaps)
+    shifts[0] = gaps[0]
+    onsets = np.cumsum(shifts + np.concatenate([[0], durs[:-1]]))
+    offsets = onsets + durs
+    keep = offsets < dur
+    onsets = onsets[keep]
+    offsets = offsets[keep]
+
+    # Assign speakers so that consecutive turns are from different speakers.
+    changes = rng.randint(1, max(n_speakers, 2), onsets.size)
+    speaker_inds = np.cumsum(changes) % n_speakers
+    return onsets, offsets, speaker_inds
+
+
+def generate_system(rng, onsets, offsets, speaker_inds, n_speakers, dur,
+                    jitter=0.2, p_drop=0.05, p_confuse=0.1, p_fa=0.05,
+                    fragment_dur=None):
+    """Return synthetic system turns obtained by perturbing reference turns.
+
+    Parameters
+    ----------
+    rng : numpy.random.RandomState
+        Random number generator.
+
+    onsets : ndarray, (n_turns,)
+        Reference turn onsets in seconds.
+
+    offsets : ndarray, (n_turns,)
+        Reference turn offsets in seconds.
+
+    speaker_inds : ndarray, (n_turns,)
+        Reference speaker indices.
+
+    n_speakers : int
+        Number of reference speakers.
+
+    dur : float
+        Recording duration in seconds.
+
+    jitter : float, optional
+        Standard deviation in seconds of noise added to turn boundaries.
+        (Default: 0.2)
+
+    p_drop : float, optional
+        Probability that a reference turn is missed.
+        (Default: 0.05)
+
+    p_confuse : float, optional
+        Probability that a turn is assigned the wrong speaker.
+        (Default: 0.1)
+
+    p_fa : float, optional
+        Number of false alarm turns as a proportion of reference turns.
+        (Default: 0.05)
+
+    fragment_dur : float, optional
+        If not None, each turn is split at uniformly random points into pieces
+        of on average this duration in seconds, each of which is assigned a
+        random speaker with probability 0.5.
+        (Default: None)
+
+    Returns
+    -------
+    onsets : ndarray, (n_turns,)
+        Turn onsets in seconds.
+
+    offsets : ndarray, (n_turns,)
+        Turn offsets in seconds.
+
+    speaker_inds : ndarray, (n_turns,)
+        Speaker indices.
+    """
+    keep = rng.uniform(size=onsets.size) >= p_drop
+    onsets = onsets[keep] + rng.normal(0, jitter, keep.sum())
+    offsets = offsets[keep] + rng.normal(0, jitter, keep.sum())
+    speaker_inds = speaker_inds[keep].copy()
+    confused = rng.uniform(size=speaker_inds.size) < p_confuse
+    speaker_inds[confused] = rng.randint(0, n_speakers, confused.sum())
+
+    # Insert false alarms.
+    n_fa = int(p_fa*onsets.size)
+    fa_onsets = rng.uniform(0, dur, n_fa)
+    fa_offsets = fa_onsets + 0.1 + rng.exponential(1.0, n_fa)
+    onsets = np.concatenate([onsets, fa_onsets])
+    offsets = np.concatenate([offsets, fa_offsets])
+    speaker_inds = np.concatenate(
+        [speaker_inds, rng.randint(0, n_speakers, n_fa)])
+
+    # Fragment.
+    if fragment_dur is not None:
+        f_onsets, f_offsets, f_speaker_inds = [], [], []
+        for onset, offset, speaker_ind in zip(onsets, offsets, speaker_inds):
+            n_pieces = max(1, int((offset - onset) / fragment_dur))
+            bounds = np.sort(rng.uniform(onset, offset, n_pieces - 1))
+            bounds = np.concatenate([[onset], bounds, [offset]])
+            inds = np.full(n_pieces, speaker_ind)
+            is_random = rng.uniform(size=n_pieces) < 0.5
+            inds[is_random] = rng.randint(0, n_speakers, is_random.sum())
+            f_onsets.append(bounds[:-1])
+            f_offsets.append(bounds[1:])
+            f_speaker_inds.append(inds)
+        onsets = np.concatenate(f_onsets)
+        offsets = np.concatenate(f_offsets)
+        speaker_inds = np.concatenate(f_speaker_inds)
+
+    # Clip to recording and discard degenerate turns.
+    onsets = np.clip(onsets, 0, dur)
+    offsets = np.clip(offsets, 0, dur)
+    keep = offsets - onsets > 0.01
+    order = np.argsort(onsets[keep], kind='mergesort')
+    return (onsets[keep][order], offsets[keep][order],
+            speaker_inds[keep][order])
+
+
+def write_rttm(fn, rec_id, onsets, offsets, speaker_ids):
+    """Write turns to RTTM file."""
+    with open(fn, 'wb') as f:
+        for onset, offset, speaker_id in zip(onsets, offsets, speaker_ids):
+            line = 'SPEAKER %s 1 %.3f %.3f <NA> <NA> %s <NA>\n' % (
+                rec_id, onset, offset - onset, speaker_id)
+            f.write(line.encode('utf-8'))
+
+
+def generate_corpus(corpus, out_dir, seed=0, n_recordings=None):
+    """Generate synthetic corpus.
+
+    Parameters
+    ----------
+    corpus : str
+        Corpus type. One of the keys of ``CORPORA``.
+
+    out_dir : str
+        Output directory. Reference and system RTTMs are written to the
+        ``ref`` and ``sys`` subdirectories respectively.
+
+    seed : int, optional
+        Random seed.
+        (Default: 0)
+
+    n_recordings : int, optional
+        Number of recordings. If None, the default for the corpus type is
+        used.
+        (Default: None)
+
+    Returns
+    -------
+    rec_ids : list of str
+        Recording ids.
+    """
+    params = dict(CORPORA[corpus])
+    if n_recordings is not None:
+        params['n_recordings'] = n_recordings
+    rng = np.random.RandomState(seed)
+    ref_dir = os.path.join(out_dir, 'ref')
+    sys_dir = os.path.join(out_dir, 'sys')
+    for dirn in [ref_dir, sys_dir]:
+        if not os.path.exists(dirn):
+            os.makedirs(dirn)
+    rec_ids = []
+    for n in range(params['n_recordings']):
+        rec_id = '%s_%03d' % (corpus, n)
+        rec_ids.append(rec_id)
+        onsets, offsets, speaker_inds = generate_reference(
+            rng, params['dur'], params['n_speakers'],
+            params['mean_turn_dur'], params['mean_gap'],
+            params['p_overlap'])
+        write_rttm(os.path.join(ref_dir, rec_id + '.rttm'), rec_id,
+                   onsets, offsets,
+                   ['%s_spk%02d' % (rec_id, ind) for ind in speaker_inds])
+        onsets, offsets, speaker_inds = generate_system(
+            rng, onsets, offsets, speaker_inds, params['n_speakers'],
+            params['dur'], fragment_dur=params['fragment_dur'])
+        write_rttm(os.path.join(sys_dir, rec_id + '.rttm'), rec_id,
+                   onsets, offsets,
+                   ['%s_cl%02d' % (rec_id, ind) for ind in speaker_inds])
+    return rec_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic diarization corpus.', add_help=True,
+        usage='%(prog)s [options] corpus out_dir')
+    parser.add_argument(
+        'corpus', nargs=None, choices=sorted(CORPORA.keys()),
+        help='corpus type')
+    parser.add_argument(
+        'out_dir', nargs=None, help='output directory')
+    parser.add_argument(
+        '--seed', nargs=None, default=0, type=int, metavar='INT',
+        help='random seed (Default: %(default)s)')
+    parser.add_argument(
+        '--n_recordings', nargs=None, default=None, type=int, metavar='N',
+        help='number of recordings (Default: depends on corpus)')
+    args = parser.parse_args()
+    generate_corpus(args.corpus, args.out_dir, args.seed, args.n_recordings)
@@ -14,27 +14,181 @@ assigned to the ``j``-th system class. Alternately, the ``--norm`` flag may be
 invoked so that each row is normalized to sum to 1:
 
     python confusion_matrix.py --norm ref.rttm sys.rttm
+
+The RTTM files may contain any number of recordings, in which case a single
+confusion matrix is computed over all recordings present in both. Frame
+classes are sets of simultaneously active speakers (or non-speech), so
+classes with the same name (e.g., non-speech) are pooled across recordings.
+
+For corpora with many speakers, printing the full matrix quickly becomes
+unreadable. Instead, the ``--top_k`` flag may be used to print, for each
+reference class (in decreasing order of frequency), only the ``K`` system
+classes it is most often confused with:
+
+    python confusion_matrix.py --top_k 3 ref.rttm sys.rttm
+
+Additionally, the full sparse matrix may be exported to a NumPy ``.npz``
+archive (arrays ``data``, ``row``, ``col``, and ``shape`` in coordinate format
+plus class names ``ref_classes`` and ``sys_classes``) via the ``--npz`` flag
+and/or to a CSV file with one line per non-zero cell via the ``--csv`` flag.
+
+For error analysis over a corpus, the ``--mapped`` flag first maps system
+speakers to reference speakers (using the optimal one-to-one mapping for each
+recording) and renames them accordingly, so that a frame is correctly labeled
+IFF its reference and system classes coincide. System speakers left unmapped
+are named ``unmapped:<recording>:<speaker>``, so that system speakers of
+different recordings are kept apart even if their ids coincide. Instead of the
+full matrix, a compact summary is printed in which classes are collapsed into
+the role categories non-speech, speaker (exactly one speaker active), and
+overlap (two or more speakers active), along with the proportion of frames of
+each reference category whose system class is correct:
+
+    python confusion_matrix.py --mapped --npz cm.npz ref.rttm sys.rttm
+
+In this mode, the ``.npz`` archive additionally contains the role-level matrix
+(``role_cm``), its category names (``roles``), and per-category counts of
+correct frames (``role_correct``).
 """
+from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 import argparse
 import sys
 
-import numpy as np
-from tabulate import tabulate
-
 from scorelib import __version__ as VERSION
 from scorelib.logging import getLogger
-from scorelib.metrics import contingency_matrix
-from scorelib.score import rttm_to_turns, turns_to_frames
 
 logger = getLogger()
 
 
-# TODO: See if this can be subsumed under scorelib.scores.rttms_to_frames
-#       without code becoming unreadable.
-def rttms_to_frames(ref_rttm_fn, sys_rttm_fn, step=0.010):
-    """Return frame-level labels corresponding to reference and system RTTMs.
+NON_SPEECH = 'non-speech'
+ROLES = [NON_SPEECH, 'speaker', 'overlap']
+
+
+class FrameClasses(object):
+    """Assign integer ids to frame classes across recordings.
+
+    A frame class is the set of speakers active in a frame, with the empty
+    set corresponding to non-speech. Each distinct set is assigned an integer
+    id the first time it is encountered, while its name (the ``_``-delimited
+    speaker ids) is only constructed on request.
+    """
+    def __init__(self):
+        self.speaker_ids = []
+        self._speaker_id_to_ind = {}
+        self.keys = []
+        self._key_to_id = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def frame_ids(self, speaker_ids, X):
+        """Return class ids of frames.
+
+        Parameters
+        ----------
+        speaker_ids : ndarray, (n_speakers,)
+            Speaker ids.
+
+        X : ndarray, (n_frames, n_speakers)
+            Boolean matrix whose i,j-th entry is True IFF the j-th speaker was
+            present at frame i.
+
+        Returns
+        -------
+        ids : ndarray, (n_frames,)
+            Class ids.
+        """
+        import numpy as np
+        speaker_inds = np.array(
+            [self._speaker_ind(speaker_id) for speaker_id in speaker_ids],
+            dtype='int64')
+        local_keys, local_inds = _unique_rows(X)
+        ids = np.array(
+            [self._class_id(tuple(sorted(speaker_inds[key])))
+             for key in local_keys], dtype='int64')
+        return ids[local_inds]
+
+    def name(self, class_id):
+        """Return name of class ``class_id``."""
+        key = self.keys[class_id]
+        if not key:
+            return NON_SPEECH
+        return '_'.join(sorted(self.speaker_ids[ind] for ind in key))
+
+    def names(self, class_ids=None):
+        """Return names of classes ``class_ids`` (default: all)."""
+        if class_ids is None:
+            class_ids = range(len(self))
+        return [self.name(class_id) for class_id in class_ids]
+
+    def roles(self):
+        """Return role categories of all classes as indices into ``ROLES``."""
+        import numpy as np
+        n_speakers = np.array([len(key) for key in self.keys], dtype='int64')
+        return np.minimum(n_speakers, len(ROLES) - 1)
+
+    def _speaker_ind(self, speaker_id):
+        if speaker_id not in self._speaker_id_to_ind:
+            self._speaker_id_to_ind[speaker_id] = len(self.speaker_ids)
+            self.speaker_ids.append(speaker_id)
+        return self._speaker_id_to_ind[speaker_id]
+
+    def _class_id(self, key):
+        if key not in self._key_to_id:
+            self._key_to_id[key] = len(self.keys)
+            self.keys.append(key)
+        return self._key_to_id[key]
+
+
+def _unique_rows(X):
+    """Return unique rows of boolean matrix ``X`` and inverse indices."""
+    import numpy as np
+    n_frames, n_speakers = X.shape
+    if n_speakers <= 62:
+        # Encode each row as an integer bitmask; much faster than
+        # np.unique(..., axis=0).
+        codes = X.dot(np.left_shift(1, np.arange(n_speakers, dtype='int64')))
+        codes, inds = np.unique(codes, return_inverse=True)
+        keys = np.bitwise_and(
+            np.right_shift(codes[:, None], np.arange(n_speakers)), 1)
+        return keys.astype('bool'), inds.ravel()
+    keys, inds = np.unique(X, axis=0, return_inverse=True)
+    return keys, inds.ravel()
+
+
+def _map_speakers(ref_speaker_ids, ref_X, sys_speaker_ids, sys_X, rec_id):
+    """Rename system speakers to the reference speakers they are mapped to.
+
+    Returns the renamed system speaker ids and corresponding activity matrix.
+    Mapped system speakers occupy the same columns as their reference
+    speakers, while unmapped speakers (including those mapped to a reference
+    speaker with which they never co-occur) are appended as additional
+    columns and named ``unmapped:<rec_id>:<speaker>``, as system speaker ids
+    need not be unique across recordings.
+    """
+    import numpy as np
+    from scorelib.metrics import speaker_mapping
+    n_frames, n_ref_speakers = ref_X.shape
+    ref_inds, sys_inds = speaker_mapping(ref_X, sys_X)
+    is_hit = np.logical_and(ref_X[:, ref_inds], sys_X[:, sys_inds]).any(axis=0)
+    ref_inds = ref_inds[is_hit]
+    sys_inds = sys_inds[is_hit]
+    unmapped_inds = np.setdiff1d(np.arange(sys_X.shape[1]), sys_inds)
+    X = np.zeros((n_frames, n_ref_speakers + unmapped_inds.size), dtype=bool)
+    X[:, ref_inds] = sys_X[:, sys_inds]
+    X[:, n_ref_speakers:] = sys_X[:, unmapped_inds]
+    speaker_ids = list(ref_speaker_ids) + [
+        'unmapped:%s:%s' % (rec_id, sys_speaker_ids[ind])
+        for ind in unmapped_inds]
+    return np.array(speaker_ids, dtype=object), X
+
+
+def rttms_to_confusion(ref_rttm_fn, sys_rttm_fn, step=0.010, mapped=False):
+    """Return sparse confusion matrix between reference and system RTTMs.
+
+    The confusion matrix is accumulated one recording at a time, so that
+    frame-level labels are never concatenated across recordings.
 
     Parameters
     ----------
@@ -48,37 +202,68 @@ def rttms_to_frames(ref_rttm_fn, sys_rttm_fn, step=0.010):
         Frame step size  in seconds.
         (Default: 0.01)
 
+    mapped : bool, optional
+        If True, system speakers are renamed to the reference speakers they
+        are mapped to within each recording (see ``_map_speakers``).
+        (Default: False)
+
     Returns
     -------
-    ref_labels : ndarray, (n_frames,)
-        Frame-level labels corresponding to reference RTTM.
+    cm : scipy.sparse.csr_matrix, (n_ref_classes, n_sys_classes)
+        Confusion matrix whose i,j-th entry is the number of frames assigned
+        to the i-th reference class and j-th system class.
 
-    sys_labels : ndarray, (n_frames,)
-        Frame-level labels corresponding to system RTTM.
+    ref_classes : FrameClasses
+        Reference classes.
+
+    sys_classes : FrameClasses
+        System classes.
     """
+    import numpy as np
+    from scipy.sparse import coo_matrix
+    from scorelib.metrics import contingency_matrix
+    from scorelib.score import (_n_frames, _turn_arrays, rttm_to_turns,
+                                turns_to_activity)
+
     # Load turns from RTTMs.
     ref_rec_id_to_turns = rttm_to_turns(ref_rttm_fn)
     sys_rec_id_to_turns = rttm_to_turns(sys_rttm_fn)
-    ref_labels = []
-    sys_labels = []
-    max_ref_label = max_sys_label = 0
     rec_ids = sorted(set(ref_rec_id_to_turns.keys()) &
                      set(sys_rec_id_to_turns.keys()))
-    if len(rec_ids) != 1:
-        raise ValueError('RTTM contains more than one file.')
-
-    # Determine correct duration.
-    ref_turns = list(ref_rec_id_to_turns.values())[0]
-    sys_turns = list(sys_rec_id_to_turns.values())[0]
-    ref_dur = max(turn.offset for turn in ref_turns)
-    sys_dur = max(turn.offset for turn in sys_turns)
-    dur = min(ref_dur, sys_dur)
+    if not rec_ids:
+        raise ValueError('RTTMs have no recordings in common.')
 
-    # Convert to frame-level labelings.
-    ref_labels = turns_to_frames(ref_turns, dur, step, as_string=True)
-    sys_labels = turns_to_frames(sys_turns, dur, step, as_string=True)
+    ref_classes = FrameClasses()
+    sys_classes = FrameClasses()
+    rows = []
+    cols = []
+    counts = []
+    for rec_id in rec_ids:
+        # Determine correct duration.
+        ref_turns = ref_rec_id_to_turns[rec_id]
+        sys_turns = sys_rec_id_to_turns[rec_id]
+        ref_dur = _turn_arrays(ref_turns)[1].max()
+        sys_dur = _turn_arrays(sys_turns)[1].max()
+        n_frames = _n_frames(min(ref_dur, sys_dur), step)
 
-    return ref_labels, sys_labels
+        # Convert to frame-level class ids and accumulate non-zero cells of
+        # the recording's contingency matrix.
+        ref_speaker_ids, ref_X = turns_to_activity(ref_turns, n_frames, step)
+        sys_speaker_ids, sys_X = turns_to_activity(sys_turns, n_frames, step)
+        if mapped:
+            sys_speaker_ids, sys_X = _map_speakers(
+                ref_speaker_ids, ref_X, sys_speaker_ids, sys_X, rec_id)
+        ref_ids = ref_classes.frame_ids(ref_speaker_ids, ref_X)
+        sys_ids = sys_classes.frame_ids(sys_speaker_ids, sys_X)
+        cm, ref_uniq_ids, sys_uniq_ids = contingency_matrix(ref_ids, sys_ids)
+        ref_inds, sys_inds = np.nonzero(cm)
+        rows.append(ref_uniq_ids[ref_inds])
+        cols.append(sys_uniq_ids[sys_inds])
+        counts.append(cm[ref_inds, sys_inds])
+    cm = coo_matrix(
+        (np.concatenate(counts), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(len(ref_classes), len(sys_classes)))
+    return cm.tocsr(), ref_classes, sys_classes
 
 
 def print_cm(cm, ref_classes, sys_classes, norm=True):
@@ -86,20 +271,23 @@ def print_cm(cm, ref_classes, sys_classes, norm=True):
 
     Parameters
     ----------
-    cm : ndarray, (n_ref_classes, n_sys_classes)
+    cm : ndarray or scipy.sparse matrix, (n_ref_classes, n_sys_classes)
         Contingency table between reference and system labelings.
 
-    ref_classes : ndarray, (n_ref_classes,)
+    ref_classes : list of str
         Reference classes.
 
-    sys_classes : ndarray, (n_sys_classes,)
+    sys_classes : list of str
         System classes.
 
     norm : bool, optional
         If True, normalize rows of confusion matrix to sum to 1.
         (Default: False)
     """
-    cm, ref_classes, sys_clases = contingency_matrix(ref_labels, sys_labels)
+    import numpy as np
+    from tabulate import tabulate
+    if hasattr(cm, 'toarray'):
+        cm = cm.toarray()
     if norm:
         marginals = cm.sum(axis=1, dtype='float64')
         cm = cm / np.expand_dims(marginals, axis=1)
@@ -109,6 +297,170 @@ def print_cm(cm, ref_classes, sys_classes, norm=True):
     logger.info(tabulate(cm, headers=[''] + list(sys_classes)))
 
 
+def top_k_confusions(cm, k=5):
+    """Return the ``k`` most frequent system classes for each reference class.
+
+    Parameters
+    ----------
+    cm : scipy.sparse.csr_matrix, (n_ref_classes, n_sys_classes)
+        Confusion matrix.
+
+    k : int, optional
+        Number of system classes to return per reference class.
+        (Default: 5)
+
+    Returns
+    -------
+    confusions : list of tuple
+        List of (ref_class, ref_count, sys_classes, counts) tuples, one per
+        reference class with non-zero count, in decreasing order of
+        ``ref_count``. ``sys_classes`` and ``counts`` are arrays of the
+        indices and counts of the top system classes in decreasing order of
+        count.
+    """
+    import numpy as np
+    ref_counts = np.asarray(cm.sum(axis=1)).ravel()
+    confusions = []
+    for ii in np.argsort(-ref_counts, kind='mergesort'):
+        if ref_counts[ii] == 0:
+            break
+        bi, ei = cm.indptr[ii], cm.indptr[ii+1]
+        sys_inds = cm.indices[bi:ei]
+        counts = cm.data[bi:ei]
+        order = np.argsort(-counts, kind='mergesort')[:k]
+        confusions.append((ii, ref_counts[ii], sys_inds[order], counts[order]))
+    return confusions
+
+
+def print_top_k(cm, ref_classes, sys_classes, k=5, norm=False):
+    """Print the ``k`` most frequent system classes for each reference class.
+
+    Parameters
+    ----------
+    cm : scipy.sparse.csr_matrix, (n_ref_classes, n_sys_classes)
+        Confusion matrix.
+
+    ref_classes : FrameClasses
+        Reference classes.
+
+    sys_classes : FrameClasses
+        System classes.
+
+    k : int, optional
+        Number of system classes to print per reference class.
+        (Default: 5)
+
+    norm : bool, optional
+        If True, print proportions of reference class rather than counts.
+        (Default: False)
+    """
+    from tabulate import tabulate
+    table = []
+    for ii, ref_count, sys_inds, counts in top_k_confusions(cm, k):
+        ref_name = ref_classes.name(ii)
+        n = ref_count
+        for jj, count in zip(sys_inds, counts):
+            val = count / ref_count if norm else count
+            table.append([ref_name, n, sys_classes.name(jj), val])
+            ref_name = n = ''
+    headers = ['REF', 'N', 'SYS', 'PROP' if norm else 'COUNT']
+    logger.info(tabulate(table, headers=headers))
+
+
+def role_confusion(cm, ref_classes, sys_classes):
+    """Collapse speaker-mapped confusion matrix into role categories.
+
+    Parameters
+    ----------
+    cm : scipy.sparse.csr_matrix, (n_ref_classes, n_sys_classes)
+        Confusion matrix as returned by ``rttms_to_confusion`` with
+        ``mapped=True``.
+
+    ref_classes : FrameClasses
+        Reference classes.
+
+    sys_classes : FrameClasses
+        System classes.
+
+    Returns
+    -------
+    role_cm : ndarray, (n_roles, n_roles)
+        Confusion matrix between the categories in ``ROLES``.
+
+    role_correct : ndarray, (n_roles,)
+        Number of frames of each reference category whose system class is
+        identical to the reference class.
+    """
+    import numpy as np
+    cm = cm.tocoo()
+    n_roles = len(ROLES)
+    ref_roles = ref_classes.roles()[cm.row]
+    sys_roles = sys_classes.roles()[cm.col]
+    role_cm = np.bincount(
+        n_roles*ref_roles + sys_roles, weights=cm.data,
+        minlength=n_roles**2).reshape(n_roles, n_roles)
+    is_correct = np.array(
+        [ref_classes.name(ii) == sys_classes.name(jj)
+         for ii, jj in zip(cm.row, cm.col)], dtype=bool)
+    role_correct = np.bincount(
+        ref_roles[is_correct], weights=cm.data[is_correct],
+        minlength=n_roles)
+    return role_cm.astype('int64'), role_correct.astype('int64')
+
+
+def print_role_summary(role_cm, role_correct):
+    """Print summary of role-level confusion matrix.
+
+    Parameters
+    ----------
+    role_cm : ndarray, (n_roles, n_roles)
+        Confusion matrix between the categories in ``ROLES``.
+
+    role_correct : ndarray, (n_roles,)
+        Number of correctly labeled frames of each reference category.
+    """
+    from tabulate import tabulate
+    table = []
+    for ii, role in enumerate(ROLES):
+        n = role_cm[ii].sum()
+        row = [role, n]
+        row.extend(role_cm[ii] / max(n, 1))
+        row.append(role_correct[ii] / max(n, 1))
+        table.append(row)
+    headers = ['REF', 'N'] + ['SYS:%s' % role for role in ROLES] + ['CORRECT']
+    logger.info(tabulate(table, headers=headers, floatfmt='.4f'))
+    n_total = role_cm.sum()
+    logger.info('')
+    logger.info('Total frames: %d, correct: %.4f' % (
+        n_total, role_correct.sum() / max(n_total, 1)))
+
+
+def save_npz(fn, cm, ref_classes, sys_classes, **arrays):
+    """Save sparse confusion matrix and class names to NumPy archive.
+
+    Any additional keyword arguments are saved as additional arrays.
+    """
+    import numpy as np
+    cm = cm.tocoo()
+    np.savez(fn, data=cm.data, row=cm.row, col=cm.col,
+             shape=np.array(cm.shape),
+             ref_classes=np.array(ref_classes.names(), dtype='U'),
+             sys_classes=np.array(sys_classes.names(), dtype='U'),
+             **arrays)
+
+
+def save_csv(fn, cm, ref_classes, sys_classes):
+    """Save non-zero cells of confusion matrix to CSV file."""
+    import csv
+    cm = cm.tocoo()
+    with open(fn, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['ref', 'sys', 'count'])
+        for ii, jj, count in zip(cm.row, cm.col, cm.data):
+            writer.writerow(
+                [ref_classes.name(ii), sys_classes.name(jj), count])
+
+
 if __name__ == '__main__':
     # Parse command line arguments.
     parser = argparse.ArgumentParser(
@@ -124,6 +476,22 @@ if __name__ == '__main__':
     parser.add_argument(
         '--norm', action='store_true', default=False,
         help='normalize rows')
+    parser.add_argument(
+        '--mapped', action='store_true', default=False,
+        help='map system speakers to reference speakers and print summary '
+             'by role (non-speech, speaker, overlap)')
+    parser.add_argument(
+        '--top_k', nargs=None, default=None, type=int, metavar='K',
+        help='only print top K system classes for each reference class '
+             '(Default: print full matrix)')
+    parser.add_argument(
+        '--npz', nargs=None, default=None, metavar='FILE', dest='npzf',
+        help='save sparse confusion matrix to NumPy archive '
+             '(Default: None)')
+    parser.add_argument(
+        '--csv', nargs=None, default=None, metavar='FILE', dest='csvf',
+        help='save non-zero cells of confusion matrix to CSV file '
+             '(Default: None)')
     parser.add_argument(
         '--version', action='version',
         version='%(prog)s ' + VERSION)
@@ -132,7 +500,22 @@ if __name__ == '__main__':
         sys.exit(1)
     args = parser.parse_args()
 
-    ref_labels, sys_labels = rttms_to_frames(
-        args.ref_rttm, args.sys_rttm, args.step)
-    cm, ref_classes, sys_classes = contingency_matrix(ref_labels, sys_labels)
-    print_cm(cm, ref_classes, sys_classes, args.norm)
+    cm, ref_classes, sys_classes = rttms_to_confusion(
+        args.ref_rttm, args.sys_rttm, args.step, args.mapped)
+    arrays = {}
+    if args.mapped:
+        import numpy as np
+        role_cm, role_correct = role_confusion(cm, ref_classes, sys_classes)
+        arrays = {'role_cm': role_cm,
+                  'role_correct': role_correct,
+                  'roles': np.array(ROLES, dtype='U')}
+    if args.top_k is not None:
+        print_top_k(cm, ref_classes, sys_classes, args.top_k, args.norm)
+    elif args.mapped:
+        print_role_summary(role_cm, role_correct)
+    else:
+        print_cm(cm, ref_classes.names(), sys_classes.names(), args.norm)
+    if args.npzf is not None:
+        save_npz(args.npzf, cm, ref_classes, sys_classes, **arrays)
+    if args.csvf is not None:
+        save_csv(args.csvf, cm, ref_classes, sys_classes)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Sweep confidence thresholds over system output and write DET curve.
+
+To compute missed speech, false alarm speech, speaker confusion, and
+diarization error rate (DER) at every confidence threshold for the system RTTM
+file ``sys.rttm`` relative to the gold standard RTTM ``ref.rttm`` and write
+the results to ``det.tsv``:
+
+    python det_curve.py ref.rttm sys.rttm det.tsv
+
+The confidence of each system turn is taken from the confidence field (the
+ninth field) of the RTTM, which must be present for all turns. At each
+threshold, only turns whose confidences are greater than or equal to the
+threshold are retained. The output dataframe contains one row per distinct
+confidence, plus a final row at which all turns are rejected, with the
+following columns:
+
+- Threshold  --  the confidence threshold
+- Miss  --  missed speech as a percent of scored speaker time
+- FA  --  false alarm speech as a percent of scored speaker time
+- Confusion  --  speaker confusion as a percent of scored speaker time
+- DER  --  diarization error rate
+
+All thresholds are evaluated in a single pass over the data rather than by
+rescoring once per threshold. Speaker mappings are determined once from the
+unthresholded output, so confusion (and hence DER) at high thresholds may be
+slightly overestimated relative to rescoring; missed and false alarm speech
+are exact. The operating point at which the miss and false alarm rates are
+closest (the equal error rate) is reported to STDOUT.
+
+As with ``score.py``, the ``--collar``, ``--score_overlaps``, ``--step``, and
+``-u`` flags control scoring. The format of the output dataframe is
+determined as in ``score_batch.py``.
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import sys
+
+from scorelib import __version__ as VERSION
+from scorelib.logging import getLogger
+
+logger = getLogger()
+
+COL_NAMES = ['Threshold', 'Miss', 'FA', 'Confusion', 'DER']
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(
+        description='Compute DET curve.', add_help=True,
+        usage='%(prog)s [options] ref_rttm sys_rttm detf')
+    parser.add_argument(
+        'ref_rttm', nargs=None, help='reference RTTM')
+    parser.add_argument(
+        'sys_rttm', nargs=None, help='system RTTM')
+    parser.add_argument(
+        'detf', nargs=None, help='output dataframe')
+    parser.add_argument(
+        '--collar', nargs=None, default=0.250, type=float, metavar='FLOAT',
+        help='collar size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '--score_overlaps', action='store_false', default=True,
+        dest='ignore_overlaps',
+        help='score overlaps')
+    parser.add_argument(
+        '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
+        help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    parser.add_argument(
+        '--version', action='version',
+        version='%(prog)s ' + VERSION)
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+
+    from scorelib.dataframe import write_dataframe
+    from scorelib.det import confidence_sweep, equal_error_rate
+    from scorelib.score import load_uem, rttm_to_turns
+    rec_id_to_uem = None if args.uemf is None else load_uem(args.uemf)
+    try:
+        thresholds, n_miss, n_fa, n_conf, n_ref = confidence_sweep(
+            rttm_to_turns(args.ref_rttm), rttm_to_turns(args.sys_rttm),
+            args.collar, args.ignore_overlaps, args.step, rec_id_to_uem)
+    except ValueError as e:
+        logger.error('%s: %s' % (args.sys_rttm, e))
+        sys.exit(1)
+    scale = 100. / max(n_ref, 1)
+    rows = zip(thresholds, scale*n_miss, scale*n_fa, scale*n_conf,
+               scale*(n_miss + n_fa + n_conf))
+    write_dataframe(args.detf, COL_NAMES, rows)
+    threshold, eer = equal_error_rate(thresholds, n_miss, n_fa, n_ref)
+    logger.info('EER: %.2f (threshold: %s)' % (eer, threshold))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Export timelines of diarization errors.
+
+To write the segments of each recording in which scoring errors occur for
+system RTTM file ``sys.rttm`` and corresponding gold standard RTTM
+``ref.rttm`` to the directory ``errors``:
+
+    python error_timeline.py ref.rttm sys.rttm errors
+
+Errors are determined exactly as for the in-process DER computation: reference
+and system speakers are mapped one-to-one so as to maximize total overlap and
+frames within the forgiveness collar (and, by default, frames containing
+overlapping reference speech) are excluded. Consecutive erroneous frames are
+merged into segments of the following types:
+
+- miss  --  missed speech outside of reference overlaps
+- overlap_miss  --  missed speech within reference overlaps
+- fa  --  false alarm speech
+- confusion  --  speech attributed to the wrong speaker
+
+Segments of different types may overlap. For each recording, a file named
+after the recording id is written in one of the following formats, selected
+via the ``--format`` flag:
+
+- rttm  --  RTTM file with one ``SPEAKER`` line per segment, with the error
+  type in the speaker name field, so that it may be loaded alongside the
+  reference and system RTTMs in any RTTM viewer
+- audacity  --  Audacity label track (tab-delimited onset, offset, and label)
+
+As with ``score.py``, the ``--collar``, ``--score_overlaps``, ``--step``, and
+``-u`` flags control scoring.
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import os
+import sys
+
+from scorelib import __version__ as VERSION
+from scorelib.logging import getLogger
+
+logger = getLogger()
+
+FORMATS = ['rttm', 'audacity']
+FORMAT_TO_EXT = {'rttm': '.rttm',
+                 'audacity': '.txt'}
+
+
+def write_segments(fn, rec_id, segments, fmt='rttm', enc='utf-8'):
+    """Write error segments of a single recording to file.
+
+    Parameters
+    ----------
+    fn : str
+        Output file.
+
+    rec_id : str
+        Recording id.
+
+    segments : list of tuple
+        Error segments as (onset, offset, error_type) tuples.
+
+    fmt : str, optional
+        Output format. One of "rttm" or "audacity".
+        (Default: 'rttm')
+
+    enc : str, optional
+        Character encoding.
+        (Default: 'utf-8')
+    """
+    if fmt == 'rttm':
+        template = ('SPEAKER {rec_id} 1 {onset:.3f} {dur:.3f} <NA> <NA> '
+                    '{type} <NA>\n')
+    else:
+        template = '{onset:.3f}\t{offset:.3f}\t{type}\n'
+    with open(fn, 'wb') as f:
+        for onset, offset, error_type in segments:
+            line = template.format(
+                rec_id=rec_id, onset=onset, offset=offset,
+                dur=offset - onset, type=error_type)
+            f.write(line.encode(enc))
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(
+        description='Export error timelines.', add_help=True,
+        usage='%(prog)s [options] ref_rttm sys_rttm out_dir')
+    parser.add_argument(
+        'ref_rttm', nargs=None, help='reference RTTM')
+    parser.add_argument(
+        'sys_rttm', nargs=None, help='system RTTM')
+    parser.add_argument(
+        'out_dir', nargs=None, help='output directory')
+    parser.add_argument(
+        '--format', nargs=None, default='rttm', choices=FORMATS,
+        metavar='FMT', dest='fmt',
+        help='output format; one of %s (Default: %%(default)s)' %
+             ', '.join(FORMATS))
+    parser.add_argument(
+        '--collar', nargs=None, default=0.250, type=float, metavar='FLOAT',
+        help='collar size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '--score_overlaps', action='store_false', default=True,
+        dest='ignore_overlaps',
+        help='score overlaps')
+    parser.add_argument(
+        '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
+        help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    parser.add_argument(
+        '--version', action='version',
+        version='%(prog)s ' + VERSION)
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+
+    from scorelib.score import error_segments, load_uem, rttm_to_turns
+    rec_id_to_uem = None if args.uemf is None else load_uem(args.uemf)
+    rec_id_to_segments = error_segments(
+        rttm_to_turns(args.ref_rttm), rttm_to_turns(args.sys_rttm),
+        args.collar, args.ignore_overlaps, args.step, rec_id_to_uem)
+    if not os.path.exists(args.out_dir):
+        os.makedirs(args.out_dir)
+    for rec_id, segments in sorted(rec_id_to_segments.items()):
+        fn = os.path.join(args.out_dir, rec_id + FORMAT_TO_EXT[args.fmt])
+        write_segments(fn, rec_id, segments, args.fmt)
+        logger.info('%s: %d error segments' % (rec_id, len(segments)))
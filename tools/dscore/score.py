@@ -8,7 +8,8 @@ corresponding gold standard RTTM ``ref.rttm``:
 
 which will calculate and report the following metrics:
 
-- diarization error rate (DER)
+- diarization error rate (DER), along with the scored, missed, false alarm,
+  and speaker error (confusion) time from which it is computed
 - B-cubed precision
 - B-cubed recall
 - B-cubed F1
@@ -33,28 +34,121 @@ would compute DER using a 100 ms collar and with overlapped speech included.
 All other metrics are computed off of frame-level labelings created from the
 turns in the RTTM files **WITHOUT** any use of collars. The default frame
 step is 10 ms, which may be altered via the ``--step`` flag. 
+
+By default, each recording is scored over the extent of its reference turns
+(for DER) or of the shorter of its reference and system turns (for all other
+metrics). To score only selected regions, such as the annotated portions of a
+partially annotated recording, a UEM file may be supplied via the ``-u`` flag:
+
+    python score.py -u all.uem ref.rttm sys.rttm
+
+in which case all metrics are computed only within the scoring regions it
+specifies.
+
+To score many pairs of RTTM files without paying interpreter startup and
+import costs for each, a manifest listing the pairs may be supplied via the
+``--pairs`` flag:
+
+    python score.py --pairs pairs.tsv
+
+Each line of the manifest contains the path to a reference RTTM followed by the
+path to the corresponding system RTTM, separated by whitespace. Blank lines
+and lines starting with ``#`` are ignored. Scores for all pairs are written as
+a dataframe with columns ``Ref`` and ``Sys`` followed by the metric columns to
+STDOUT or, if specified, the file given by the ``-o`` flag, whose extension
+determines the format as in ``score_batch.py``.
+
+The ``--profile`` flag reports the time and memory usage of each stage of
+scoring (parsing, framing, DER, contingency matrix, and metrics) as a table to
+STDERR; the ``--profile_json`` flag additionally writes these results to a
+JSON file.
 """
 from __future__ import print_function
 from __future__ import unicode_literals
 import argparse
 import sys
 
+# NOTE: Imports of scorelib.score and scorelib.dataframe (and hence NumPy) are
+#       deferred until needed so that startup remains fast.
 from scorelib import __version__ as VERSION
 from scorelib.logging import getLogger
-from scorelib.score import score
 
 logger = getLogger()
 
+COL_NAMES = ['Ref', 'Sys', 'DER', 'B3Precision', 'B3Recall', 'B3F1',
+             'TauRefSys', 'TauSysRef', 'CE', 'MI', 'NMI']
+
+
+def load_pairs(fn, enc='utf-8'):
+    """Load reference/system RTTM pairs from manifest.
+
+    Parameters
+    ----------
+    fn : str
+        Path to manifest. Each line contains the path to a reference RTTM
+        followed by the path to a system RTTM, separated by whitespace.
+
+    enc : str, optional
+        Character encoding.
+        (Default: 'utf-8')
+
+    Returns
+    -------
+    pairs : list of tuple
+        List of (reference RTTM, system RTTM) pairs.
+    """
+    pairs = []
+    with open(fn, 'rb') as f:
+        for n, line in enumerate(f):
+            line = line.decode(enc).strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split()
+            if len(fields) != 2:
+                raise ValueError(
+                    'Line %d of manifest %s does not contain exactly two '
+                    'fields.' % (n + 1, fn))
+            pairs.append(tuple(fields))
+    return pairs
+
+
+def score_pairs(pairs, collar=0.250, ignore_overlaps=True, step=0.010,
+                profiler=None, uem_fn=None):
+    """Score reference/system RTTM pairs, yielding one row per pair.
+
+    If ``md-eval.pl`` fails for a pair, the error is logged and its DER is
+    NaN.
+    """
+    from scorelib.score import score
+    def report_der_error(sys_rttm_fn, e):
+        logger.error('Unable to compute DER of %s; DER will be NaN. %s' %
+                     (sys_rttm_fn, e))
+    for ref_rttm_fn, sys_rttm_fn in pairs:
+        row = [ref_rttm_fn, sys_rttm_fn]
+        row.extend(score(ref_rttm_fn, sys_rttm_fn, collar, ignore_overlaps,
+                         step, profiler=profiler, uem_fn=uem_fn,
+                         on_der_error=report_der_error))
+        yield row
+
 
 if __name__ == '__main__':
     # Parse command line arguments.
     parser = argparse.ArgumentParser(
         description='Score RTTM.', add_help=True,
-        usage='%(prog)s [options] ref_rttm sys_rttm')
+        usage='%(prog)s [options] ref_rttm sys_rttm\n'
+              '       %(prog)s [options] --pairs FILE')
+    parser.add_argument(
+        'ref_rttm', nargs='?', help='reference RTTM')
+    parser.add_argument(
+        'sys_rttm', nargs='?', help='system RTTM')
     parser.add_argument(
-        'ref_rttm', nargs=None, help='reference RTTM')
+        '--pairs', nargs=None, default=None, metavar='FILE', dest='pairsf',
+        help='score all reference/system RTTM pairs listed in manifest '
+             '(Default: None)')
     parser.add_argument(
-        'sys_rttm', nargs=None, help='system RTTM')
+        '-o', nargs=None, default='-', metavar='FILE', dest='scoresf',
+        help='output dataframe for --pairs; "-" for STDOUT '
+             '(Default: %(default)s)')
     parser.add_argument(
         '--collar', nargs=None, default=0.250, type=float, metavar='FLOAT',
         help='collar size in seconds for DER computaton '
@@ -66,6 +160,17 @@ if __name__ == '__main__':
     parser.add_argument(
         '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
         help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    parser.add_argument(
+        '--profile', action='store_true', default=False,
+        help='report time and memory usage of each stage of scoring to '
+             'STDERR')
+    parser.add_argument(
+        '--profile_json', nargs=None, default=None, metavar='FILE',
+        help='write profiling results to JSON file; implies --profile '
+             '(Default: None)')
     parser.add_argument(
         '--version', action='version',
         version='%(prog)s ' + VERSION)
@@ -73,15 +178,52 @@ if __name__ == '__main__':
         parser.print_help()
         sys.exit(1)
     args = parser.parse_args()
+    if args.pairsf is None and (args.ref_rttm is None or
+                                args.sys_rttm is None):
+        parser.error('either both ref_rttm and sys_rttm or --pairs required')
+
+    profiler = None
+    if args.profile or args.profile_json is not None:
+        from scorelib.profiling import Profiler
+        profiler = Profiler()
+
+    if args.pairsf is not None:
+        from scorelib.dataframe import write_dataframe
+        pairs = load_pairs(args.pairsf)
+        rows = score_pairs(pairs, args.collar, args.ignore_overlaps, args.step,
+                           profiler, args.uemf)
+        write_dataframe(args.scoresf, COL_NAMES, rows)
+    else:
+        from scorelib.metrics import MDEvalError
+        from scorelib.score import score
+        try:
+            metrics = score(args.ref_rttm, args.sys_rttm, args.collar,
+                            args.ignore_overlaps, args.step,
+                            profiler=profiler, uem_fn=args.uemf,
+                            der_components=True)
+        except MDEvalError as e:
+            logger.error('Unable to compute DER. %s' % e)
+            sys.exit(1)
+        der_result = metrics[-1]
+        logger.info('DER: %.2f' % metrics[0])
+        logger.info('Scored speaker time: %.2f s' %
+                    der_result.scored_speaker_time)
+        logger.info('Missed speaker time: %.2f s' %
+                    der_result.missed_speaker_time)
+        logger.info('False alarm speaker time: %.2f s' %
+                    der_result.falarm_speaker_time)
+        logger.info('Speaker error time: %.2f s' %
+                    der_result.speaker_error_time)
+        logger.info('B-cubed precision: %.2f' % metrics[1])
+        logger.info('B-cubed recall: %.2f' % metrics[2])
+        logger.info('B-cubed F1: %.2f' % metrics[3])
+        logger.info('GKT(ref, sys): %.2f' % metrics[4])
+        logger.info('GKT(sys, ref): %.2f' % metrics[5])
+        logger.info('H(ref|sys): %.2f' % metrics[6])
+        logger.info('MI: %.2f' % metrics[7])
+        logger.info('NMI: %.2f' % metrics[8])
 
-    metrics = score(args.ref_rttm, args.sys_rttm, args.collar,
-                    args.ignore_overlaps, args.step)
-    logger.info('DER: %.2f' % metrics[0])
-    logger.info('B-cubed precision: %.2f' % metrics[1])
-    logger.info('B-cubed recall: %.2f' % metrics[2])
-    logger.info('B-cubed F1: %.2f' % metrics[3])
-    logger.info('GKT(ref, sys): %.2f' % metrics[4])
-    logger.info('GKT(sys, ref): %.2f' % metrics[5])
-    logger.info('H(ref|sys): %.2f' % metrics[6])
-    logger.info('MI: %.2f' % metrics[7])
-    logger.info('NMI: %.2f' % metrics[8])
+    if profiler is not None:
+        print(profiler.format_table(), file=sys.stderr)
+        if args.profile_json is not None:
+            profiler.to_json(args.profile_json)
@@ -16,6 +16,50 @@ the file ids could have been specified explicitly via a script file of ids
 
     python score_batch.py -S all.scp scores.df ref_dir sys_dir
 
+Several systems may be scored against the same reference in one run by
+listing multiple system directories:
+
+    python score_batch.py scores.df ref_dir sys1_dir sys2_dir sys3_dir
+
+or by giving a manifest of systems, each line of which contains a system name
+and the directory containing its RTTM files, separated by whitespace:
+
+    python score_batch.py --systems systems.txt scores.df ref_dir
+
+Each reference RTTM is then parsed and framed only once and scored against
+every system that has an RTTM for it, and the dataframe gains a leading
+"System" column. Systems listed as directories are named by the basename of
+the directory. A file is scored if it is present in ``ref_dir`` and in the
+directory of at least one system.
+
+For hyperparameter sweeps, which may produce hundreds of system directories,
+the ``--sweep`` flag instead scores every directory under a root that contains
+RTTM files, naming each system by its path relative to the root. Parameters
+may be parsed from these paths into columns (inserted after "System") by
+giving a pattern in which each parameter is replaced by its name in braces:
+
+    python score_batch.py -j 8 --sweep sweep_dir \
+        --sweep_pattern 'nc{NClusters}/thr{Threshold}' \
+        --leaderboard leaderboard.tsv scores.df ref_dir
+
+Directories not matching the pattern are skipped. All systems share a single
+worker pool and each reference is parsed and framed once, as above. If
+``--leaderboard`` is given, one row per system is also written to the
+specified file, with metrics averaged over files (or, for ``--overlap`` and
+``--turns``, pooled as in the ``ALL`` rows) and systems ranked by the metric
+named by ``--rank_by`` (default: DER; DCF with ``--sad``; F1 with
+``--overlap``). Precision, recall, F1, accuracy, detection, tau, MI, and NMI
+are ranked in decreasing order and all other metrics in increasing order.
+Systems not scored on every file (e.g., those missing some RTTM files) are
+not comparable with the rest, and so are ranked after them with a warning.
+
+As they are scored, rows of a sweep are recorded in a journal, ``scores.df``
+with the suffix ``.journal``, which is deleted once the sweep completes. If a
+sweep is interrupted, rerunning the same command resumes it, scoring only
+the system/file pairs missing from the journal. A journal written for a
+different sweep (sweep root, pattern, or set of systems) or with different
+scoring settings is refused.
+
 Minimally, the output dataframe has the following columns:
 
 - FID  --  the file id
@@ -45,6 +89,39 @@ For instance, the string
 would result in two additional columns, "Corpus" and "NClusters", being output
 with the values "AMI" and 4 respectively in each row.
 
+By default, the dataframe is written as tab-delimited text. Other formats may
+be selected via the ``--format`` flag or, if it is not specified, by the
+extension of the output file:
+
+- tsv  --  tab-delimited text (default)
+- jsonl  --  JSON Lines; one JSON object per row (``.jsonl``, ``.json``)
+- npy  --  NumPy structured array (``.npy``)
+- npz  --  NumPy archive containing one array per column (``.npz``)
+- parquet  --  Apache Parquet (``.parquet``); requires pyarrow
+- arrow  --  Apache Arrow IPC file (``.arrow``, ``.feather``); requires pyarrow
+
+Rows are written in batches as scoring proceeds, except for the NumPy formats,
+which are written once scoring is complete.
+
+When run with multiple workers (``-j``), the workers first parse all
+reference RTTMs in parallel and the main process collects them, together
+with the UEM, into a temporary store of memory-mapped arrays (see
+``scorelib.store.ReferenceStore``), to which each worker attaches once.
+Workers thus share a single copy of the parsed references, from which they
+build the turns of each file as they score it, and the UEM is parsed once
+rather than once per file.
+
+Log messages from all workers are collected by the main process. If the
+``--log_json`` flag is given, they are additionally written as JSON Lines to
+the specified file, along with one record per scored file containing its
+file id, the time taken to score it, and its metrics.
+
+To find out where time is spent, the ``--profile`` flag may be used, in which
+case the time and memory usage of each stage of scoring (parsing, framing,
+DER, contingency matrix, and metrics) are aggregated across all recordings
+and workers and reported as a table to STDERR. The ``--profile_json`` flag
+additionally writes these results to a JSON file.
+
 Diarization error rate (DER) is scored using the NIST ``md-eval.pl`` tool
 using a default collar size of 250 ms and ignoring regions that contain
 overlapping speech in the reference RTTM. If desired, this behavior can be
@@ -53,47 +130,365 @@ altered using the ``--collar`` and ``--score_overlaps`` flags. For instance
     python --collar 0.100 --score_overlaps score.py ref.rttm sys.rttm
 
 would compute DER using a 100 ms collar and with overlapped speech included.
+The ``--der_components`` flag additionally appends the following columns,
+parsed from the same ``md-eval.pl`` report:
+
+- EvalTime  --  evaluated time in seconds
+- EvalSpeech  --  evaluated speech in seconds
+- ScoredTime  --  scored time in seconds
+- ScoredSpeech  --  scored speech in seconds
+- MissedSpeech  --  missed speech in seconds
+- FASpeech  --  false alarm speech in seconds
+- ScoredSpeakerTime  --  scored speaker time in seconds
+- MissedSpeakerTime  --  missed speaker time in seconds
+- FASpeakerTime  --  false alarm speaker time in seconds
+- SpeakerErrorTime  --  speaker error (confusion) time in seconds
+
+If ``md-eval.pl`` fails for a file, the error is logged and DER (and these
+columns) are NaN for that file.
 
 All other metrics are computed off of frame-level labelings created from the
 turns in the RTTM files **WITHOUT** any use of collars. The default frame
 step is 10 ms, which may be altered via the ``--step`` flag.
+
+To see how performance varies with the amount of overlapped speech, the
+``--max_degree`` flag may be used to break down metrics by overlap degree;
+that is, by the number of reference speakers speaking at each frame. For
+instance
+
+    python score_batch.py --max_degree 4 scores.df ref_dir sys_dir
+
+adds, for each degree d from 0 to 4, the following columns, computed on frames
+with d reference speakers (for d=4, 4 or more):
+
+- NdMiss  --  missed speaker time as a percent of all scored speaker time
+- NdFA  --  false alarm speaker time as a percent of all scored speaker time
+- NdConf  --  confused speaker time as a percent of all scored speaker time
+- NdB3Precision, ..., NdNMI  --  the clustering metrics listed above
+
+The NdMiss, NdFA, and NdConf columns are computed in-process from frames and
+sum (up to the frame step) to DER. Unless ``--score_overlaps`` is given, they
+are zero for d greater than 1. The clustering columns are NaN whenever the
+frames of a degree have fewer than two distinct reference or system labels,
+as the metrics are then undefined; in particular, they are always NaN for d=0,
+whose frames are all non-speech.
+
+By default, each recording is scored over the extent of its reference turns
+(for DER) or of the shorter of its reference and system turns (for all other
+metrics). Alternately, the scoring regions of each recording may be specified
+via a UEM file using the ``-u`` flag, in which case all metrics are computed
+only within these regions.
+
+To evaluate speech activity detection (SAD) output rather than diarization,
+use the ``--sad`` flag:
+
+    python score_batch.py --sad --collar 0 scores.df ref_dir sys_dir
+
+In this mode, speakers in both the reference and system RTTMs are collapsed
+into speech, and the dataframe instead has the following columns:
+
+- FID  --  the file id
+- Miss  --  percent of scored speech missed
+- FA  --  percent of scored non-speech detected as speech
+- DCF  --  detection cost, 0.75*Miss + 0.25*FA
+- Accuracy  --  percent of scored time correctly classified
+
+Absent a UEM, the scoring region of each file extends from 0 to the end of the
+last reference or system turn. The ``--collar`` flag (default 250 ms) excludes
+regions around reference speech boundaries.
+
+To evaluate overlapped speech detection output, use the ``--overlap`` flag:
+
+    python score_batch.py --overlap scores.df ref_dir sys_dir
+
+In this mode, the reference overlap regions of each file are those in which two
+or more reference speakers are speaking, while each turn of the system RTTM is
+taken to be a detected overlap region, regardless of its speaker. If the system
+RTTMs instead contain diarization output, the ``--derive_sys_overlaps`` flag
+causes system overlap regions to be derived in the same way as for the
+reference. All durations are computed exactly from the turn boundaries rather
+than from frames, and the dataframe has the following columns:
+
+- FID  --  the file id
+- Precision  --  proportion of system overlap that is reference overlap
+- Recall  --  proportion of reference overlap detected by the system
+- F1  --  harmonic mean of precision and recall
+- RefOverlap  --  duration of reference overlap in seconds
+- Miss  --  duration of reference overlap not detected in seconds
+- FA  --  duration of system overlap that is not reference overlap in seconds
+
+A final row with file id ``ALL`` contains the metrics pooled over all files.
+If a UEM is given, only overlap within its scoring regions is counted.
+
+To see how errors depend on the length of reference turns, use the ``--turns``
+flag:
+
+    python score_batch.py --turns --collar 0 --score_overlaps \
+        scores.df ref_dir sys_dir
+
+In this mode, reference turns are binned by duration, with bin edges (in
+seconds) given by the ``--turn_bins`` flag (default "0.5,1,2,5", yielding bins
+<0.5 s, 0.5-1 s, 1-2 s, 2-5 s, and >=5 s), and for each bin i the dataframe
+contains the following columns:
+
+- DiNTurns  --  number of turns with any scored speech
+- DiRefTime  --  scored speaker time of these turns in seconds
+- DiMiss  --  percent of this time missed
+- DiConf  --  percent of this time attributed to the wrong speaker
+- DiDetection  --  percent of turns detected; that is, for which the mapped
+  system speaker is present for at least the fraction of the turn given by
+  ``--min_coverage`` (default 0.5)
+
+Frames are scored as for DER, so that the ``--collar`` and ``--score_overlaps``
+flags apply; note that a 250 ms collar discards all turns shorter than 500 ms.
+As with ``--overlap``, a final ``ALL`` row contains the metrics pooled over all
+files.
 """
 from __future__ import print_function
 from __future__ import unicode_literals
 import argparse
 import glob
+import logging
 import os
+import shutil
 import sys
+import tempfile
+import time
 
-from multiprocessing import Pool
+from collections import OrderedDict
+from multiprocessing import Pool, Queue
+
+import numpy as np
 
 from scorelib import __version__ as VERSION
-from scorelib.logging import getLogger
-from scorelib.score import score
+from scorelib.dataframe import check_format, FORMATS
+from scorelib.dataframe import write_dataframe as _write_dataframe
+from scorelib.logging import (add_json_handler, configure_logger, getLogger,
+                              QueueHandler, QueueListener)
+from scorelib.overlap import overlap_metrics, overlap_metrics_from_durations
+from scorelib.profiling import Profiler, NULL_PROFILER
+from scorelib.sad import sad_metrics
+from scorelib.sweep import discover_systems, leaderboard, SweepJournal
+from scorelib.score import load_uem, rttm_to_turns, score_systems
+from scorelib.store import ReferenceStore
+from scorelib.turn_duration import turn_duration_metrics, BIN_EDGES
 
 logger = getLogger()
 
 
+def _score_systems(ref_rttm_fn, sys_rttm_fns, collar, ignore_overlaps, step,
+                   profiler=None, uem_fn=None, mode='diarization',
+                   max_degree=None, bin_edges=None, min_coverage=0.5,
+                   ref_turns=None, rec_id_to_uem=None, der_components=False,
+                   on_der_error=None):
+    """Return metrics of each system RTTM relative to the reference RTTM.
+
+    The reference RTTM (and UEM) is parsed only once, regardless of the number
+    of systems, or not at all if its turns (and scoring regions) are given.
+    """
+    if mode == 'diarization':
+        results = []
+        for metrics in score_systems(
+                ref_rttm_fn, sys_rttm_fns, collar, ignore_overlaps, step,
+                profiler=profiler, uem_fn=uem_fn, max_degree=max_degree,
+                ref_turns=ref_turns, uem=rec_id_to_uem,
+                der_components=der_components, on_der_error=on_der_error):
+            metrics = list(metrics)
+            der_result = metrics.pop() if der_components else None
+            if max_degree is not None:
+                metrics = metrics[:-1] + [
+                    val for degree_metrics in metrics[-1]
+                    for val in degree_metrics]
+            if der_result is not None:
+                # DER itself is already the second column.
+                metrics.extend(der_result[:-1])
+            results.append(metrics)
+        return results
+    profiler = profiler or NULL_PROFILER
+    with profiler.stage('parse'):
+        if ref_turns is None:
+            ref_turns = rttm_to_turns(ref_rttm_fn)
+        if rec_id_to_uem is None and uem_fn is not None:
+            rec_id_to_uem = load_uem(uem_fn)
+    results = []
+    for sys_rttm_fn in sys_rttm_fns:
+        with profiler.stage('parse'):
+            sys_turns = rttm_to_turns(sys_rttm_fn)
+        if mode == 'sad':
+            with profiler.stage('sad'):
+                results.append(list(sad_metrics(
+                    ref_turns, sys_turns, collar, rec_id_to_uem)))
+        elif mode in ('overlap', 'derived_overlap'):
+            with profiler.stage('overlap'):
+                results.append(list(overlap_metrics(
+                    ref_turns, sys_turns, rec_id_to_uem,
+                    mode == 'derived_overlap')))
+        elif mode == 'turns':
+            with profiler.stage('turns'):
+                results.append([val for bin_metrics in turn_duration_metrics(
+                    ref_turns, sys_turns, bin_edges, collar, ignore_overlaps,
+                    step, rec_id_to_uem, min_coverage)
+                                for val in bin_metrics])
+    return results
+
+
+# Reference stores attached to by this process, by directory.
+_STORES = {}
+
+
+def _get_store(dirname):
+    """Return ``ReferenceStore`` in ``dirname``, attaching only once per
+    process.
+    """
+    if dirname not in _STORES:
+        _STORES[dirname] = ReferenceStore(dirname)
+    return _STORES[dirname]
+
+
 def _score_recordings(args):
-    fid, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps, step = args
+    (fid, ref_rttm_dir, systems, collar, ignore_overlaps, step,
+     profile, uem_fn, mode, max_degree, bin_edges, min_coverage,
+     der_components, store_dir) = args
     ref_rttm_fn = os.path.join(ref_rttm_dir, fid +'.rttm')
-    sys_rttm_fn = os.path.join(sys_rttm_dir, fid + '.rttm')
     fail = False
     if not (os.path.exists(ref_rttm_fn)):
-        logger.warn('Missing reference RTTM: %s. Skipping.' % sys_rttm_fn)
-        fail = True
-    if not (os.path.exists(ref_rttm_fn)):
-        logger.warn('Missing system RTTM: %s. Skipping.' % sys_rttm_fn)
+        logger.warning('Missing reference RTTM: %s. Skipping.' % ref_rttm_fn,
+                    extra={'fid': fid, 'stage': 'load'})
         fail = True
-    if fail:
-        return
-    row = [fid]
-    row.extend(score(ref_rttm_fn, sys_rttm_fn))
-    return row
+    names = []
+    sys_rttm_fns = []
+    for name, sys_rttm_dir in systems:
+        sys_rttm_fn = os.path.join(sys_rttm_dir, fid + '.rttm')
+        if not (os.path.exists(sys_rttm_fn)):
+            logger.warning('Missing system RTTM: %s. Skipping.' % sys_rttm_fn,
+                        extra={'fid': fid, 'stage': 'load'})
+            continue
+        names.append(name)
+        sys_rttm_fns.append(sys_rttm_fn)
+    if fail or not sys_rttm_fns:
+        return [], None
+    def report_der_error(sys_rttm_fn, e):
+        logger.error('Unable to compute DER of %s; DER will be NaN. %s' %
+                     (sys_rttm_fn, e), extra={'fid': fid, 'stage': 'der'})
+    profiler = Profiler() if profile else None
+    t0 = time.time()
+    ref_turns = rec_id_to_uem = None
+    if store_dir is not None:
+        with (profiler or NULL_PROFILER).stage('parse'):
+            store = _get_store(store_dir)
+            ref_turns = store.turns(fid)
+            rec_id_to_uem = store.uem()
+    results = _score_systems(
+        ref_rttm_fn, sys_rttm_fns, collar, ignore_overlaps, step, profiler,
+        uem_fn, mode, max_degree, bin_edges, min_coverage, ref_turns,
+        rec_id_to_uem, der_components, report_der_error)
+    elapsed = time.time() - t0
+    col_names = get_col_names(
+        mode, max_degree, bin_edges, der_components=der_components)
+    rows = []
+    for name, metrics in zip(names, results):
+        row = [fid] + metrics
+        if logger.isEnabledFor(logging.DEBUG):
+            extra = {'fid': fid, 'stage': 'score', 'elapsed': elapsed,
+                     'metrics': dict(zip(col_names[1:], row[1:]))}
+            msg = 'Scored %s in %.3f seconds.' % (fid, elapsed)
+            if name is not None:
+                extra['system'] = name
+                msg = 'Scored %s (%d systems) in %.3f seconds.' % (
+                    fid, len(sys_rttm_fns), elapsed)
+            logger.debug(msg, extra=extra)
+        if name is not None:
+            row = [name] + row
+        rows.append(row)
+    return rows, profiler.to_dict() if profile else None
+
+
+def _as_systems(sys_rttm_dir):
+    """Return list of system name/directory pairs.
+
+    A single directory is given the name None.
+    """
+    if isinstance(sys_rttm_dir, (list, tuple)):
+        return list(sys_rttm_dir)
+    return [(None, sys_rttm_dir)]
+
+
+def _init_worker(queue, level):
+    """Route records logged by pool worker to ``queue``."""
+    root = logging.getLogger()
+    while root.handlers:
+        root.handlers.pop()
+    root.addHandler(QueueHandler(queue))
+    root.setLevel(level)
+
+
+def iter_scores(fids, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps,
+                step, n_jobs=1, profiler=None, uem_fn=None,
+                mode='diarization', max_degree=None, bin_edges=None,
+                min_coverage=0.5, done=None, der_components=False):
+    """Score batch of recordings, yielding rows as they become available.
+
+    Takes the same arguments as ``score_recordings``.
+    """
+    profile = profiler is not None
+    systems = _as_systems(sys_rttm_dir)
+    done = done or set()
+    fid_to_systems = OrderedDict()
+    for fid in fids:
+        systems_ = [system for system in systems
+                    if (system[0], fid) not in done]
+        if systems_:
+            fid_to_systems[fid] = systems_
+    store_dir = None
+    def args_gen():
+        for fid, systems_ in fid_to_systems.items():
+            yield (fid, ref_rttm_dir, systems_, collar, ignore_overlaps,
+                   step, profile, uem_fn, mode, max_degree, bin_edges,
+                   min_coverage, der_components, store_dir)
+    if n_jobs == 1:
+        results = (_score_recordings(args) for args in args_gen())
+    else:
+        # Records logged by workers are passed back to the handlers of the
+        # main process via a queue.
+        queue = Queue()
+        root = logging.getLogger()
+        listener = QueueListener(queue, root.handlers)
+        listener.start()
+        pool = Pool(n_jobs, initializer=_init_worker,
+                    initargs=(queue, root.getEffectiveLevel()))
+    try:
+        if n_jobs != 1:
+            # Parse references and UEM once, in parallel, into memory-mapped
+            # arrays, which workers attach to rather than each parsing the
+            # references or receiving copies of them.
+            store_dir = tempfile.mkdtemp(prefix='dscore_ref_')
+            fid_to_rttm_fn = {}
+            for fid in fid_to_systems:
+                ref_rttm_fn = os.path.join(ref_rttm_dir, fid + '.rttm')
+                if os.path.exists(ref_rttm_fn):
+                    fid_to_rttm_fn[fid] = ref_rttm_fn
+            ReferenceStore.create(store_dir, fid_to_rttm_fn, uem_fn,
+                                  pool=pool)
+            results = pool.imap(_score_recordings, args_gen())
+        for rows, stats in results:
+            if stats is not None:
+                # Aggregate stats across workers.
+                profiler.merge(stats)
+            for row in rows:
+                yield row
+    finally:
+        if n_jobs != 1:
+            pool.close()
+            pool.join()
+            listener.stop()
+            if store_dir is not None:
+                shutil.rmtree(store_dir, ignore_errors=True)
 
 
 def score_recordings(fids, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps,
-                    step, n_jobs=1):
+                    step, n_jobs=1, profiler=None, uem_fn=None,
+                    mode='diarization', max_degree=None, bin_edges=None,
+                    min_coverage=0.5, done=None, der_components=False):
     """Score batch of recordings.
 
     Parameters
@@ -104,8 +499,11 @@ def score_recordings(fids, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps,
     ref_rttm_dir : str
         Path to directory containing reference RTTM files.
 
-    sys_rttm_dur : str
-        Path to directory containing system RTTM files.
+    sys_rttm_dir : str or list of tuple
+        Path to directory containing system RTTM files. Alternately, a list
+        of (system name, directory) pairs, in which case each system is
+        scored against each reference, which is parsed and framed only once,
+        and each row is prefixed by the system name.
 
     collar : float, optional
         Size of forgiveness collar in seconds. Diarization output will not be
@@ -125,21 +523,213 @@ def score_recordings(fids, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps,
     n_jobs : int, optional
         Number of threads to use.
         (Default: 1)
+
+    profiler : scorelib.profiling.Profiler, optional
+        If not None, time and memory usage of each stage of scoring are
+        aggregated across all recordings and workers and recorded to this
+        profiler.
+        (Default: None)
+
+    uem_fn : str, optional
+        Path to UEM file specifying the scoring regions of each recording. If
+        not None, all metrics are computed only within these regions.
+        (Default: None)
+
+    mode : str, optional
+        What to evaluate. One of "diarization", "sad" (speech activity
+        detection), "overlap" (overlapped speech detection with system
+        overlap regions given directly), "derived_overlap" (overlapped
+        speech detection with system overlap regions derived from system
+        diarization), or "turns" (diarization by reference turn duration).
+        The metrics computed are those named by ``get_col_names``.
+        (Default: 'diarization')
+
+    max_degree : int, optional
+        If not None and ``mode`` is "diarization", additionally break down
+        metrics by overlap degree from 0 to ``max_degree``, appending the
+        columns returned by ``degree_col_names``.
+        (Default: None)
+
+    bin_edges : list of float, optional
+        Edges in seconds of reference turn duration bins when ``mode`` is
+        "turns". If None, ``scorelib.turn_duration.BIN_EDGES``.
+        (Default: None)
+
+    min_coverage : float, optional
+        Proportion of a reference turn that must be attributed to the correct
+        speaker for it to count as detected when ``mode`` is "turns".
+        (Default: 0.5)
+
+    done : set of tuple, optional
+        (System name, file id) pairs to skip; e.g., those already scored by
+        an interrupted sweep. Only relevant if ``sys_rttm_dir`` is a list of
+        systems.
+        (Default: None)
+
+    der_components : bool, optional
+        If True and ``mode`` is "diarization", additionally output all
+        quantities reported by ``md-eval.pl``, appending the columns
+        ``DER_COMPONENT_COL_NAMES``.
+        (Default: False)
     """
-    def args_gen():
-        for fid in fids:
-            yield (fid, ref_rttm_dir, sys_rttm_dir, collar, ignore_overlaps,
-                   step)
-    if n_jobs == 1:
-        rows = [_score_recordings(args) for args in args_gen()]
-    else:
-        pool = Pool(n_jobs)
-        rows = pool.map(_score_recordings, args_gen())
-    rows = [row for row in rows if row]
-    return rows
+    return list(iter_scores(fids, ref_rttm_dir, sys_rttm_dir, collar,
+                            ignore_overlaps, step, n_jobs, profiler, uem_fn,
+                            mode, max_degree, bin_edges, min_coverage, done,
+                            der_components))
+
 
+def append_overlap_total(rows, by_system=False):
+    """Yield overlap detection ``rows``, followed by a row with file id "ALL"
+    containing metrics pooled over all files.
+
+    If ``by_system`` is True, rows begin with a system name and one pooled
+    row is yielded per system.
+    """
+    system_to_totals = OrderedDict()
+    for row in rows:
+        system = row[0] if by_system else None
+        totals = system_to_totals.setdefault(system, [0.0, 0.0, 0.0])
+        ref_dur, miss, fa = row[-3:]
+        hit_dur = ref_dur - miss
+        totals[0] += ref_dur
+        totals[1] += hit_dur + fa
+        totals[2] += hit_dur
+        yield row
+    if not system_to_totals:
+        system_to_totals[None] = [0.0, 0.0, 0.0]
+    for system, totals in system_to_totals.items():
+        row = ['ALL'] + list(overlap_metrics_from_durations(*totals))
+        yield [system] + row if by_system else row
+
+
+def append_turn_duration_total(rows, by_system=False):
+    """Yield turn duration ``rows``, followed by a row with file id "ALL"
+    containing metrics pooled over all files.
+
+    If ``by_system`` is True, rows begin with a system name and one pooled
+    row is yielded per system.
+    """
+    n_id_cols = 2 if by_system else 1
+    system_to_totals = OrderedDict()
+    for row in rows:
+        # Recover counts of turns, scored time, missed and confused time,
+        # and detected turns for each bin.
+        n_turns, ref_time, miss, conf, detection = np.nan_to_num(
+            np.array(row[n_id_cols:], dtype='float64').reshape(-1, 5).T)
+        counts = np.array([n_turns, ref_time, miss*ref_time,
+                           conf*ref_time, detection*n_turns])
+        system = row[0] if by_system else None
+        if system in system_to_totals:
+            counts += system_to_totals[system]
+        system_to_totals[system] = counts
+        yield row
+    for system, totals in system_to_totals.items():
+        n_turns, ref_time, miss, conf, detected = totals
+        row = [system, 'ALL'] if by_system else ['ALL']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for bin_metrics in zip(n_turns.astype('int64'), ref_time,
+                                   miss / ref_time, conf / ref_time,
+                                   detected / n_turns):
+                row.extend(bin_metrics)
+        yield row
 
-def write_dataframe(fn, rows, additional_columns=None, enc='utf-8'):
+
+COL_NAMES = ['FID', # File id.
+             'DER', # Diarization error rate.
+             'B3Precision', # B-cubed precision.
+             'B3Recall', # B-cubed recall.
+             'B3F1', # B-cubed F1.
+             'TauRefSys', # Goodman-Kruskal tau ref --> sys.
+             'TauSysRef', # Goodman-Kruskal tau sys --> ref.
+             'CE', # H(ref | sys).
+             'MI', # Mutual information between ref and sys.
+             'NMI', # Normalized mutual information between ref/sys.
+            ]
+SAD_COL_NAMES = ['FID', # File id.
+                 'Miss', # Percent of speech missed.
+                 'FA', # Percent of non-speech detected as speech.
+                 'DCF', # Detection cost function.
+                 'Accuracy', # Percent of time correctly classified.
+                ]
+OVERLAP_COL_NAMES = ['FID', # File id.
+                     'Precision', # Proportion of sys overlap that is correct.
+                     'Recall', # Proportion of ref overlap detected.
+                     'F1', # Harmonic mean of precision and recall.
+                     'RefOverlap', # Reference overlap in seconds.
+                     'Miss', # Reference overlap not detected in seconds.
+                     'FA', # False alarm overlap in seconds.
+                    ]
+DER_COMPONENT_COL_NAMES = [
+    'EvalTime', # Evaluated time in seconds.
+    'EvalSpeech', # Evaluated speech in seconds.
+    'ScoredTime', # Scored time in seconds.
+    'ScoredSpeech', # Scored speech in seconds.
+    'MissedSpeech', # Missed speech in seconds.
+    'FASpeech', # False alarm speech in seconds.
+    'ScoredSpeakerTime', # Scored speaker time in seconds.
+    'MissedSpeakerTime', # Missed speaker time in seconds.
+    'FASpeakerTime', # False alarm speaker time in seconds.
+    'SpeakerErrorTime', # Confused speaker time in seconds.
+    ]
+MODE_TO_RANK_BY = {
+    'diarization' : 'DER',
+    'sad' : 'DCF',
+    'overlap' : 'F1',
+    'derived_overlap' : 'F1',
+    }
+MODE_TO_COL_NAMES = {
+    'diarization' : COL_NAMES,
+    'sad' : SAD_COL_NAMES,
+    'overlap' : OVERLAP_COL_NAMES,
+    'derived_overlap' : OVERLAP_COL_NAMES,
+    'turns' : ['FID'],
+    }
+
+
+def degree_col_names(max_degree):
+    """Return names of columns breaking down metrics by overlap degree."""
+    col_names = []
+    for degree in range(max_degree + 1):
+        prefix = 'N%d' % degree
+        col_names.extend(prefix + col_name for col_name in
+                         ['Miss', 'FA', 'Conf'] + COL_NAMES[2:])
+    return col_names
+
+
+def turn_bin_col_names(bin_edges=None):
+    """Return names of columns of metrics for reference turn duration bins.
+    """
+    if bin_edges is None:
+        bin_edges = BIN_EDGES
+    col_names = []
+    for ii in range(len(bin_edges) + 1):
+        prefix = 'D%d' % ii
+        col_names.extend(prefix + col_name for col_name in
+                         ['NTurns', 'RefTime', 'Miss', 'Conf', 'Detection'])
+    return col_names
+
+
+def get_col_names(mode='diarization', max_degree=None, bin_edges=None,
+                  by_system=False, der_components=False):
+    """Return names of columns of rows scored in ``mode``.
+
+    If ``by_system`` is True, the names are preceded by "System".
+    """
+    col_names = MODE_TO_COL_NAMES[mode]
+    if mode == 'diarization':
+        if max_degree is not None:
+            col_names = col_names + degree_col_names(max_degree)
+        if der_components:
+            col_names = col_names + DER_COMPONENT_COL_NAMES
+    elif mode == 'turns':
+        col_names = col_names + turn_bin_col_names(bin_edges)
+    if by_system:
+        col_names = ['System'] + col_names
+    return col_names
+
+
+def write_dataframe(fn, rows, additional_columns=None, enc='utf-8', fmt=None,
+                    col_names=None):
     """Write scores to dataframe.
 
     Parameters
@@ -147,8 +737,9 @@ def write_dataframe(fn, rows, additional_columns=None, enc='utf-8'):
     fn : str
         Output dataframe.
 
-    rows : list of tuple
-        Rows of dataframe.
+    rows : iterable of list
+        Rows of dataframe. May be a generator, in which case rows are written
+        as they are produced.
 
     additonal_columns : list of tuple, optional
         List of column name/value pairs specifying additional columns to be
@@ -158,34 +749,23 @@ def write_dataframe(fn, rows, additional_columns=None, enc='utf-8'):
     enc : str, optional
         Character encoding.
         (Default: 'utf-8')
-    """
-    with open(fn, 'wb') as f:
-        def write_line(vals):
-            vals = map(str, vals)
-            line = '\t'.join(vals)
-            f.write(line.encode(enc))
-            f.write('\n')
-
-        # Write header.
-        col_names = ['DER', # Diarization error rate.
-                     'B3Precision', # B-cubed precision.
-                     'B3Recall', # B-cubed recall.
-                     'B3F1', # B-cubed F1.
-                     'TauRefSys', # Goodman-Kruskal tau ref --> sys.
-                     'TauSysRef', # Goodman-Kruskal tau sys --> ref.
-                     'CE', # H(ref | sys).
-                     'MI', # Mutual information between ref and sys.
-                     'NMI', # Normalized mutual information between ref/sys.
-                    ]
-        if additional_columns:
-            col_names.extend(col_name for col_name, val in additional_columns)
-        write_line(col_names)
 
-        # Write rows.
-        for row in rows:
-            if additional_columns:
-                row.extend(val for col_name, val in additional_columns)
-            write_line(row)
+    fmt : str, optional
+        Output format. One of "tsv", "jsonl", "npy", "npz", "parquet", or
+        "arrow". If None, determined from the extension of ``fn``, defaulting
+        to "tsv".
+        (Default: None)
+
+    col_names : list of str, optional
+        Names of the columns of ``rows``. If None, ``COL_NAMES``.
+        (Default: None)
+    """
+    col_names = list(COL_NAMES if col_names is None else col_names)
+    if additional_columns:
+        col_names.extend(col_name for col_name, val in additional_columns)
+        vals = [val for col_name, val in additional_columns]
+        rows = (list(row) + vals for row in rows)
+    _write_dataframe(fn, col_names, rows, fmt, enc)
 
 
 def parse_additional_columns(spec_str):
@@ -219,12 +799,64 @@ def parse_additional_columns(spec_str):
         return [pair.split('=') for pair in spec_str.split(';')]
 
 
-def _get_fids(ref_rttm_dir, sys_rttm_dir):
+def load_systems(fn):
+    """Load manifest of systems.
+
+    Each line of the manifest contains a system name followed by the
+    directory containing its RTTM files, separated by whitespace. Blank lines
+    are ignored.
+
+    Returns
+    -------
+    systems : list of tuple
+        List of (system name, directory) pairs.
+    """
+    systems = []
+    with open(fn, 'rb') as f:
+        for line in f:
+            fields = line.decode('utf-8').split()
+            if not fields:
+                continue
+            if len(fields) != 2:
+                raise ValueError(
+                    'Line must contain a system name and directory: "%s"' %
+                    line.decode('utf-8').strip())
+            systems.append((fields[0], fields[1]))
+    return systems
+
+
+def _journaled(rows, journal):
+    """Yield rows recorded in ``journal``, followed by ``rows``, which are
+    recorded as they are yielded.
+    """
+    for row in journal.rows:
+        yield row
+    for row in rows:
+        journal.append(row)
+        yield row
+
+
+def _with_params(rows, systems, scored_rows):
+    """Yield ``rows`` with parameter values of their systems inserted after
+    the system name, appending the original rows to ``scored_rows``.
+    """
+    name_to_params = dict((name, params) for name, _, params in systems)
+    for row in rows:
+        scored_rows.append(row)
+        yield row[:1] + list(name_to_params[row[0]]) + row[1:]
+
+
+def _get_fids(ref_rttm_dir, sys_rttm_dirs):
+    """Return ids of files in ``ref_rttm_dir`` and any of ``sys_rttm_dirs``.
+    """
     ref_bns = [os.path.basename(fn)
                for fn in glob.glob(os.path.join(ref_rttm_dir, '*.rttm'))]
-    sys_bns = [os.path.basename(fn)
-               for fn in glob.glob(os.path.join(sys_rttm_dir, '*.rttm'))]
-    bns = set(ref_bns) & set(sys_bns)
+    sys_bns = set()
+    for sys_rttm_dir in sys_rttm_dirs:
+        sys_bns.update(
+            os.path.basename(fn)
+            for fn in glob.glob(os.path.join(sys_rttm_dir, '*.rttm')))
+    bns = set(ref_bns) & sys_bns
     return sorted([bn.replace('.rttm', '') for bn in bns])
 
 
@@ -232,13 +864,37 @@ if __name__ == '__main__':
     # Parse command line arguments.
     parser = argparse.ArgumentParser(
         description='Score RTTMs.', add_help=True,
-        usage='%(prog)s [options] scoresf ref_rttm_dir sys_rttm_dir')
+        usage='%(prog)s [options] scoresf ref_rttm_dir '
+              '[sys_rttm_dir ...]')
     parser.add_argument(
         'scoresf', nargs=None, help='output dataframe')
     parser.add_argument(
         'ref_rttm_dir', nargs=None, help='reference RTTM directory')
     parser.add_argument(
-        'sys_rttm_dir', nargs=None, help='system RTTM directory')
+        'sys_rttm_dirs', nargs='*', metavar='sys_rttm_dir',
+        help='system RTTM directory')
+    parser.add_argument(
+        '--systems', nargs=None, default=None, metavar='FILE',
+        dest='systemsf',
+        help='manifest of system names and RTTM directories (Default: None)')
+    parser.add_argument(
+        '--sweep', nargs=None, default=None, metavar='ROOT',
+        dest='sweep_root',
+        help='score every directory of RTTMs under ROOT as a system '
+             '(Default: None)')
+    parser.add_argument(
+        '--sweep_pattern', nargs=None, default=None, metavar='PATTERN',
+        help='with --sweep, path pattern such as "nc{NClusters}/thr{Thresh}" '
+             'from which parameter columns are parsed (Default: None)')
+    parser.add_argument(
+        '--leaderboard', nargs=None, default=None, metavar='FILE',
+        dest='leaderboardf',
+        help='with --sweep, write systems ranked by --rank_by to FILE '
+             '(Default: None)')
+    parser.add_argument(
+        '--rank_by', nargs=None, default=None, metavar='COL',
+        help='metric by which --leaderboard ranks systems (Default: DER, '
+             'DCF with --sad, F1 with --overlap)')
     parser.add_argument(
         '-S', nargs=None, default=None, metavar='FILE', dest='scpf',
         help='set script file (Default: None)')
@@ -253,12 +909,64 @@ if __name__ == '__main__':
     parser.add_argument(
         '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
         help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument(
+        '--sad', action='store_const', const='sad', default='diarization',
+        dest='mode',
+        help='evaluate speech activity detection rather than diarization')
+    mode_group.add_argument(
+        '--overlap', action='store_const', const='overlap', dest='mode',
+        help='evaluate overlapped speech detection rather than diarization')
+    mode_group.add_argument(
+        '--turns', action='store_const', const='turns', dest='mode',
+        help='score diarization by reference turn duration')
+    parser.add_argument(
+        '--derive_sys_overlaps', action='store_true', default=False,
+        help='with --overlap, derive system overlap regions from system '
+             'diarization')
+    parser.add_argument(
+        '--turn_bins', nargs=None, default=None, metavar='EDGES',
+        help='comma delimited edges in seconds of turn duration bins for '
+             '--turns (Default: %s)' % ','.join('%g' % edge
+                                                for edge in BIN_EDGES))
+    parser.add_argument(
+        '--min_coverage', nargs=None, default=0.5, type=float,
+        metavar='FLOAT',
+        help='proportion of turn that must be correct for it to count as '
+             'detected with --turns (Default: %(default)s)')
+    parser.add_argument(
+        '--max_degree', nargs=None, default=None, type=int, metavar='N',
+        help='break down metrics by number of reference speakers from 0 to '
+             'N (Default: None)')
+    parser.add_argument(
+        '--der_components', action='store_true', default=False,
+        help='output scored, missed, false alarm, and speaker error time '
+             'reported by md-eval.pl')
     parser.add_argument(
         '--additional_columns', nargs=None, default='',
         help='additional columns')
     parser.add_argument(
         '-j', nargs=None, default=1, type=int, metavar='N', dest='n_jobs',
         help='set number of threads to use (Default: 1)')
+    parser.add_argument(
+        '--format', nargs=None, default=None, choices=FORMATS, dest='fmt',
+        help='output format (Default: determined from extension of '
+             'scoresf, else tsv)')
+    parser.add_argument(
+        '--log_json', nargs=None, default=None, metavar='FILE',
+        help='write log records, including per-file timing and metrics, to '
+             'FILE as JSON Lines (Default: None)')
+    parser.add_argument(
+        '--profile', action='store_true', default=False,
+        help='report time and memory usage of each stage of scoring, '
+             'aggregated across workers, to STDERR')
+    parser.add_argument(
+        '--profile_json', nargs=None, default=None, metavar='FILE',
+        help='write profiling results to JSON file; implies --profile '
+             '(Default: None)')
     parser.add_argument(
         '--version', action='version',
         version='%(prog)s ' + VERSION)
@@ -266,14 +974,142 @@ if __name__ == '__main__':
         parser.print_help()
         sys.exit(1)
     args = parser.parse_args()
+    # Check output formats before any scoring, and before workers start.
+    try:
+        check_format(args.scoresf, args.fmt)
+        if args.leaderboardf is not None:
+            check_format(args.leaderboardf)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+    # Buffer console output, which may be voluminous for large batches.
+    configure_logger(logger, buffer_size=64)
+    if args.log_json is not None:
+        add_json_handler(logger, args.log_json)
+
+    sweep_systems, param_names = None, []
+    if args.sweep_root is not None:
+        if args.systemsf is not None or args.sys_rttm_dirs:
+            parser.error('--sweep cannot be used with system directories or '
+                         '--systems')
+        try:
+            sweep_systems, param_names = discover_systems(
+                args.sweep_root, args.sweep_pattern)
+        except ValueError as e:
+            parser.error(str(e))
+        if not sweep_systems:
+            parser.error('no system directories found under %s' %
+                         args.sweep_root)
+        systems = [(name, sys_rttm_dir)
+                   for name, sys_rttm_dir, _ in sweep_systems]
+        sys_rttm_dirs = [sys_rttm_dir for _, sys_rttm_dir in systems]
+    elif (args.sweep_pattern is not None or args.leaderboardf is not None or
+          args.rank_by is not None):
+        parser.error('--sweep_pattern, --leaderboard, and --rank_by require '
+                     '--sweep')
+    elif args.systemsf is None and len(args.sys_rttm_dirs) == 1:
+        # Single system; output has no System column.
+        systems = args.sys_rttm_dirs[0]
+        sys_rttm_dirs = [systems]
+    else:
+        systems = []
+        if args.systemsf is not None:
+            systems.extend(load_systems(args.systemsf))
+        for sys_rttm_dir in args.sys_rttm_dirs:
+            name = os.path.basename(os.path.normpath(sys_rttm_dir))
+            systems.append((name, sys_rttm_dir))
+        if not systems:
+            parser.error('no system RTTM directories specified')
+        names = [name for name, _ in systems]
+        if len(set(names)) != len(names):
+            parser.error('system names must be unique: %s' % ', '.join(names))
+        sys_rttm_dirs = [sys_rttm_dir for _, sys_rttm_dir in systems]
+    by_system = (args.sweep_root is not None or args.systemsf is not None or
+                 len(args.sys_rttm_dirs) != 1)
 
     if args.scpf is not None:
         with open(args.scpf, 'rb') as f:
-            fids = [line.strip() for line in f]
+            fids = [line.decode('utf-8').strip() for line in f]
+            fids = [fid for fid in fids if fid]
     else:
-        fids = _get_fids(args.ref_rttm_dir, args.sys_rttm_dir)
-    rows = score_recordings(
-        fids, args.ref_rttm_dir, args.sys_rttm_dir, args.collar,
-        args.ignore_overlaps, args.step, args.n_jobs)
+        fids = _get_fids(args.ref_rttm_dir, sys_rttm_dirs)
+    profiler = None
+    if args.profile or args.profile_json is not None:
+        profiler = Profiler()
+    mode = args.mode
+    if args.derive_sys_overlaps:
+        if mode != 'overlap':
+            parser.error('--derive_sys_overlaps requires --overlap')
+        mode = 'derived_overlap'
+    if args.max_degree is not None and mode != 'diarization':
+        parser.error('--max_degree cannot be used with --sad, --overlap, or '
+                     '--turns')
+    if args.der_components and mode != 'diarization':
+        parser.error('--der_components cannot be used with --sad, --overlap, '
+                     'or --turns')
+    bin_edges = None
+    if args.turn_bins is not None:
+        bin_edges = [float(edge) for edge in args.turn_bins.split(',')]
+        if sorted(bin_edges) != bin_edges:
+            parser.error('--turn_bins must be increasing')
+    col_names = get_col_names(
+        mode, args.max_degree, bin_edges, by_system, args.der_components)
+    journal = None
+    if sweep_systems is not None:
+        rank_by = args.rank_by or MODE_TO_RANK_BY.get(mode)
+        if args.leaderboardf is not None and rank_by not in col_names[2:]:
+            parser.error('--rank_by must be one of: %s' %
+                         ', '.join(col_names[2:]))
+        # Scored rows are journaled so that an interrupted sweep resumes
+        # where it left off. The sweep root, pattern, and systems are
+        # included so that a journal is never resumed for a different sweep.
+        settings = {
+            'sweep_root': os.path.abspath(args.sweep_root),
+            'sweep_pattern': args.sweep_pattern,
+            'systems': [[name, os.path.abspath(sys_rttm_dir)]
+                        for name, sys_rttm_dir in sorted(systems)],
+            'ref_rttm_dir': os.path.abspath(args.ref_rttm_dir),
+            'collar': args.collar, 'ignore_overlaps': args.ignore_overlaps,
+            'step': args.step, 'uem': args.uemf, 'mode': mode,
+            'max_degree': args.max_degree, 'bin_edges': bin_edges,
+            'min_coverage': args.min_coverage,
+            'der_components': args.der_components}
+        try:
+            journal = SweepJournal(args.scoresf + '.journal', settings)
+        except ValueError as e:
+            parser.error(str(e))
+        if journal.rows:
+            logger.info('Resuming sweep from %d rows in %s.' %
+                        (len(journal.rows), journal.fn))
+    rows = iter_scores(
+        fids, args.ref_rttm_dir, systems, args.collar,
+        args.ignore_overlaps, args.step, args.n_jobs, profiler, args.uemf,
+        mode, args.max_degree, bin_edges, args.min_coverage,
+        None if journal is None else journal.done(), args.der_components)
+    if journal is not None:
+        rows = _journaled(rows, journal)
+    if mode in ('overlap', 'derived_overlap'):
+        rows = append_overlap_total(rows, by_system)
+    elif mode == 'turns':
+        rows = append_turn_duration_total(rows, by_system)
+    if sweep_systems is not None:
+        # Keep rows for the leaderboard and insert parameter columns.
+        scored_rows = []
+        rows = _with_params(rows, sweep_systems, scored_rows)
+        col_names = col_names[:1] + param_names + col_names[1:]
     additional_columns = parse_additional_columns(args.additional_columns)
-    write_dataframe(args.scoresf, rows, additional_columns)
+    write_dataframe(args.scoresf, rows, additional_columns, fmt=args.fmt,
+                    col_names=col_names)
+    if journal is not None:
+        if args.leaderboardf is not None:
+            board_rows, board_col_names = leaderboard(
+                scored_rows, get_col_names(
+                    mode, args.max_degree, bin_edges, by_system,
+                    args.der_components),
+                rank_by, param_names, sweep_systems)
+            _write_dataframe(args.leaderboardf, board_col_names, board_rows)
+        journal.close(remove=True)
+    if profiler is not None:
+        print(profiler.format_table(), file=sys.stderr)
+        if args.profile_json is not None:
+            profiler.to_json(args.profile_json)
@@ -0,0 +1,194 @@
+"""Functions for measuring agreement between diarization systems."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from multiprocessing import Pool
+
+import numpy as np
+
+from . import metrics
+from .score import (_activity_to_labels, _as_rec_id_to_turns, _cm_metrics,
+                    _n_frames, _turn_arrays, _uem_dur, turns_to_activity,
+                    uem_mask)
+
+__all__ = ['frame_systems', 'pair_agreement', 'pairwise_agreement',
+           'AGREEMENT_FIELDS']
+
+
+# Names of metrics returned for each pair of systems by ``pair_agreement``.
+AGREEMENT_FIELDS = ['disagreement', 'b3_precision', 'b3_recall', 'b3_f1',
+                    'tau_1_2', 'tau_2_1', 'h_1_2', 'mi', 'nmi']
+
+
+def frame_systems(systems, step=0.010, uem=None):
+    """Return speaker activity matrices and frame labels of several systems.
+
+    All systems are framed on a common grid for each recording, which extends
+    to the end of the last scoring region or, absent a UEM, to the end of the
+    last turn of any system. Recordings missing from a system are treated as
+    non-speech.
+
+    Parameters
+    ----------
+    systems : list of dict or list
+        Diarizations of each system. Each is either a mapping from recording
+        ids to speaker turns (as returned by ``rttm_to_turns``) or the speaker
+        turns of a single recording.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording. If given, only frames within these regions are
+        kept.
+        (Default: None)
+
+    Returns
+    -------
+    Xs : list of list of ndarray
+        For each system, its speaker activity matrix on each recording, in
+        sorted order of recording id.
+
+    labels : list of ndarray
+        For each system, its frame-level labels concatenated across
+        recordings, with frames from different recordings having distinct
+        labels.
+    """
+    rec_id_to_turns_list = [_as_rec_id_to_turns(turns) for turns in systems]
+    rec_id_to_uem = {} if uem is None else _as_rec_id_to_turns(uem)
+    rec_ids = sorted(set().union(*rec_id_to_turns_list))
+    Xs = [[] for _ in systems]
+    labels = [[] for _ in systems]
+    max_labels = [0]*len(systems)
+    for rec_id in rec_ids:
+        uem = rec_id_to_uem.get(rec_id)
+        if uem is None:
+            dur = max(_turn_arrays(rec_id_to_turns.get(rec_id, []))[1].max(
+                initial=0) for rec_id_to_turns in rec_id_to_turns_list)
+            n_frames = _n_frames(dur, step)
+            mask = slice(0, n_frames)
+        else:
+            n_frames = _n_frames(_uem_dur(uem), step)
+            mask = uem_mask(uem, n_frames, step)
+        for ii, rec_id_to_turns in enumerate(rec_id_to_turns_list):
+            X = turns_to_activity(
+                rec_id_to_turns.get(rec_id, []), n_frames, step)[1][mask]
+            labels_ = _activity_to_labels(X) + max_labels[ii]
+            Xs[ii].append(X)
+            labels[ii].append(labels_)
+            max_labels[ii] = labels_.max(initial=max_labels[ii])
+    labels = [np.concatenate(labels_) if labels_ else np.zeros(0, 'int64')
+              for labels_ in labels]
+    return Xs, labels
+
+
+def pair_agreement(Xs1, Xs2, labels1, labels2, nats=False):
+    """Return agreement metrics between two systems framed by
+    ``frame_systems``.
+
+    The disagreement rate is computed as DER would be, treating either system
+    as the reference: speakers of the two systems are mapped one-to-one for
+    each recording so as to maximize their total overlap, and the missed,
+    false alarm, and confused speaker time are summed. As these sum to the
+    same total regardless of which system is the reference, they are
+    expressed as a percent of the mean of the two systems' speaker times so
+    that the rate is symmetric. No collar is applied and overlaps are scored.
+
+    The remaining metrics are the clustering metrics of ``score``, with the
+    first system in place of the reference.
+
+    Returns
+    -------
+    metrics : tuple
+        Percent disagreement rate, B-cubed precision, recall, and F1,
+        Goodman-Kruskal tau in both directions, conditional entropy of the
+        first system given the second, mutual information, and normalized
+        mutual information, named as in ``AGREEMENT_FIELDS``.
+    """
+    n_speech = n_errors = 0
+    for X1, X2 in zip(Xs1, Xs2):
+        n_miss, n_fa, n_conf = metrics.frame_errors(X1, X2)
+        n_speech += X1.sum() + X2.sum()
+        n_errors += n_miss.sum() + n_fa.sum() + n_conf.sum()
+    disagreement = 100.*n_errors / max(n_speech / 2., 1)
+    if labels1.size == 0:
+        return (disagreement, ) + (np.nan, )*(len(AGREEMENT_FIELDS) - 1)
+    cm = metrics.contingency_matrix(labels1, labels2)[0]
+    return (disagreement, ) + _cm_metrics(cm, nats)
+
+
+# Frames of all systems, shared by pool workers.
+_FRAMES = None
+
+
+def _init_worker(frames):
+    global _FRAMES
+    _FRAMES = frames
+
+
+def _pair_agreement(args):
+    ii, jj, nats = args
+    Xs, labels = _FRAMES
+    return pair_agreement(Xs[ii], Xs[jj], labels[ii], labels[jj], nats)
+
+
+def pairwise_agreement(systems, step=0.010, uem=None, nats=False, n_jobs=1):
+    """Return agreement metrics between all pairs of systems.
+
+    Each system is framed only once by ``frame_systems`` and its frames
+    shared by all pairs it belongs to. Pairs are scored by ``pair_agreement``
+    in parallel across ``n_jobs`` processes, each of which receives the
+    frames once when it starts.
+
+    Parameters
+    ----------
+    systems : list of dict or list
+        Diarizations of each system, as for ``frame_systems``.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions, as for ``frame_systems``.
+        (Default: None)
+
+    nats : bool, optional
+        If True, use nats as unit for information theoretic metrics.
+        Otherwise, use bits.
+        (Default: False)
+
+    n_jobs : int, optional
+        Number of jobs to run in parallel.
+        (Default: 1)
+
+    Returns
+    -------
+    results : list of tuple
+        For each pair ``i < j`` of systems, in lexicographic order, a tuple
+        ``(i, j, metrics)``, where ``metrics`` is as returned by
+        ``pair_agreement``.
+    """
+    frames = frame_systems(systems, step, uem)
+    pairs = [(ii, jj) for ii in range(len(systems))
+             for jj in range(ii + 1, len(systems))]
+    args = [(ii, jj, nats) for ii, jj in pairs]
+    if n_jobs == 1:
+        _init_worker(frames)
+        try:
+            results = [_pair_agreement(args_) for args_ in args]
+        finally:
+            _init_worker(None)
+    else:
+        pool = Pool(n_jobs, initializer=_init_worker, initargs=(frames, ))
+        try:
+            results = pool.map(_pair_agreement, args)
+        finally:
+            pool.close()
+            pool.join()
+    return [(ii, jj, metrics_)
+            for (ii, jj), metrics_ in zip(pairs, results)]
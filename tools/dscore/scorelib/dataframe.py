@@ -0,0 +1,300 @@
+"""Functions for writing score dataframes in a variety of formats."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import math
+import os
+import sys
+
+__all__ = ['check_format', 'guess_format', 'write_dataframe',
+           'DataFrameWriter', 'FORMATS']
+
+
+# Supported output formats. Of these, "tsv", "jsonl", "parquet", and "arrow"
+# are streamed to disk batch by batch, while "npy" and "npz" are accumulated
+# column-wise in memory and written on close. "parquet" and "arrow" require
+# pyarrow. NumPy is imported where used so that the command line tools may
+# import these from their argument parsers without loading it.
+FORMATS = ['tsv', 'jsonl', 'npy', 'npz', 'parquet', 'arrow']
+EXT_TO_FORMAT = {'.tsv': 'tsv',
+                 '.df': 'tsv',
+                 '.txt': 'tsv',
+                 '.jsonl': 'jsonl',
+                 '.json': 'jsonl',
+                 '.npy': 'npy',
+                 '.npz': 'npz',
+                 '.parquet': 'parquet',
+                 '.arrow': 'arrow',
+                 '.feather': 'arrow',
+                }
+
+
+def guess_format(fn, default='tsv'):
+    """Return output format implied by extension of ``fn``.
+
+    Parameters
+    ----------
+    fn : str
+        Path to output file.
+
+    default : str, optional
+        Format to return if extension is not recognized.
+        (Default: 'tsv')
+
+    Returns
+    -------
+    fmt : str
+        Output format.
+    """
+    ext = os.path.splitext(fn)[1].lower()
+    return EXT_TO_FORMAT.get(ext, default)
+
+
+def check_format(fn, fmt=None):
+    """Check that output format is supported and its dependencies installed.
+
+    Command line tools call this while parsing arguments, so that they fail
+    before any scoring is done.
+
+    Parameters
+    ----------
+    fn : str
+        Path to output file.
+
+    fmt : str, optional
+        Output format. If None, determined from the extension of ``fn``.
+        (Default: None)
+
+    Raises
+    ------
+    ValueError
+        If the format is not one of ``FORMATS``.
+
+    ImportError
+        If the format requires pyarrow and it is not installed.
+    """
+    if fmt is None:
+        fmt = guess_format(fn)
+    if fmt not in FORMATS:
+        raise ValueError('Unrecognized output format "%s". Must be one '
+                         'of: %s.' % (fmt, ', '.join(FORMATS)))
+    if fmt in ['parquet', 'arrow']:
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('Output format "%s" requires pyarrow.' % fmt)
+
+
+def _to_python(val):
+    """Convert NumPy scalars to Python scalars and NaN to None."""
+    import numpy as np
+    if isinstance(val, np.generic):
+        val = val.item()
+    if isinstance(val, float) and math.isnan(val):
+        return None
+    return val
+
+
+def _to_column(vals):
+    """Convert sequence of values to a typed ndarray."""
+    import numpy as np
+    col = np.asarray(vals)
+    if col.dtype.kind == 'O':
+        col = col.astype('U')
+    elif col.dtype.kind == 'S':
+        col = np.char.decode(col, 'utf-8')
+    return col
+
+
+class DataFrameWriter(object):
+    """Write rows of a score dataframe to disk in batches.
+
+    Rows may be passed one at a time via ``write_row`` or in bulk via
+    ``write_rows``; internally they are buffered and handed to the
+    underlying format ``batch_size`` rows at a time. Should be closed after
+    use, either explicitly via ``close`` or by using it as a context manager:
+
+        with DataFrameWriter('scores.parquet', col_names) as writer:
+            for row in rows:
+                writer.write_row(row)
+
+    Parameters
+    ----------
+    fn : str
+        Output file. For the text formats ("tsv" and "jsonl"), may be "-" to
+        write to STDOUT.
+
+    col_names : list of str
+        Column names.
+
+    fmt : str, optional
+        Output format. One of "tsv" (tab-delimited text), "jsonl" (JSON Lines;
+        one object per row), "npy" (NumPy structured array), "npz" (NumPy
+        archive with one array per column), "parquet" (Apache Parquet), or
+        "arrow" (Apache Arrow IPC file). If None, determined from the
+        extension of ``fn``, defaulting to "tsv".
+        (Default: None)
+
+    enc : str, optional
+        Character encoding for text formats.
+        (Default: 'utf-8')
+
+    batch_size : int, optional
+        Number of rows to buffer before writing.
+        (Default: 10000)
+    """
+    def __init__(self, fn, col_names, fmt=None, enc='utf-8',
+                 batch_size=10000):
+        if fmt is None:
+            fmt = guess_format(fn)
+        # Fail early rather than after the first batch has been scored.
+        check_format(fn, fmt)
+        self.fn = fn
+        self.col_names = list(col_names)
+        self.fmt = fmt
+        self.enc = enc
+        self.batch_size = batch_size
+        self._buffer = []
+        self._columns = [[] for _ in self.col_names]
+        self._arrow_writer = None
+        self._f = None
+        if fmt in ['tsv', 'jsonl']:
+            if fn == '-':
+                self._f = getattr(sys.stdout, 'buffer', sys.stdout)
+            else:
+                self._f = open(fn, 'wb')
+        if fmt == 'tsv':
+            self._write_tsv_line(self.col_names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_row(self, row):
+        """Write single row."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        """Write sequence of rows."""
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self):
+        """Write all buffered rows."""
+        if not self._buffer:
+            return
+        rows = self._buffer
+        self._buffer = []
+        if len(rows[0]) != len(self.col_names):
+            raise ValueError(
+                'Expected %d columns, but row has %d.' %
+                (len(self.col_names), len(rows[0])))
+        if self.fmt == 'tsv':
+            for row in rows:
+                self._write_tsv_line(row)
+        elif self.fmt == 'jsonl':
+            for row in rows:
+                record = dict((col_name, _to_python(val))
+                              for col_name, val in zip(self.col_names, row))
+                line = json.dumps(record, sort_keys=False) + '\n'
+                self._f.write(line.encode(self.enc))
+        else:
+            columns = [_to_column(vals) for vals in zip(*rows)]
+            if self.fmt in ['npy', 'npz']:
+                for col, batch in zip(self._columns, columns):
+                    col.append(batch)
+            else:
+                self._write_arrow_batch(columns)
+
+    def close(self):
+        """Write any remaining rows and close output file."""
+        self.flush()
+        if self.fmt in ['npy', 'npz']:
+            import numpy as np
+            columns = [np.concatenate(batches) if batches else np.zeros(0)
+                       for batches in self._columns]
+            if self.fmt == 'npz':
+                np.savez(self.fn, **dict(zip(self.col_names, columns)))
+            else:
+                np.save(self.fn, _to_structured_array(self.col_names, columns))
+            self._columns = [[] for _ in self.col_names]
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+            self._arrow_writer = None
+        if self._f is not None:
+            if self.fn == '-':
+                self._f.flush()
+            else:
+                self._f.close()
+            self._f = None
+
+    def _write_tsv_line(self, vals):
+        line = '\t'.join('%s' % val for val in vals) + '\n'
+        self._f.write(line.encode(self.enc))
+
+    def _write_arrow_batch(self, columns):
+        import pyarrow as pa
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(col, from_pandas=True) for col in columns],
+            self.col_names)
+        if self._arrow_writer is None:
+            if self.fmt == 'parquet':
+                import pyarrow.parquet as pq
+                self._arrow_writer = pq.ParquetWriter(self.fn, batch.schema)
+            else:
+                self._arrow_writer = pa.ipc.new_file(self.fn, batch.schema)
+        if self.fmt == 'parquet':
+            self._arrow_writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._arrow_writer.write_batch(batch)
+
+
+def _to_structured_array(col_names, columns):
+    """Combine columns into a single structured array."""
+    import numpy as np
+    n_rows = len(columns[0]) if columns else 0
+    dtype = [(str(col_name), col.dtype)
+             for col_name, col in zip(col_names, columns)]
+    arr = np.empty(n_rows, dtype=dtype)
+    for col_name, col in zip(col_names, columns):
+        arr[str(col_name)] = col
+    return arr
+
+
+def write_dataframe(fn, col_names, rows, fmt=None, enc='utf-8',
+                    batch_size=10000):
+    """Write rows of dataframe to ``fn``.
+
+    Parameters
+    ----------
+    fn : str
+        Output file.
+
+    col_names : list of str
+        Column names.
+
+    rows : iterable of list
+        Rows of dataframe. May be a generator, in which case rows are written
+        as they are produced.
+
+    fmt : str, optional
+        Output format. See ``DataFrameWriter`` for supported formats. If None,
+        determined from the extension of ``fn``, defaulting to "tsv".
+        (Default: None)
+
+    enc : str, optional
+        Character encoding for text formats.
+        (Default: 'utf-8')
+
+    batch_size : int, optional
+        Number of rows to buffer before writing.
+        (Default: 10000)
+    """
+    with DataFrameWriter(fn, col_names, fmt, enc, batch_size) as writer:
+        writer.write_rows(rows)
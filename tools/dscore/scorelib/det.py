@@ -0,0 +1,213 @@
+"""Functions for sweeping confidence thresholds over system output."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from . import metrics
+from .score import (_as_rec_id_to_turns, _ticks_to_frames, _turn_arrays,
+                    _turn_confidences, _turn_ticks, PreparedReference)
+
+__all__ = ['confidence_matrix', 'confidence_sweep', 'equal_error_rate']
+
+
+def confidence_matrix(turns, n_frames, step=0.010):
+    """Return frame-level speaker confidence matrix corresponding to turns.
+
+    Parameters
+    ----------
+    turns : list of Turn
+        Speaker turns. May also be a sequence of
+        (onset, offset, speaker_id, confidence) tuples.
+
+    n_frames : int
+        Number of frames.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    Returns
+    -------
+    speaker_classes : ndarray, (n_speakers,)
+        Speaker ids.
+
+    C : ndarray, (n_frames, n_speakers)
+        Matrix whose i,j-th entry is the maximum confidence of the turns of
+        the j-th speaker containing frame i or ``-inf`` if there are none.
+    """
+    speaker_ids = _turn_arrays(turns)[2]
+    onsets, offsets = _turn_ticks(turns)
+    confidences = _turn_confidences(turns)
+    if np.isnan(confidences).any():
+        raise ValueError('All system turns must have confidences.')
+    speaker_classes, speaker_class_inds = np.unique(
+        speaker_ids, return_inverse=True)
+    C = np.full((n_frames, speaker_classes.size), -np.inf)
+    bis = _ticks_to_frames(onsets, n_frames, step)
+    eis = _ticks_to_frames(offsets, n_frames, step)
+    for bi, ei, speaker_class_ind, confidence in zip(
+            bis, eis, speaker_class_inds, confidences):
+        C[bi:ei, speaker_class_ind] = np.maximum(
+            C[bi:ei, speaker_class_ind], confidence)
+    return speaker_classes, C
+
+
+def confidence_sweep(ref_turns, sys_turns, collar=0.250, ignore_overlaps=True,
+                     step=0.010, uem=None):
+    """Return DER components for every confidence threshold.
+
+    A system turn is retained at threshold ``t`` IFF its confidence is
+    ``>= t``. Rather than rescoring the system once per threshold, each
+    (frame, system speaker) pair is treated as an event that changes the
+    frame's missed, false alarm, and confused speaker counts by a fixed amount
+    when it is dropped. Sorting events by confidence and taking cumulative
+    sums then yields the counts at every distinct threshold in a single
+    sweep.
+
+    Frames are scored as in ``frame_der``. For tractability, reference and
+    system speakers are mapped once using the full (unthresholded) system
+    output, so that confusion at higher thresholds may be slightly
+    overestimated relative to rescoring; missed and false alarm speech are
+    exact.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns or the speaker turns of a single recording.
+
+    sys_turns : dict or list
+        System diarization in same format as ``ref_turns``. All turns must
+        have confidences.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+
+    Returns
+    -------
+    thresholds : ndarray, (n_thresholds,)
+        Thresholds in increasing order: each distinct confidence followed by
+        ``inf`` (all turns rejected).
+
+    n_miss : ndarray, (n_thresholds,)
+        Missed speaker time in frames at each threshold.
+
+    n_fa : ndarray, (n_thresholds,)
+        False alarm speaker time in frames at each threshold.
+
+    n_conf : ndarray, (n_thresholds,)
+        Speaker error (confusion) time in frames at each threshold.
+
+    n_ref : int
+        Scored reference speaker time in frames.
+    """
+    reference = PreparedReference(
+        ref_turns, collar, ignore_overlaps, step, uem)
+    sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+    n_ref = base_miss = base_fa = base_conf = 0
+    confidences = []
+    d_miss = []
+    d_fa = []
+    d_conf = []
+    for rec_id in reference.rec_ids:
+        rec = reference.recordings[rec_id]
+        scored = rec['scored']
+        ref_X = rec['X'][scored]
+        _, C = confidence_matrix(
+            sys_rec_id_to_turns.get(rec_id, []), scored.size, step)
+        C = C[scored]
+        sys_X = C > -np.inf
+
+        # Errors with all turns retained.
+        n_miss, n_fa, n_conf = metrics.frame_errors(ref_X, sys_X)
+        n_ref += ref_X.sum()
+        base_miss += n_miss.sum()
+        base_fa += n_fa.sum()
+        base_conf += n_conf.sum()
+
+        # Rank active system speakers within each frame by decreasing
+        # confidence. As the threshold increases, the speaker of rank k is
+        # dropped when k speakers remain, which is a miss if k does not
+        # exceed the number of reference speakers and otherwise removes a
+        # false alarm. Dropping a speaker that is mapped to an active
+        # reference speaker turns a correct frame into a confused or missed
+        # one.
+        n_frames, n_speakers = C.shape
+        order = np.argsort(-C, axis=1, kind='mergesort')
+        ranks = np.empty_like(order)
+        ranks[np.arange(n_frames)[:, None], order] = np.arange(
+            1, n_speakers + 1)
+        is_hit = np.zeros_like(sys_X)
+        ref_inds, sys_inds = metrics.speaker_mapping(ref_X, sys_X)
+        is_hit[:, sys_inds] = ref_X[:, ref_inds]
+        frame_inds, speaker_inds = np.nonzero(sys_X)
+        is_miss = (ranks[frame_inds, speaker_inds] <=
+                   ref_X[frame_inds].sum(axis=1))
+        is_hit = is_hit[frame_inds, speaker_inds]
+        confidences.append(C[frame_inds, speaker_inds])
+        d_miss.append(is_miss.astype('int64'))
+        d_fa.append(-(~is_miss).astype('int64'))
+        d_conf.append(is_hit.astype('int64') - is_miss)
+
+    confidences = np.concatenate(confidences)
+    order = np.argsort(confidences, kind='mergesort')
+    confidences = confidences[order]
+    thresholds = np.concatenate([np.unique(confidences), [np.inf]])
+    # Number of events dropped at each threshold.
+    n_dropped = np.searchsorted(confidences, thresholds, side='left')
+    def sweep(base, deltas):
+        cum = np.concatenate([[0], np.cumsum(np.concatenate(deltas)[order])])
+        return base + cum[n_dropped]
+    return (thresholds, sweep(base_miss, d_miss), sweep(base_fa, d_fa),
+            sweep(base_conf, d_conf), n_ref)
+
+
+def equal_error_rate(thresholds, n_miss, n_fa, n_ref):
+    """Return operating point at which miss and false alarm rates are equal.
+
+    Parameters
+    ----------
+    thresholds : ndarray, (n_thresholds,)
+        Thresholds.
+
+    n_miss : ndarray, (n_thresholds,)
+        Missed speaker time at each threshold.
+
+    n_fa : ndarray, (n_thresholds,)
+        False alarm speaker time at each threshold.
+
+    n_ref : int
+        Scored reference speaker time.
+
+    Returns
+    -------
+    threshold : float
+        Threshold of the operating point whose miss and false alarm rates are
+        closest.
+
+    eer : float
+        Mean of the percent miss and false alarm rates at this threshold.
+    """
+    miss_rate = 100.*n_miss / max(n_ref, 1)
+    fa_rate = 100.*n_fa / max(n_ref, 1)
+    ii = np.argmin(np.abs(miss_rate - fa_rate))
+    return thresholds[ii], (miss_rate[ii] + fa_rate[ii]) / 2.
@@ -0,0 +1,382 @@
+"""Incremental rescoring of system diarization under small edits."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from collections import Counter
+
+import numpy as np
+
+from . import metrics
+from .score import (_as_rec_id_to_turns, _cm_metrics, _n_frames,
+                    _step_ticks, _ticks_to_frames, _to_ticks, _uem_dur,
+                    PreparedReference, Turn, TICKS_PER_SECOND)
+
+__all__ = ['IncrementalScorer']
+
+
+# Maximum number of system speakers per recording, as frame labels are
+# bitmasks of the active speakers.
+MAX_SPEAKERS = 63
+
+
+def _turn_key(turn):
+    """Return (speaker_id, onset, offset) triple identifying ``turn``, with
+    onset and offset in ticks.
+    """
+    if isinstance(turn, Turn):
+        return turn.speaker_id, turn.onset_ticks, turn.offset_ticks
+    onset, offset, speaker_id = turn[:3]
+    return speaker_id, int(_to_ticks(onset)), int(_to_ticks(offset))
+
+
+class IncrementalScorer(object):
+    """System diarization scored against a reference and rescored as turns
+    are added, removed, or modified.
+
+    Rescoring with ``score_turns`` after each edit recomputes the frames of
+    every turn and the contingency matrix from scratch. Instead, this class
+    holds, for each recording, the number of turns of each system speaker
+    covering each frame, together with running totals from which DER and the
+    clustering metrics are computed: the missed, false alarm, and confused
+    speaker time, the overlap between each pair of reference and system
+    speakers, and the number of frames with each pair of reference and
+    system labels. Each edit updates these over only the frames spanned by
+    the edited turns (and, absent a UEM, those entering or leaving the
+    scored extent), and metrics are then computed from the totals in time
+    that depends on the numbers of speakers and labels, but not of frames:
+
+        scorer = IncrementalScorer(ref_turns, sys_turns, collar=0.250)
+        scorer.update('rec1', removed=[old_turn], added=[new_turn])
+        metrics = scorer.score()
+
+    Results are identical to those of ``score_turns`` with the same
+    arguments and the edited system turns, up to floating point rounding of
+    the clustering metrics.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording, whose recording id is then the empty string.
+
+    sys_turns : dict or list, optional
+        Initial system diarization in same format as the reference. Edits
+        to recordings missing from the system add them to it.
+        (Default: None)
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Only relevant for computing
+        DER.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking. Only relevant for computing DER.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+    """
+    def __init__(self, ref_turns, sys_turns=None, collar=0.250,
+                 ignore_overlaps=True, step=0.010, uem=None):
+        self.step = step
+        self.reference = PreparedReference(
+            ref_turns, collar, ignore_overlaps, step, uem)
+        self.rec_ids = self.reference.rec_ids
+        sys_rec_id_to_turns = {}
+        if sys_turns is not None:
+            sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+        # Number of frames with each (recording, reference label, system
+        # label) triple over the frames used for the clustering metrics.
+        self._pairs = {}
+        self.recordings = {}
+        for rec_ind, rec_id in enumerate(self.rec_ids):
+            ref_rec = self.reference.recordings[rec_id]
+            ref_X = ref_rec['X']
+            n_frames = ref_X.shape[0]
+            rec = {'ind': rec_ind,
+                   'n_frames': n_frames,
+                   'dur': int(_to_ticks(ref_rec['dur'])),
+                   'n_ref': ref_X.sum(axis=1),
+                   'n_scored': ref_X[ref_rec['scored']].sum(),
+                   'n_uem_frames': None,
+                   'present': rec_id in sys_rec_id_to_turns,
+                   'turns': Counter(),
+                   'offsets': Counter(),
+                   'sys_dur': 0,
+                   'speakers': {},
+                   'counts': np.zeros((n_frames, 0), dtype='int32'),
+                   'overlaps': np.zeros((ref_X.shape[1], 0), dtype='int64'),
+                   'n_correct': None}
+            if ref_rec['uem'] is not None:
+                rec['n_uem_frames'] = _n_frames(
+                    _uem_dur(ref_rec['uem']), step)
+            self.recordings[rec_id] = rec
+            self._init_recording(
+                rec_id, sys_rec_id_to_turns.get(rec_id, []))
+
+    def _col(self, rec, speaker_id):
+        """Return column of system speaker, adding it if new."""
+        col = rec['speakers'].get(speaker_id)
+        if col is not None:
+            return col
+        col = len(rec['speakers'])
+        if col >= MAX_SPEAKERS:
+            raise ValueError(
+                'At most %d system speakers per recording are supported.' %
+                MAX_SPEAKERS)
+        rec['speakers'][speaker_id] = col
+        # Grow by doubling so that the cost of copying is amortized.
+        n_cols = rec['counts'].shape[1]
+        if col >= n_cols:
+            n_new = max(n_cols, 4)
+            rec['counts'] = np.concatenate(
+                [rec['counts'],
+                 np.zeros((rec['n_frames'], n_new), dtype='int32')], axis=1)
+            rec['overlaps'] = np.concatenate(
+                [rec['overlaps'],
+                 np.zeros((rec['overlaps'].shape[0], n_new), dtype='int64')],
+                axis=1)
+        return col
+
+    def _span(self, rec, key):
+        """Return onset and offset frames of turn identified by ``key``."""
+        bi, ei = _ticks_to_frames(key[1:], rec['n_frames'], self.step)
+        return bi, max(bi, ei)
+
+    def _extent(self, rec):
+        """Return number of leading frames used for clustering metrics."""
+        if not rec['present']:
+            return 0
+        if rec['n_uem_frames'] is not None:
+            return rec['n_uem_frames']
+        # As in PreparedReference, frames extend to the end of whichever of
+        # the reference and system turns ends first.
+        return min(rec['dur'], rec['sys_dur']) // _step_ticks(self.step)
+
+    def _count_turn(self, rec, key, sign):
+        """Add (or, if ``sign`` is -1, remove) turn to multisets of turns
+        and offsets of recording.
+        """
+        for counter, item in [(rec['turns'], key), (rec['offsets'], key[2])]:
+            counter[item] += sign
+            if counter[item] == 0:
+                del counter[item]
+        # The offset of the last turn is only recomputed from scratch when
+        # the last turn is removed.
+        if sign > 0:
+            rec['sys_dur'] = max(rec['sys_dur'], key[2])
+        elif key[2] == rec['sys_dur'] and key[2] not in rec['offsets']:
+            rec['sys_dur'] = max(list(rec['offsets']) + [0])
+
+    def _add_pairs(self, rec_id, frames, sign):
+        """Add (or, if ``sign`` is -1, remove) label pairs of ``frames``."""
+        rec = self.recordings[rec_id]
+        ref_rec = self.reference.recordings[rec_id]
+        if ref_rec['in_uem'] is not None:
+            frames = frames[ref_rec['in_uem'][frames]]
+        if frames.size == 0:
+            return
+        pairs, counts = np.unique(
+            np.stack([ref_rec['labels'][frames], rec['sys_labels'][frames]],
+                     axis=1),
+            axis=0, return_counts=True)
+        for (ref_label, sys_label), count in zip(pairs.tolist(),
+                                                 counts.tolist()):
+            key = (rec['ind'], ref_label, sys_label)
+            count = self._pairs.get(key, 0) + sign*count
+            if count:
+                self._pairs[key] = count
+            else:
+                del self._pairs[key]
+
+    def _init_recording(self, rec_id, sys_turns):
+        """Frame initial system turns of recording all at once."""
+        rec = self.recordings[rec_id]
+        ref_rec = self.reference.recordings[rec_id]
+        for turn in sys_turns:
+            key = _turn_key(turn)
+            col = self._col(rec, key[0])
+            self._count_turn(rec, key, 1)
+            bi, ei = self._span(rec, key)
+            rec['counts'][bi:ei, col] += 1
+        active = rec['counts'] > 0
+        pows = 2**np.arange(active.shape[1], dtype='int64')
+        rec['n_sys'] = active.sum(axis=1)
+        rec['sys_labels'] = active.dot(pows)
+        scored = ref_rec['scored']
+        rec['overlaps'] = ref_rec['X'][scored].T.astype('int64').dot(
+            active[scored])
+        n_ref = rec['n_ref'][scored]
+        n_sys = rec['n_sys'][scored]
+        rec['n_miss'] = np.maximum(n_ref - n_sys, 0).sum()
+        rec['n_fa'] = np.maximum(n_sys - n_ref, 0).sum()
+        rec['n_min'] = np.minimum(n_ref, n_sys).sum()
+        self._add_pairs(rec_id, np.arange(self._extent(rec)), 1)
+
+    def _apply(self, rec_id, key, sign):
+        """Add (or, if ``sign`` is -1, remove) turn identified by ``key``."""
+        rec = self.recordings[rec_id]
+        ref_rec = self.reference.recordings[rec_id]
+        col = self._col(rec, key[0])
+        bi, ei = self._span(rec, key)
+
+        # Frames whose contribution to the clustering metrics may change:
+        # those spanned by the turn and those entering or leaving the
+        # clustering extent.
+        old_extent = self._extent(rec)
+        self._count_turn(rec, key, sign)
+        if sign > 0:
+            rec['present'] = True
+        new_extent = self._extent(rec)
+        frames = np.arange(bi, ei)
+        if old_extent != new_extent:
+            frames = np.union1d(frames, np.arange(
+                min(old_extent, new_extent), max(old_extent, new_extent)))
+        self._add_pairs(rec_id, frames[frames < old_extent], -1)
+
+        # Update system speaker activity and DER totals over the span.
+        counts = rec['counts'][bi:ei, col]
+        was_active = counts > 0
+        counts += sign
+        changed = was_active != (counts > 0)
+        if changed.any():
+            scored = ref_rec['scored'][bi:ei]
+            n_ref = rec['n_ref'][bi:ei][scored]
+            old_n_sys = rec['n_sys'][bi:ei][scored]
+            rec['n_sys'][bi:ei] += sign*changed
+            new_n_sys = rec['n_sys'][bi:ei][scored]
+            rec['n_miss'] += (np.maximum(n_ref - new_n_sys, 0) -
+                              np.maximum(n_ref - old_n_sys, 0)).sum()
+            rec['n_fa'] += (np.maximum(new_n_sys - n_ref, 0) -
+                            np.maximum(old_n_sys - n_ref, 0)).sum()
+            rec['n_min'] += (np.minimum(n_ref, new_n_sys) -
+                             np.minimum(n_ref, old_n_sys)).sum()
+            rec['overlaps'][:, col] += sign*ref_rec['X'][bi:ei][
+                changed & ref_rec['scored'][bi:ei]].sum(axis=0)
+            rec['sys_labels'][bi:ei] += sign*changed*(2**col)
+            rec['n_correct'] = None
+
+        self._add_pairs(rec_id, frames[frames < new_extent], 1)
+
+    def update(self, rec_id='', removed=(), added=()):
+        """Edit system turns of a recording.
+
+        Turns in ``removed`` are removed before those in ``added`` are
+        added, so that a turn is modified by removing its old version and
+        adding its new one. If any turn in ``removed`` is not among the
+        current system turns, nothing is changed.
+
+        Parameters
+        ----------
+        rec_id : str, optional
+            Recording id.
+            (Default: '')
+
+        removed : list of Turn, optional
+            Turns to remove, matched to current turns by speaker id, onset,
+            and offset. May also be (onset, offset, speaker_id) triples.
+            (Default: ())
+
+        added : list of Turn, optional
+            Turns to add. May also be (onset, offset, speaker_id) triples.
+            (Default: ())
+        """
+        if rec_id not in self.recordings:
+            raise ValueError(
+                'Recording "%s" is not in the reference.' % rec_id)
+        rec = self.recordings[rec_id]
+        removed = [_turn_key(turn) for turn in removed]
+        added = [_turn_key(turn) for turn in added]
+        for key, count in Counter(removed).items():
+            if rec['turns'][key] < count:
+                raise ValueError(
+                    'Turn (%s, %r, %r) is not among the system turns of '
+                    'recording "%s".' % (key[0], key[1] / TICKS_PER_SECOND,
+                                         key[2] / TICKS_PER_SECOND, rec_id))
+        for key in removed:
+            self._apply(rec_id, key, -1)
+        for key in added:
+            self._apply(rec_id, key, 1)
+
+    def _der_frames(self):
+        """Return components of overall DER in frames."""
+        n_scored = n_miss = n_fa = n_conf = 0
+        for rec_id in self.rec_ids:
+            rec = self.recordings[rec_id]
+            if rec['n_correct'] is None:
+                # Speakers are mapped so as to maximize the total overlap,
+                # as in ``metrics.speaker_mapping``.
+                overlaps = rec['overlaps'][:, :len(rec['speakers'])]
+                rec['n_correct'] = 0
+                if overlaps.size:
+                    ref_inds, sys_inds = metrics.optimal_mapping(overlaps)
+                    rec['n_correct'] = overlaps[ref_inds, sys_inds].sum()
+            n_scored += rec['n_scored']
+            n_miss += rec['n_miss']
+            n_fa += rec['n_fa']
+            n_conf += rec['n_min'] - rec['n_correct']
+        return n_scored, n_miss, n_fa, n_conf
+
+    def der_components(self):
+        """Return components of overall DER in seconds.
+
+        Returns
+        -------
+        scored : float
+            Scored reference speaker time.
+
+        miss : float
+            Missed speaker time.
+
+        fa : float
+            False alarm speaker time.
+
+        conf : float
+            Speaker error (confusion) time.
+        """
+        return tuple(float(n*self.step) for n in self._der_frames())
+
+    def der(self):
+        """Return overall percent diarization error rate."""
+        n_scored, n_miss, n_fa, n_conf = self._der_frames()
+        return 100.*(n_miss + n_fa + n_conf) / max(n_scored, 1)
+
+    def score(self, nats=False):
+        """Return metrics of current system turns.
+
+        Parameters
+        ----------
+        nats : bool, optional
+            If True, use nats as unit for information theoretic metrics.
+            Otherwise, use bits.
+            (Default: False)
+
+        Returns
+        -------
+        metrics : tuple
+            Same metrics, in the same order, as returned by ``score_turns``
+            without ``max_degree``.
+        """
+        der = self.der()
+        if not self._pairs:
+            return (der, ) + (np.nan, )*8
+        keys = np.array(list(self._pairs), dtype='int64')
+        counts = np.array(list(self._pairs.values()), dtype='int64')
+        _, ref_inds = np.unique(keys[:, :2], axis=0, return_inverse=True)
+        _, sys_inds = np.unique(keys[:, ::2], axis=0, return_inverse=True)
+        ref_inds = ref_inds.ravel()
+        sys_inds = sys_inds.ravel()
+        cm = np.zeros((ref_inds.max() + 1, sys_inds.max() + 1),
+                      dtype='int64')
+        cm[ref_inds, sys_inds] = counts
+        return (der, ) + _cm_metrics(cm, nats)
@@ -0,0 +1,152 @@
+"""Vectorized arithmetic on sets of time intervals."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+__all__ = ['contains', 'count_intervals', 'elementary_segments',
+           'merge_intervals']
+
+
+def merge_intervals(onsets, offsets):
+    """Return union of intervals as sorted, disjoint intervals.
+
+    Parameters
+    ----------
+    onsets : ndarray, (n_intervals,)
+        Interval onsets.
+
+    offsets : ndarray, (n_intervals,)
+        Interval offsets.
+
+    Returns
+    -------
+    onsets : ndarray, (n_merged,)
+        Onsets of merged intervals in increasing order.
+
+    offsets : ndarray, (n_merged,)
+        Offsets of merged intervals in increasing order.
+    """
+    onsets = np.asarray(onsets, dtype='float64')
+    offsets = np.asarray(offsets, dtype='float64')
+    keep = offsets > onsets
+    onsets = onsets[keep]
+    offsets = offsets[keep]
+    if onsets.size == 0:
+        return onsets, offsets
+    order = np.argsort(onsets, kind='mergesort')
+    onsets = onsets[order]
+    offsets = offsets[order]
+    # An interval starts a new merged interval IFF it begins after every
+    # preceding interval has ended.
+    max_offsets = np.maximum.accumulate(offsets)
+    is_start = np.concatenate([[True], onsets[1:] > max_offsets[:-1]])
+    starts = np.flatnonzero(is_start)
+    ends = np.concatenate([starts[1:], [onsets.size]]) - 1
+    return onsets[starts], max_offsets[ends]
+
+
+def count_intervals(onsets, offsets, min_count=2):
+    """Return regions covered by at least ``min_count`` intervals.
+
+    For instance, if the intervals are speaker turns, then with the default
+    ``min_count`` of 2 these are the regions of overlapping speech.
+
+    Parameters
+    ----------
+    onsets : ndarray, (n_intervals,)
+        Interval onsets.
+
+    offsets : ndarray, (n_intervals,)
+        Interval offsets.
+
+    min_count : int, optional
+        Minimum number of intervals.
+        (Default: 2)
+
+    Returns
+    -------
+    onsets : ndarray, (n_regions,)
+        Onsets of regions in increasing order.
+
+    offsets : ndarray, (n_regions,)
+        Offsets of regions in increasing order.
+    """
+    onsets = np.asarray(onsets, dtype='float64')
+    offsets = np.asarray(offsets, dtype='float64')
+    times = np.concatenate([onsets, offsets])
+    deltas = np.concatenate([np.ones(onsets.size, dtype='int64'),
+                             -np.ones(offsets.size, dtype='int64')])
+    # Sort boundaries by time, with offsets preceding onsets at the same
+    # time so that abutting intervals are not counted as overlapping.
+    order = np.lexsort([deltas, times])
+    times = times[order]
+    counts = np.cumsum(deltas[order])
+    # The count in effect between consecutive boundaries.
+    is_covered = counts[:-1] >= min_count
+    return merge_intervals(times[:-1][is_covered], times[1:][is_covered])
+
+
+def contains(onsets, offsets, times):
+    """Return mask indicating which of ``times`` lie within intervals.
+
+    Parameters
+    ----------
+    onsets : ndarray, (n_intervals,)
+        Onsets of sorted, disjoint intervals (e.g., as returned by
+        ``merge_intervals``).
+
+    offsets : ndarray, (n_intervals,)
+        Corresponding offsets.
+
+    times : ndarray, (n_times,)
+        Times to test.
+
+    Returns
+    -------
+    is_in : ndarray, (n_times,)
+        Boolean array whose i-th entry is True IFF the i-th time lies within
+        an interval.
+    """
+    times = np.asarray(times, dtype='float64')
+    inds = np.searchsorted(onsets, times, side='right') - 1
+    is_in = inds >= 0
+    is_in[is_in] = times[is_in] < offsets[inds[is_in]]
+    return is_in
+
+
+def elementary_segments(interval_sets):
+    """Partition time into segments on which membership is constant.
+
+    The boundaries of all intervals partition time into elementary segments,
+    each of which lies either entirely inside or entirely outside each
+    interval set. Durations of arbitrary unions, intersections, and
+    differences of the interval sets may then be computed by summing the
+    durations of the segments selected by boolean combinations of the
+    returned masks.
+
+    Parameters
+    ----------
+    interval_sets : list of tuple
+        List of (onsets, offsets) pairs, each defining a set of sorted,
+        disjoint intervals.
+
+    Returns
+    -------
+    durs : ndarray, (n_segments,)
+        Durations of elementary segments.
+
+    masks : list of ndarray
+        For each interval set, a boolean array indicating which elementary
+        segments lie within it.
+    """
+    times = np.unique(np.concatenate(
+        [np.concatenate([onsets, offsets]) for onsets, offsets in
+         interval_sets]))
+    durs = np.diff(times)
+    mids = times[:-1] + durs/2.
+    masks = [contains(onsets, offsets, mids)
+             for onsets, offsets in interval_sets]
+    return durs, masks
@@ -2,12 +2,16 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+import itertools
+import json
 import logging
+import math
 import sys
+import threading
 
-from . import six
-
-__all__ = ['getLogger']
+__all__ = ['add_json_handler', 'configure_logger', 'getLogger',
+           'CustomStreamHandler', 'JsonFormatter', 'JsonLinesHandler',
+           'QueueHandler', 'QueueListener']
 
 
 def getLogger(name=None):
@@ -34,37 +38,225 @@ class CustomFormatter(logging.Formatter):
 
 
 class CustomStreamHandler(logging.Handler):
-    def __init__(self, stdout=None, stderr=None, formatter=None):
+    """Handler writing DEBUG and INFO messages to one stream and all others
+    to another.
+
+    Formatted messages are buffered in the order in which they were handled
+    and only written when ``buffer_size`` messages have accumulated, when a
+    message of level ``flush_level`` or higher is handled, or on
+    ``flush``/``close``. With the default ``buffer_size`` of 1, each message
+    is written and its stream flushed immediately.
+
+    Parameters
+    ----------
+    stdout : file handle, optional
+        Stream to which to write DEBUG and INFO messages.
+        (Default: sys.stdout)
+
+    stderr : file handle, optional
+        Stream to which to write WARNING, ERROR, and CRITICAL messages.
+        (Default: sys.stderr)
+
+    formatter : logging.Formatter, optional
+        Formatter.
+        (Default: None)
+
+    buffer_size : int, optional
+        Number of messages to buffer before writing.
+        (Default: 1)
+
+    flush_level : int, optional
+        Messages of this level or higher cause the buffer to be written
+        immediately.
+        (Default: logging.ERROR)
+    """
+    def __init__(self, stdout=None, stderr=None, formatter=None,
+                 buffer_size=1, flush_level=logging.ERROR):
         logging.Handler.__init__(self)
         self.stdout = sys.stdout if stdout is None else stdout
         self.stderr = sys.stderr if stderr is None else stderr
         self.formatter = formatter
+        self.buffer_size = buffer_size
+        self.flush_level = flush_level
+        self._buffer = []  # (stream name, message) pairs.
 
     def flush(self):
-        """Flushes the stream."""
-        for stream in (self.stdout, self.stderr):
-            stream.flush()
+        """Write buffered messages and flush the streams."""
+        self.acquire()
+        try:
+            # Write each run of consecutive messages to the same stream at
+            # once, so that messages written to a shared stream (as by
+            # JsonLinesHandler) or to a terminal stay in order.
+            sep = b'' if sys.version_info[0] == 2 else ''
+            for name, pairs in itertools.groupby(
+                    self._buffer, key=lambda pair: pair[0]):
+                stream = getattr(self, name)
+                stream.write(sep.join(msg for _, msg in pairs))
+                stream.flush()
+            self._buffer = []
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        logging.Handler.close(self)
 
     def emit(self, record):
         try:
             msg = self.format(record)
-            if record.levelno > logging.INFO:
-                stream = self.stderr
-            else:
-                stream = self.stdout
+            name = 'stderr' if record.levelno > logging.INFO else 'stdout'
             fs = '%s\n'
             msg = fs % msg
-            if six.PY2:
+            if sys.version_info[0] == 2:
                 msg = msg.encode('utf-8')
-            stream.write(msg)
-            self.flush()
+            self._buffer.append((name, msg))
+            if (len(self._buffer) >= self.buffer_size or
+                record.levelno >= self.flush_level):
+                self.flush()
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
             self.handleError(record)
 
 
-def configure_logger(logger, debug=False, stdout=None, stderr=None):
+def _to_jsonable(val):
+    """Convert NumPy scalars/arrays to Python objects and NaN/inf to None."""
+    if isinstance(val, dict):
+        return dict((k, _to_jsonable(v)) for k, v in val.items())
+    if isinstance(val, (list, tuple)):
+        return [_to_jsonable(v) for v in val]
+    if hasattr(val, 'tolist'):
+        return _to_jsonable(val.tolist())
+    if isinstance(val, float) and (math.isnan(val) or math.isinf(val)):
+        return None
+    return val
+
+
+# Attributes present on every LogRecord. Any other attributes (i.e., those
+# passed via the ``extra`` keyword argument) are structured fields.
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None)))
+_RECORD_ATTRS.update(['message', 'asctime'])
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatter that outputs each record as a single line of JSON.
+
+    Each line is an object with fields "time" (seconds since the epoch),
+    "level", "logger", "process", and "message", plus any structured fields
+    passed to the logging call via the ``extra`` keyword argument. For
+    instance
+
+        logger.info('Scored %s.', fid,
+                    extra={'fid': fid, 'stage': 'score', 'elapsed': 0.52,
+                           'metrics': {'DER': 21.3}})
+
+    would add "fid", "stage", "elapsed", and "metrics" fields. NaN and
+    infinite values are output as null.
+    """
+    def format(self, record):
+        obj = {'time': record.created,
+               'level': record.levelname,
+               'logger': record.name,
+               'process': record.processName,
+               'message': record.getMessage()}
+        for key, val in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                obj[key] = val
+        if record.exc_info:
+            obj['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            obj['exception'] = record.exc_text
+        return json.dumps(_to_jsonable(obj), default=repr)
+
+
+class QueueHandler(logging.Handler):
+    """Handler that sends records to a queue.
+
+    Intended for use in worker processes, with records consumed in the main
+    process by a ``QueueListener``, so that messages from all workers are
+    written by a single set of handlers.
+
+    Parameters
+    ----------
+    queue : multiprocessing.Queue
+        Queue.
+    """
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def prepare(self, record):
+        """Return picklable copy of ``record``."""
+        # Merge message and arguments and render any traceback now, as
+        # neither arguments nor tracebacks are necessarily picklable.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+
+class QueueListener(object):
+    """Consume records from a queue in a background thread and pass them to
+    handlers.
+
+    Parameters
+    ----------
+    queue : multiprocessing.Queue
+        Queue.
+
+    handlers : list of logging.Handler
+        Handlers. Each handler only receives records at or above its level.
+    """
+    _sentinel = None
+
+    def __init__(self, queue, handlers):
+        self.queue = queue
+        self.handlers = list(handlers)
+        self._thread = None
+
+    def start(self):
+        """Start listening."""
+        self._thread = threading.Thread(target=self._monitor)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Handle all remaining records and stop listening."""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.flush()
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is self._sentinel:
+                break
+            self.handle(record)
+
+
+def configure_logger(logger, debug=False, stdout=None, stderr=None,
+                     buffer_size=1):
     """Configure logger to output logging modules to console via
     stdout and stderr.
     Parameters
@@ -80,6 +272,10 @@ def configure_logger(logger, debug=False, stdout=None, stderr=None):
     stderr : file handle, optional
         Stream to which to write WARNING, ERROR, and CRITICAL messages.
         (Default: sys.stderr)
+    buffer_size : int, optional
+        Number of messages to buffer before writing to console. ERROR and
+        CRITICAL messages are always written immediately.
+        (Default: 1)
     """
     # Set the log level of logger (either to DEBUG or INFO).
     level = logging.DEBUG if debug else logging.INFO
@@ -91,7 +287,61 @@ def configure_logger(logger, debug=False, stdout=None, stderr=None):
 
     # Install custom-configured handler and formatter.
     fmt = CustomFormatter()
-    handler = logging.Handler()
     handler = CustomStreamHandler(stdout=stdout, stderr=stderr,
-                                  formatter=fmt)
+                                  formatter=fmt, buffer_size=buffer_size)
+    handler.setLevel(level)
+    logger.addHandler(handler)
+
+
+class JsonLinesHandler(CustomStreamHandler):
+    """Handler writing records of all levels to a file as JSON Lines.
+
+    Parameters
+    ----------
+    fn : str
+        Output file.
+
+    buffer_size : int, optional
+        Number of records to buffer before writing.
+        (Default: 100)
+    """
+    def __init__(self, fn, buffer_size=100):
+        f = open(fn, 'wb' if sys.version_info[0] == 2 else 'w')
+        CustomStreamHandler.__init__(
+            self, stdout=f, stderr=f, formatter=JsonFormatter(),
+            buffer_size=buffer_size, flush_level=logging.CRITICAL + 1)
+
+    def close(self):
+        CustomStreamHandler.close(self)
+        if not self.stdout.closed:
+            self.stdout.close()
+
+
+def add_json_handler(logger, fn, level=logging.DEBUG, buffer_size=100):
+    """Add handler writing records to ``fn`` as JSON Lines.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        Logger instance to configure.
+    fn : str
+        Output file.
+    level : int, optional
+        Minimum level of records written. If below the level of ``logger``,
+        the level of ``logger`` is lowered to match.
+        (Default: logging.DEBUG)
+    buffer_size : int, optional
+        Number of records to buffer before writing.
+        (Default: 100)
+
+    Returns
+    -------
+    handler : JsonLinesHandler
+        The new handler.
+    """
+    handler = JsonLinesHandler(fn, buffer_size)
+    handler.setLevel(level)
+    if logger.level > level:
+        logger.setLevel(level)
     logger.addHandler(handler)
+    return handler
@@ -6,12 +6,18 @@ from __future__ import unicode_literals
 import os
 import re
 import subprocess
+from collections import namedtuple, OrderedDict
 
 import numpy as np
-from scipy.sparse import coo_matrix
+
+from .intervals import elementary_segments, merge_intervals
 
 __all__ = ['bcubed', 'conditional_entropy', 'contingency_matrix', 'der',
-           'goodman_kruskal_tau', 'mutual_information']
+           'der_components', 'frame_errors', 'goodman_kruskal_tau', 'jer',
+           'mdeval', 'mutual_information', 'optimal_mapping',
+           'parse_mdeval_report', 'speaker_errors', 'speaker_mapping',
+           'speaker_overlaps', 'MDEvalError', 'MDEvalReport',
+           'MDEvalResult', 'MDEVAL_FIELDS']
 
 
 EPS = np.finfo(float).eps
@@ -21,14 +27,15 @@ def contingency_matrix(ref_labels, sys_labels):
     """Return contingency matrix between ``ref_labels`` and ``sys_labels``."""
     ref_classes, ref_class_inds = np.unique(ref_labels, return_inverse=True)
     sys_classes, sys_class_inds = np.unique(sys_labels, return_inverse=True)
-    n_frames = ref_labels.size
-    # Following works because coo_matrix sums duplicate entries. Is roughly
-    # twice as fast as np.histogram2d.
-    cmatrix = coo_matrix(
-        (np.ones(n_frames), (ref_class_inds, sys_class_inds)),
-        shape=(ref_classes.size, sys_classes.size),
-        dtype=np.int)
-    cmatrix = cmatrix.toarray()
+    # Count co-occurrences of (ref, sys) class pairs by flattening each pair
+    # into a single index. Unlike scipy.sparse.coo_matrix, this avoids
+    # importing SciPy and is roughly twice as fast.
+    n_ref_classes = ref_classes.size
+    n_sys_classes = sys_classes.size
+    cmatrix = np.bincount(
+        ref_class_inds.ravel()*n_sys_classes + sys_class_inds.ravel(),
+        minlength=n_ref_classes*n_sys_classes)
+    cmatrix = cmatrix.reshape(n_ref_classes, n_sys_classes)
     return cmatrix, ref_classes, sys_classes
 
 
@@ -234,18 +241,503 @@ def mutual_information(ref_labels, sys_labels, cm=None, nats=False):
     return mi, nmi
 
 
+def speaker_mapping(ref_X, sys_X):
+    """Return optimal one-to-one mapping between reference and system speakers.
+
+    The mapping maximizes the total number of frames on which mapped
+    reference and system speakers are simultaneously active and is found
+    using the Hungarian algorithm.
+
+    Parameters
+    ----------
+    ref_X : ndarray, (n_frames, n_ref_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th reference
+        speaker was present at frame i.
+
+    sys_X : ndarray, (n_frames, n_sys_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th system speaker
+        was present at frame i.
+
+    Returns
+    -------
+    ref_inds : ndarray, (n_mapped,)
+        Indices of mapped reference speakers.
+
+    sys_inds : ndarray, (n_mapped,)
+        Indices of system speakers mapped to the corresponding reference
+        speakers in ``ref_inds``.
+    """
+    return optimal_mapping(ref_X.T.astype('float64').dot(sys_X))
+
+
+def optimal_mapping(overlaps):
+    """Return one-to-one mapping between speakers maximizing total overlap.
+
+    The mapping is found using the Hungarian algorithm, whose cost depends
+    only on the numbers of speakers.
+
+    Parameters
+    ----------
+    overlaps : ndarray, (n_ref_speakers, n_sys_speakers)
+        Matrix whose i,j-th entry is the time during which the i-th reference
+        speaker and the j-th system speaker are both speaking.
+
+    Returns
+    -------
+    ref_inds : ndarray, (n_mapped,)
+        Indices of mapped reference speakers.
+
+    sys_inds : ndarray, (n_mapped,)
+        Indices of system speakers mapped to the corresponding reference
+        speakers in ``ref_inds``.
+    """
+    from scipy.optimize import linear_sum_assignment
+    ref_inds, sys_inds = linear_sum_assignment(-overlaps)
+    return ref_inds, sys_inds
+
+
+def speaker_overlaps(ref_intervals, sys_intervals, uem=None):
+    """Return speaker-level durations from which speaker errors are computed.
+
+    Rather than framing the recording, the boundaries of all speakers'
+    intervals partition time into elementary segments (see
+    ``intervals.elementary_segments``) on which each speaker is either
+    present or absent throughout. All durations are then sums over these
+    segments, so that the cost depends on the numbers of speakers and turns
+    but not on the length of the recording.
+
+    Parameters
+    ----------
+    ref_intervals : list of tuple
+        For each reference speaker, an (onsets, offsets) pair of arrays
+        specifying the intervals during which the speaker is speaking.
+
+    sys_intervals : list of tuple
+        Intervals of each system speaker in same format as
+        ``ref_intervals``.
+
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds. If not None, only
+        time within these regions is counted.
+        (Default: None)
+
+    Returns
+    -------
+    ref_durs : ndarray, (n_ref_speakers,)
+        Speaking time of each reference speaker.
+
+    sys_durs : ndarray, (n_sys_speakers,)
+        Speaking time of each system speaker.
+
+    overlaps : ndarray, (n_ref_speakers, n_sys_speakers)
+        Matrix whose i,j-th entry is the time during which the i-th reference
+        speaker and the j-th system speaker are both speaking.
+
+    ref_only : ndarray, (n_ref_speakers,)
+        Speaking time of each reference speaker during which no system
+        speaker is speaking.
+    """
+    interval_sets = [merge_intervals(onsets, offsets)
+                     for onsets, offsets in ref_intervals + sys_intervals]
+    if uem is not None:
+        uem = np.asarray(uem, dtype='float64').reshape(-1, 2)
+        interval_sets.append(merge_intervals(uem[:, 0], uem[:, 1]))
+    n_ref = len(ref_intervals)
+    n_sys = len(sys_intervals)
+    if not interval_sets:
+        return (np.zeros(0), np.zeros(0), np.zeros((0, 0)), np.zeros(0))
+    durs, masks = elementary_segments(interval_sets)
+    masks = np.array(masks, dtype='bool').reshape(len(interval_sets), -1)
+    if uem is not None:
+        durs = durs*masks[-1]
+    ref_masks = masks[:n_ref].astype('float64')
+    sys_masks = masks[n_ref:n_ref + n_sys].astype('float64')
+    ref_durs = ref_masks.dot(durs)
+    sys_durs = sys_masks.dot(durs)
+    overlaps = (ref_masks*durs).dot(sys_masks.T)
+    ref_only = (ref_masks*(durs*(sys_masks.sum(axis=0) == 0))).sum(axis=1)
+    return ref_durs, sys_durs, overlaps, ref_only
+
+
+def speaker_errors(ref_intervals, sys_intervals, uem=None):
+    """Return errors for each reference speaker under the optimal mapping.
+
+    Reference and system speakers are mapped one-to-one so as to maximize
+    total overlap (see ``optimal_mapping``), as when computing DER. Pairs
+    that do not overlap at all are treated as unmapped. For reference speaker
+    ``i`` mapped to system speaker ``j``, with ``R_i`` and ``S_j`` the time
+    during which each is speaking:
+
+    - miss  --  time in ``R_i`` during which no system speaker is speaking
+    - confusion  --  time in ``R_i`` during which some system speaker, but
+      not ``S_j``, is speaking
+    - fa  --  time in ``S_j`` but not in ``R_i``
+    - jer  --  Jaccard error rate, ``1 - |R_i & S_j| / |R_i | S_j|``, which
+      equals ``(miss + confusion + fa) / |R_i | S_j|``
+
+    Unmapped reference speakers have no false alarm and a JER of 1.
+
+    Parameters
+    ----------
+    ref_intervals : list of tuple
+        For each reference speaker, an (onsets, offsets) pair of arrays
+        specifying the intervals during which the speaker is speaking.
+
+    sys_intervals : list of tuple
+        Intervals of each system speaker in same format as
+        ``ref_intervals``.
+
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds. If not None, only
+        time within these regions is counted.
+        (Default: None)
+
+    Returns
+    -------
+    sys_inds : ndarray, (n_ref_speakers,)
+        Index of the system speaker mapped to each reference speaker or -1 if
+        unmapped.
+
+    durs : ndarray, (n_ref_speakers,)
+        Speaking time of each reference speaker.
+
+    miss : ndarray, (n_ref_speakers,)
+        Missed speech of each reference speaker.
+
+    fa : ndarray, (n_ref_speakers,)
+        False alarm speech of the system speaker mapped to each reference
+        speaker.
+
+    confusion : ndarray, (n_ref_speakers,)
+        Confused speech of each reference speaker.
+
+    jer : ndarray, (n_ref_speakers,)
+        Jaccard error rate of each reference speaker.
+    """
+    ref_durs, sys_durs, overlaps, ref_only = speaker_overlaps(
+        ref_intervals, sys_intervals, uem)
+    n_ref = ref_durs.size
+    sys_inds = np.full(n_ref, -1, dtype='int64')
+    hit = np.zeros(n_ref)
+    fa = np.zeros(n_ref)
+    if n_ref and sys_durs.size:
+        ref_inds, sys_inds_ = optimal_mapping(overlaps)
+        is_mapped = overlaps[ref_inds, sys_inds_] > 0
+        ref_inds = ref_inds[is_mapped]
+        sys_inds_ = sys_inds_[is_mapped]
+        sys_inds[ref_inds] = sys_inds_
+        hit[ref_inds] = overlaps[ref_inds, sys_inds_]
+        fa[ref_inds] = sys_durs[sys_inds_] - hit[ref_inds]
+    miss = ref_only
+    confusion = ref_durs - ref_only - hit
+    union = ref_durs + fa
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jer = np.where(union > 0, 1 - hit / union, 0.)
+    return sys_inds, ref_durs, miss, fa, confusion, jer
+
+
+def jer(ref_intervals, sys_intervals, uem=None):
+    """Return Jaccard error rate.
+
+    The Jaccard error rate is the mean over reference speakers of their
+    per-speaker JERs (see ``speaker_errors``). To compute it over several
+    recordings, concatenate the per-speaker JERs of each recording and take
+    their mean.
+
+    Parameters
+    ----------
+    ref_intervals : list of tuple
+        For each reference speaker, an (onsets, offsets) pair of arrays
+        specifying the intervals during which the speaker is speaking.
+
+    sys_intervals : list of tuple
+        Intervals of each system speaker in same format as
+        ``ref_intervals``.
+
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds.
+        (Default: None)
+
+    Returns
+    -------
+    jer : float
+        Percent Jaccard error rate.
+
+    References
+    ----------
+    Ryant, N., et al. (2019). "The Second DIHARD Diarization Challenge:
+    Dataset, task, and baselines." Proceedings of INTERSPEECH 2019.
+    """
+    jers = speaker_errors(ref_intervals, sys_intervals, uem)[-1]
+    if jers.size == 0:
+        return np.nan
+    return 100.*jers.mean()
+
+
+def der_components(ref_X, sys_X, scored=None):
+    """Return components of diarization error rate in frames.
+
+    Parameters
+    ----------
+    ref_X : ndarray, (n_frames, n_ref_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th reference
+        speaker was present at frame i.
+
+    sys_X : ndarray, (n_frames, n_sys_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th system speaker
+        was present at frame i.
+
+    scored : ndarray, (n_frames,), optional
+        Boolean array indicating which frames are scored. If None, all frames
+        are scored.
+        (Default: None)
+
+    Returns
+    -------
+    n_ref : int
+        Scored reference speaker time in frames.
+
+    n_miss : int
+        Missed speaker time in frames.
+
+    n_fa : int
+        False alarm speaker time in frames.
+
+    n_conf : int
+        Speaker error (confusion) time in frames.
+    """
+    if scored is not None:
+        ref_X = ref_X[scored]
+        sys_X = sys_X[scored]
+    n_miss, n_fa, n_conf = frame_errors(ref_X, sys_X)
+    return ref_X.sum(), n_miss.sum(), n_fa.sum(), n_conf.sum()
+
+
+def frame_errors(ref_X, sys_X, scored=None):
+    """Return number of missed, false alarm, and confused speakers per frame.
+
+    Reference and system speakers are mapped using ``speaker_mapping``.
+
+    Parameters
+    ----------
+    ref_X : ndarray, (n_frames, n_ref_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th reference
+        speaker was present at frame i.
+
+    sys_X : ndarray, (n_frames, n_sys_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th system speaker
+        was present at frame i.
+
+    scored : ndarray, (n_frames,), optional
+        Boolean array indicating which frames are scored. If not None,
+        speakers are mapped using only these frames, though errors are still
+        returned for every frame.
+        (Default: None)
+
+    Returns
+    -------
+    n_miss : ndarray, (n_frames,)
+        Number of missed speakers.
+
+    n_fa : ndarray, (n_frames,)
+        Number of false alarm speakers.
+
+    n_conf : ndarray, (n_frames,)
+        Number of confused speakers.
+    """
+    n_ref = ref_X.sum(axis=1)
+    n_sys = sys_X.sum(axis=1)
+    if scored is None:
+        ref_inds, sys_inds = speaker_mapping(ref_X, sys_X)
+    else:
+        ref_inds, sys_inds = speaker_mapping(ref_X[scored], sys_X[scored])
+    n_correct = (ref_X[:, ref_inds] & sys_X[:, sys_inds]).sum(axis=1)
+    n_miss = np.maximum(n_ref - n_sys, 0)
+    n_fa = np.maximum(n_sys - n_ref, 0)
+    n_conf = np.minimum(n_ref, n_sys) - n_correct
+    return n_miss, n_fa, n_conf
+
+
 SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
 MDEVAL_BIN = os.path.join(SCRIPT_DIR, 'md-eval-22.pl')
-DER_REO = re.compile(r'(?<=OVERALL SPEAKER DIARIZATION ERROR = )[\d.]+')
 
-def der(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True):
+# Quantities reported by md-eval.pl for each condition (e.g., each file and
+# overall), in order, with the labels of the lines they are parsed from. All
+# are in seconds, except for ``der``, which is a percent of
+# ``scored_speaker_time``.
+MDEVAL_FIELDS = ['eval_time', 'eval_speech', 'scored_time', 'scored_speech',
+                 'missed_speech', 'falarm_speech', 'scored_speaker_time',
+                 'missed_speaker_time', 'falarm_speaker_time',
+                 'speaker_error_time', 'der']
+MDEVAL_LABELS = ['EVAL TIME', 'EVAL SPEECH', 'SCORED TIME', 'SCORED SPEECH',
+                 'MISSED SPEECH', 'FALARM SPEECH', 'SCORED SPEAKER TIME',
+                 'MISSED SPEAKER TIME', 'FALARM SPEAKER TIME',
+                 'SPEAKER ERROR TIME', 'OVERALL SPEAKER DIARIZATION ERROR']
+MDEVAL_CONDITION_REO = re.compile(
+    r'^\*\*\* Performance analysis for Speaker Diarization for (\S+) \*\*\*',
+    re.MULTILINE)
+MDEVAL_FIELD_REO = re.compile(
+    r'^ *(%s) = +([\d.]+)' % '|'.join(MDEVAL_LABELS), re.MULTILINE)
+
+class MDEvalResult(namedtuple('MDEvalResult', MDEVAL_FIELDS)):
+    """Quantities reported by ``md-eval.pl`` for one condition.
+
+    The fields are named by ``MDEVAL_FIELDS``. All are in seconds, except for
+    ``der``, which is the percent diarization error rate.
+    """
+    __slots__ = ()
+
+
+class MDEvalError(RuntimeError):
+    """Raised when ``md-eval.pl`` fails or its report cannot be parsed."""
+
+
+class MDEvalReport(object):
+    """Parsed report of ``md-eval.pl``.
+
+    Parameters
+    ----------
+    overall : MDEvalResult
+        Results pooled over all files.
+
+    files : OrderedDict
+        Mapping from file ids to results for each file, in order of the
+        report. Empty unless per-file results were requested.
+    """
+    def __init__(self, overall, files=None):
+        self.overall = overall
+        self.files = OrderedDict() if files is None else files
+
+    def __repr__(self):
+        return 'MDEvalReport(overall=%r, n_files=%d)' % (
+            self.overall, len(self.files))
+
+
+def parse_mdeval_report(txt):
+    """Parse report output by ``md-eval.pl``.
+
+    Parameters
+    ----------
+    txt : str
+        Report, as written to STDOUT by ``md-eval.pl``. If it was run with
+        ``-a f``, the report contains results for each file in addition to
+        the overall results.
+
+    Returns
+    -------
+    report : MDEvalReport
+        Parsed report.
+
+    Raises
+    ------
+    MDEvalError
+        If the report does not contain overall results or any results are
+        incomplete.
+    """
+    overall = None
+    files = OrderedDict()
+    matches = list(MDEVAL_CONDITION_REO.finditer(txt))
+    for ii, match in enumerate(matches):
+        condition = match.group(1)
+        end = matches[ii + 1].start() if ii + 1 < len(matches) else len(txt)
+        label_to_val = dict(
+            (label, float(val)) for label, val in
+            MDEVAL_FIELD_REO.findall(txt, match.end(), end))
+        missing = [label for label in MDEVAL_LABELS
+                   if label not in label_to_val]
+        if missing:
+            raise MDEvalError(
+                'Results for condition "%s" of md-eval.pl report are missing '
+                'fields: %s.' % (condition, ', '.join(missing)))
+        result = MDEvalResult(
+            *[label_to_val[label] for label in MDEVAL_LABELS])
+        if condition == 'ALL':
+            overall = result
+        elif condition.startswith('f='):
+            files[condition[2:]] = result
+    if overall is None:
+        raise MDEvalError(
+            'md-eval.pl report contains no overall results; are there any '
+            'scored reference speakers?')
+    return MDEvalReport(overall, files)
+
+
+def mdeval(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True,
+           uem_fn=None, per_file=False):
+    """Run NIST ``md-eval.pl`` tool and return its parsed report.
+
+    Parameters
+    ----------
+    ref_rttm_fn : str
+        Path to reference RTTM file.
+
+    sys_rttm_fn : str
+        Path to system RTTM file.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking.
+        (Default: True)
+
+    uem_fn : str, optional
+        Path to UEM file specifying the scoring regions of each recording.
+        (Default: None)
+
+    per_file : bool, optional
+        If True, also report results for each file.
+        (Default: False)
+
+    Returns
+    -------
+    report : MDEvalReport
+        Parsed report.
+
+    Raises
+    ------
+    MDEvalError
+        If ``md-eval.pl`` cannot be run, exits with an error, or its report
+        cannot be parsed. The message includes any error output of
+        ``md-eval.pl``.
+    """
+    cmd = [MDEVAL_BIN,
+           '-r', ref_rttm_fn,
+           '-s', sys_rttm_fn,
+           '-c', str(collar),
+           ]
+    if ignore_overlaps:
+        cmd.append('-1')
+    if uem_fn is not None:
+        cmd.extend(['-u', uem_fn])
+    if per_file:
+        cmd.extend(['-a', 'f'])
+    try:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise MDEvalError('Unable to run md-eval.pl: %s' % e)
+    stdout, stderr = proc.communicate()
+    stderr = stderr.decode('utf-8', 'replace').strip()
+    if proc.returncode != 0:
+        raise MDEvalError(
+            'md-eval.pl exited with status %d scoring %s against %s: %s' %
+            (proc.returncode, sys_rttm_fn, ref_rttm_fn, stderr))
+    return parse_mdeval_report(stdout.decode('utf-8'))
+
+
+def der(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True,
+        uem_fn=None):
     """Return overall diarization error rate as computed using NIST tool.
 
     **NOTE** that unlike other functions in ``scorelib.metrics``, ``der``
     does not take as input frame-level labelings, but instead paths to
     reference and system RTTM files, which are then given as arguments to the
     NIST ``md-eval.pl`` scoring tool to compute diarization error rate (DER).
-    Currently, v22 of the scoring tool is used.
+    Currently, v22 of the scoring tool is used. For the other quantities it
+    reports, use ``mdeval``.
 
     Parameters
     ----------
@@ -266,19 +758,21 @@ def der(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True):
         than one speaker is speaking.
         (Default: True)
 
+    uem_fn : str, optional
+        Path to UEM file specifying the scoring regions of each recording. If
+        None, each recording is scored over the extent of its reference
+        turns.
+        (Default: None)
+
     Returns
     -------
     der : float
         Overall percent diarization error.
+
+    Raises
+    ------
+    MDEvalError
+        If ``md-eval.pl`` fails.
     """
-    cmd = [MDEVAL_BIN,
-           '-r', ref_rttm_fn,
-           '-s', sys_rttm_fn,
-           '-c', str(collar),
-           ]
-    if ignore_overlaps:
-        cmd.append('-1')
-    with open(os.devnull, 'wb') as f:
-        txt = subprocess.check_output(cmd, stderr=f)
-    der = float(DER_REO.search(txt).group())
-    return der
+    return mdeval(ref_rttm_fn, sys_rttm_fn, collar, ignore_overlaps,
+                  uem_fn).overall.der
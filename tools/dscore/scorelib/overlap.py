@@ -0,0 +1,179 @@
+"""Functions for evaluating overlapped speech detection."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .intervals import count_intervals, elementary_segments, merge_intervals
+from .score import (_as_rec_id_to_turns, _speaker_intervals, _turn_arrays,
+                    load_uem, rttm_to_turns)
+
+__all__ = ['overlap_components', 'overlap_intervals', 'overlap_metrics',
+           'overlap_metrics_from_durations', 'score_overlap']
+
+
+def overlap_intervals(turns):
+    """Return regions in which two or more speakers are speaking.
+
+    Parameters
+    ----------
+    turns : list of Turn
+        Speaker turns. May also be a sequence of (onset, offset, speaker_id)
+        triples.
+
+    Returns
+    -------
+    onsets : ndarray, (n_regions,)
+        Onsets of overlap regions in increasing order.
+
+    offsets : ndarray, (n_regions,)
+        Offsets of overlap regions in increasing order.
+    """
+    # Merge turns of each speaker first so that a speaker whose own turns
+    # overlap is not counted twice.
+    _, intervals = _speaker_intervals(turns)
+    if not intervals:
+        return np.zeros(0), np.zeros(0)
+    return count_intervals(
+        np.concatenate([onsets for onsets, _ in intervals]),
+        np.concatenate([offsets for _, offsets in intervals]), 2)
+
+
+def overlap_components(ref_turns, sys_turns, uem=None,
+                       sys_is_diarization=False):
+    """Return durations needed to compute overlap detection metrics for one
+    recording.
+
+    Parameters
+    ----------
+    ref_turns : list of Turn
+        Reference speaker turns. May also be a sequence of
+        (onset, offset, speaker_id) triples.
+
+    sys_turns : list of Turn
+        System turns in same format as ``ref_turns``. Unless
+        ``sys_is_diarization`` is True, each turn is a detected overlap
+        region, regardless of its speaker id.
+
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds. If None, all
+        time is scored.
+        (Default: None)
+
+    sys_is_diarization : bool, optional
+        If True, ``sys_turns`` are treated as speaker turns from which overlap
+        regions are derived as for the reference.
+        (Default: False)
+
+    Returns
+    -------
+    ref_dur : float
+        Duration of scored reference overlap in seconds.
+
+    sys_dur : float
+        Duration of scored system overlap in seconds.
+
+    hit_dur : float
+        Duration of scored overlap present in both reference and system in
+        seconds.
+    """
+    interval_sets = [overlap_intervals(ref_turns)]
+    if sys_is_diarization:
+        interval_sets.append(overlap_intervals(sys_turns))
+    else:
+        interval_sets.append(merge_intervals(*_turn_arrays(sys_turns)[:2]))
+    if uem is not None:
+        uem = np.asarray(uem, dtype='float64').reshape(-1, 2)
+        interval_sets.append(merge_intervals(uem[:, 0], uem[:, 1]))
+    durs, masks = elementary_segments(interval_sets)
+    is_ref, is_sys = masks[:2]
+    if uem is not None:
+        is_ref = is_ref & masks[2]
+        is_sys = is_sys & masks[2]
+    return (durs[is_ref].sum(), durs[is_sys].sum(),
+            durs[is_ref & is_sys].sum())
+
+
+def overlap_metrics_from_durations(ref_dur, sys_dur, hit_dur):
+    """Return overlap detection metrics from durations returned by
+    ``overlap_components``, summed over any number of recordings.
+
+    See ``overlap_metrics`` for a description of the return values.
+    """
+    precision = hit_dur / sys_dur if sys_dur > 0 else np.nan
+    recall = hit_dur / ref_dur if ref_dur > 0 else np.nan
+    f1 = 2*hit_dur / (ref_dur + sys_dur) if ref_dur + sys_dur > 0 else np.nan
+    return (precision, recall, f1, ref_dur, ref_dur - hit_dur,
+            sys_dur - hit_dur)
+
+
+def overlap_metrics(ref_turns, sys_turns, uem=None, sys_is_diarization=False):
+    """Return overlap detection metrics pooled over recordings.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    sys_turns : dict or list
+        System overlap regions (or, if ``sys_is_diarization`` is True,
+        speaker turns) in same format as ``ref_turns``. Recordings missing
+        from the system are scored as containing no overlap.
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+
+    sys_is_diarization : bool, optional
+        If True, system overlap regions are derived from speaker turns as for
+        the reference.
+        (Default: False)
+
+    Returns
+    -------
+    precision : float
+        Proportion of system overlap that is reference overlap.
+
+    recall : float
+        Proportion of reference overlap that is detected by the system.
+
+    f1 : float
+        Harmonic mean of precision and recall.
+
+    ref_dur : float
+        Duration of reference overlap in seconds.
+
+    miss : float
+        Duration of reference overlap not detected by the system in seconds.
+
+    fa : float
+        Duration of system overlap that is not reference overlap in seconds.
+    """
+    ref_rec_id_to_turns = _as_rec_id_to_turns(ref_turns)
+    sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+    rec_id_to_uem = {} if uem is None else _as_rec_id_to_turns(uem)
+    totals = np.zeros(3)
+    for rec_id in sorted(ref_rec_id_to_turns):
+        totals += overlap_components(
+            ref_rec_id_to_turns[rec_id], sys_rec_id_to_turns.get(rec_id, []),
+            rec_id_to_uem.get(rec_id), sys_is_diarization)
+    return overlap_metrics_from_durations(*totals)
+
+
+def score_overlap(ref_rttm_fn, sys_rttm_fn, uem_fn=None,
+                  sys_is_diarization=False):
+    """Score overlap detection output in RTTM files.
+
+    Equivalent to ``overlap_metrics``, but takes paths to reference and
+    system RTTM files and, optionally, a UEM file.
+    """
+    rec_id_to_uem = None if uem_fn is None else load_uem(uem_fn)
+    return overlap_metrics(
+        rttm_to_turns(ref_rttm_fn), rttm_to_turns(sys_rttm_fn),
+        rec_id_to_uem, sys_is_diarization)
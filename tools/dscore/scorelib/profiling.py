@@ -0,0 +1,211 @@
+"""Lightweight instrumentation for profiling the stages of scoring."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python < 3.4.
+    tracemalloc = None
+
+__all__ = ['get_profiler', 'Profiler', 'NULL_PROFILER']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def _max_rss_mb():
+    """Return peak resident set size of current process in MB."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on OS X, but KB elsewhere.
+    if sys.platform == 'darwin':
+        return max_rss / 2.**20
+    return max_rss / 2.**10
+
+
+class _StageTimer(object):
+    """Context manager that records time and memory for one stage."""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = None
+
+    def __enter__(self):
+        if self.profiler._use_tracemalloc and hasattr(tracemalloc,
+                                                      'reset_peak'):
+            tracemalloc.reset_peak()
+        self.t0 = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = timer() - self.t0
+        if self.profiler._use_tracemalloc:
+            peak_mem = tracemalloc.get_traced_memory()[1] / 2.**20
+        else:
+            peak_mem = _max_rss_mb()
+        self.profiler.record(self.name, elapsed, peak_mem)
+        return False
+
+
+class _NullStageTimer(object):
+    """Context manager that does nothing."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class Profiler(object):
+    """Accumulate wall-clock times and peak memory for stages of scoring.
+
+    Stages are timed by wrapping them in the context manager returned by
+    ``stage``:
+
+        profiler = Profiler()
+        with profiler.stage('parse'):
+            turns = rttm_to_turns(rttm_fn)
+        print(profiler.format_table())
+
+    For each stage, the number of calls, total and maximum time in seconds,
+    and peak memory in MB are recorded. By default, peak memory is the peak
+    resident set size of the process sampled at the end of each call. If
+    ``use_tracemalloc`` is True, it is instead the peak memory allocated
+    during the call as reported by ``tracemalloc``, which is more precise, but
+    slows down execution. Stages should not be nested.
+
+    Profilers from different processes (e.g., pool workers) may be combined
+    via ``merge``.
+
+    Parameters
+    ----------
+    use_tracemalloc : bool, optional
+        If True, measure memory using ``tracemalloc``, starting it if
+        necessary.
+        (Default: False)
+    """
+    enabled = True
+
+    def __init__(self, use_tracemalloc=False):
+        self._use_tracemalloc = use_tracemalloc and tracemalloc is not None
+        if self._use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.stats = {}
+        self.stage_names = []
+
+    def stage(self, name):
+        """Return context manager that times stage ``name``."""
+        return _StageTimer(self, name)
+
+    def record(self, name, elapsed, peak_mem=None, n_calls=1,
+               max_time=None):
+        """Record call(s) of stage ``name``.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+
+        elapsed : float
+            Total time in seconds.
+
+        peak_mem : float, optional
+            Peak memory in MB.
+            (Default: None)
+
+        n_calls : int, optional
+            Number of calls.
+            (Default: 1)
+
+        max_time : float, optional
+            Maximum time of a single call in seconds. If None, ``elapsed``.
+            (Default: None)
+        """
+        if max_time is None:
+            max_time = elapsed
+        if name not in self.stats:
+            self.stage_names.append(name)
+            self.stats[name] = {'calls': 0,
+                                'total_time': 0.0,
+                                'max_time': 0.0,
+                                'peak_mem_mb': None}
+        stats = self.stats[name]
+        stats['calls'] += n_calls
+        stats['total_time'] += elapsed
+        stats['max_time'] = max(stats['max_time'], max_time)
+        if peak_mem is not None:
+            stats['peak_mem_mb'] = max(stats['peak_mem_mb'] or 0, peak_mem)
+
+    def merge(self, other):
+        """Add stats from ``other``, which may be a ``Profiler`` or the
+        output of its ``to_dict`` method."""
+        if isinstance(other, Profiler):
+            other = other.to_dict()
+        for name in other['stage_names']:
+            stats = other['stats'][name]
+            self.record(name, stats['total_time'], stats['peak_mem_mb'],
+                        stats['calls'], stats['max_time'])
+
+    def to_dict(self):
+        """Return stats as JSON-serializable dict."""
+        return {'stage_names': list(self.stage_names),
+                'stats': dict((name, dict(stats))
+                              for name, stats in self.stats.items())}
+
+    def to_json(self, fn):
+        """Write stats to JSON file ``fn``."""
+        with open(fn, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    def format_table(self):
+        """Return stats formatted as a table."""
+        total = sum(stats['total_time'] for stats in self.stats.values())
+        lines = ['%-16s %8s %10s %10s %10s %7s %10s' % (
+            'STAGE', 'CALLS', 'TOTAL (s)', 'MEAN (s)', 'MAX (s)', '%TIME',
+            'PEAK (MB)')]
+        for name in self.stage_names:
+            stats = self.stats[name]
+            peak_mem = stats['peak_mem_mb']
+            lines.append('%-16s %8d %10.4f %10.4f %10.4f %7.1f %10s' % (
+                name, stats['calls'], stats['total_time'],
+                stats['total_time'] / max(stats['calls'], 1),
+                stats['max_time'],
+                100.*stats['total_time'] / total if total else 0.0,
+                'N/A' if peak_mem is None else '%.1f' % peak_mem))
+        lines.append('%-16s %8s %10.4f' % ('TOTAL', '', total))
+        return '\n'.join(lines)
+
+
+class _NullProfiler(Profiler):
+    """Profiler that records nothing. Used when profiling is disabled."""
+    enabled = False
+
+    def __init__(self):
+        Profiler.__init__(self)
+
+    def stage(self, name):
+        return _NULL_STAGE_TIMER
+
+    def record(self, *args, **kwargs):
+        pass
+
+
+_NULL_STAGE_TIMER = _NullStageTimer()
+NULL_PROFILER = _NullProfiler()
+
+
+def get_profiler(profiler=None):
+    """Return ``profiler`` if not None, else a profiler that does nothing."""
+    return NULL_PROFILER if profiler is None else profiler
@@ -0,0 +1,154 @@
+"""Functions for evaluating speech activity detection (SAD)."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .intervals import elementary_segments, merge_intervals
+from .score import _as_rec_id_to_turns, _turn_arrays, load_uem, rttm_to_turns
+
+__all__ = ['sad_components', 'sad_metrics', 'score_sad', 'P_TARGET']
+
+
+# Prior probability of speech used when computing detection cost. The value
+# of 0.75 weights misses three times as heavily as false alarms, following
+# the NIST OpenSAT evaluations.
+P_TARGET = 0.75
+
+
+def sad_components(ref_turns, sys_turns, collar=0.0, uem=None):
+    """Return durations needed to compute SAD metrics for one recording.
+
+    Speakers are collapsed so that the reference and system are each reduced
+    to the union of their turns (speech), with everything else non-speech.
+    Durations are computed exactly from these intervals via
+    ``intervals.elementary_segments``.
+
+    Parameters
+    ----------
+    ref_turns : list of Turn
+        Reference speaker turns. May also be a sequence of
+        (onset, offset, speaker_id) triples.
+
+    sys_turns : list of Turn
+        System speaker turns in same format as ``ref_turns``.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Regions within +/- ``collar``
+        seconds of reference speech boundaries are not scored.
+        (Default: 0.0)
+
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds. If None, the
+        region from 0 to the end of the last reference or system turn is
+        scored.
+        (Default: None)
+
+    Returns
+    -------
+    speech : float
+        Scored reference speech in seconds.
+
+    nonspeech : float
+        Scored reference non-speech in seconds.
+
+    miss : float
+        Scored reference speech not detected by the system in seconds.
+
+    fa : float
+        Scored reference non-speech detected as speech by the system in
+        seconds.
+    """
+    ref_onsets, ref_offsets = merge_intervals(*_turn_arrays(ref_turns)[:2])
+    sys_onsets, sys_offsets = merge_intervals(*_turn_arrays(sys_turns)[:2])
+    if uem is None:
+        end = max(ref_offsets.max(initial=0), sys_offsets.max(initial=0))
+        uem = np.array([[0., end]])
+    uem = np.asarray(uem, dtype='float64').reshape(-1, 2)
+    uem_onsets, uem_offsets = merge_intervals(uem[:, 0], uem[:, 1])
+    boundaries = np.concatenate([ref_onsets, ref_offsets])
+    collar_onsets, collar_offsets = merge_intervals(
+        boundaries - collar, boundaries + collar)
+
+    durs, (is_uem, is_collar, is_ref, is_sys) = elementary_segments([
+        (uem_onsets, uem_offsets), (collar_onsets, collar_offsets),
+        (ref_onsets, ref_offsets), (sys_onsets, sys_offsets)])
+    is_scored = is_uem & ~is_collar
+    speech = durs[is_scored & is_ref].sum()
+    nonspeech = durs[is_scored & ~is_ref].sum()
+    miss = durs[is_scored & is_ref & ~is_sys].sum()
+    fa = durs[is_scored & ~is_ref & is_sys].sum()
+    return speech, nonspeech, miss, fa
+
+
+def sad_metrics(ref_turns, sys_turns, collar=0.0, uem=None):
+    """Return SAD metrics.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    sys_turns : dict or list
+        System diarization or SAD output in same format as ``ref_turns``.
+        Recordings missing from the system are scored as containing no
+        speech.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds.
+        (Default: 0.0)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording. Recordings absent from the mapping are scored as
+        described in ``sad_components``.
+        (Default: None)
+
+    Returns
+    -------
+    miss : float
+        Percent of scored speech missed. NaN if no speech is scored.
+
+    fa : float
+        Percent of scored non-speech detected as speech. NaN if no
+        non-speech is scored.
+
+    dcf : float
+        Detection cost function, ``P_TARGET*miss + (1 - P_TARGET)*fa``.
+
+    accuracy : float
+        Percent of scored time correctly classified as speech or non-speech.
+        NaN if nothing is scored.
+    """
+    ref_rec_id_to_turns = _as_rec_id_to_turns(ref_turns)
+    sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+    rec_id_to_uem = {} if uem is None else _as_rec_id_to_turns(uem)
+    totals = np.zeros(4)
+    for rec_id in sorted(ref_rec_id_to_turns):
+        totals += sad_components(
+            ref_rec_id_to_turns[rec_id], sys_rec_id_to_turns.get(rec_id, []),
+            collar, rec_id_to_uem.get(rec_id))
+    speech, nonspeech, miss, fa = totals
+    miss_rate = 100.*miss / speech if speech > 0 else np.nan
+    fa_rate = 100.*fa / nonspeech if nonspeech > 0 else np.nan
+    dcf = P_TARGET*miss_rate + (1 - P_TARGET)*fa_rate
+    accuracy = np.nan
+    if speech + nonspeech > 0:
+        accuracy = 100.*(1 - (miss + fa) / (speech + nonspeech))
+    return miss_rate, fa_rate, dcf, accuracy
+
+
+def score_sad(ref_rttm_fn, sys_rttm_fn, collar=0.0, uem_fn=None):
+    """Score SAD output in RTTM files.
+
+    Equivalent to ``sad_metrics``, but takes paths to reference and system
+    RTTM files and, optionally, a UEM file.
+    """
+    rec_id_to_uem = None if uem_fn is None else load_uem(uem_fn)
+    return sad_metrics(rttm_to_turns(ref_rttm_fn), rttm_to_turns(sys_rttm_fn),
+                       collar, rec_id_to_uem)
@@ -8,9 +8,30 @@ from collections import defaultdict
 import numpy as np
 
 from . import metrics
+from .intervals import merge_intervals
+from .profiling import get_profiler
 
-__all__ = ['rttm_to_turns', 'rttms_to_frames', 'score', 'turns_to_frames',
-           'Turn']
+__all__ = ['error_segments', 'frame_der', 'load_uem', 'rttm_to_turns',
+           'rttms_to_frames', 'score', 'score_systems', 'score_turns',
+           'scoring_mask', 'speaker_errors', 'turns_dicts_to_frames',
+           'turns_to_activity', 'turns_to_frames', 'uem_mask',
+           'PreparedReference', 'Turn', 'ERROR_TYPES', 'TICKS_PER_SECOND']
+
+
+# Types of error segments returned by ``error_segments``.
+ERROR_TYPES = ['miss', 'fa', 'confusion', 'overlap_miss']
+
+# Number of ticks per second. Times are rounded to the nearest tick (100 ns)
+# before being assigned to frames, so that frame boundaries are computed
+# exactly by integer arithmetic rather than being subject to floating point
+# rounding.
+TICKS_PER_SECOND = 10000000
+
+
+def _to_ticks(times):
+    """Return ``times`` in seconds rounded to the nearest tick."""
+    times = np.asarray(times, dtype='float64')
+    return np.rint(times*TICKS_PER_SECOND).astype('int64')
 
 
 class Turn(object):
@@ -26,10 +47,24 @@ class Turn(object):
 
     offset : float
         Turn offset in seconds.
+
+    confidence : float, optional
+        Confidence score of turn. None if unavailable.
+        (Default: None)
+
+    Attributes
+    ----------
+    onset_ticks : int
+        Turn onset in ticks (see ``TICKS_PER_SECOND``).
+
+    offset_ticks : int
+        Turn offset in ticks.
     """
-    def __init__(self, speaker_id, onset, offset):
+    def __init__(self, speaker_id, onset, offset, confidence=None):
         self.__dict__.update(locals())
         del self.self
+        self.onset_ticks = int(round(onset*TICKS_PER_SECOND))
+        self.offset_ticks = int(round(offset*TICKS_PER_SECOND))
 
     def __repr__(self):
         return ('Speaker: %s, Onset: %.2f, Offset: %.2f' %
@@ -51,7 +86,9 @@ def rttm_to_turns(rttm_fn, enc='utf-8'):
     Returns
     -------
     rec_id_to_turns : dict
-        Mapping from recording ids to speaker turns.
+        Mapping from recording ids to speaker turns. The confidence field of
+        each RTTM line, if present and not ``<NA>``, is stored in the
+        ``confidence`` attribute of the corresponding turn.
     """
     with open(rttm_fn, 'rb') as f:
         rec_id_to_turns = defaultdict(list)
@@ -62,17 +99,241 @@ def rttm_to_turns(rttm_fn, enc='utf-8'):
             dur = float(fields[4])
             offset = onset + dur
             speaker_id = fields[7]
-            rec_id_to_turns[rec_id].append(Turn(speaker_id, onset, offset))
+            confidence = None
+            if len(fields) > 8 and fields[8] != '<NA>':
+                confidence = float(fields[8])
+            rec_id_to_turns[rec_id].append(
+                Turn(speaker_id, onset, offset, confidence))
     return dict(rec_id_to_turns)
 
 
+def load_uem(uem_fn, enc='utf-8'):
+    """Load scoring regions from un-partitioned evaluation map (UEM) file.
+
+    Each line of a UEM file contains the recording id, channel, onset, and
+    offset of a scoring region, separated by whitespace. Lines starting with
+    ``;;`` are treated as comments.
+
+    Parameters
+    ----------
+    uem_fn : str
+        Path to UEM file.
+
+    enc : str, optional
+        Encoding.
+        (Default: 'utf-8')
+
+    Returns
+    -------
+    rec_id_to_uem : dict
+        Mapping from recording ids to scoring regions, each an ndarray of
+        shape (n_regions, 2) whose rows are (onset, offset) pairs in seconds.
+    """
+    rec_id_to_uem = defaultdict(list)
+    with open(uem_fn, 'rb') as f:
+        for line in f:
+            line = line.decode(enc).strip()
+            if not line or line.startswith(';;'):
+                continue
+            fields = line.split()
+            rec_id_to_uem[fields[0]].append(
+                (float(fields[2]), float(fields[3])))
+    return dict((rec_id, np.array(regions, dtype='float64'))
+                for rec_id, regions in rec_id_to_uem.items())
+
+
+def _turn_arrays(turns):
+    """Return onsets, offsets, and speaker ids of ``turns`` as arrays.
+
+    ``turns`` may be either a list of ``Turn`` instances or a sequence of
+    (onset, offset, speaker_id) triples (e.g., an ndarray of shape
+    (n_turns, 3)).
+    """
+    if len(turns) == 0:
+        return (np.zeros(0, dtype='float64'), np.zeros(0, dtype='float64'),
+                np.zeros(0, dtype='U1'))
+    if isinstance(turns[0], Turn):
+        onsets = np.array([turn.onset for turn in turns], dtype='float64')
+        offsets = np.array([turn.offset for turn in turns], dtype='float64')
+        speaker_ids = np.array([turn.speaker_id for turn in turns])
+    else:
+        turns = np.asarray(turns, dtype=object)
+        onsets = turns[:, 0].astype('float64')
+        offsets = turns[:, 1].astype('float64')
+        speaker_ids = turns[:, 2].astype('U')
+    return onsets, offsets, speaker_ids
+
+
+def _turn_ticks(turns):
+    """Return onsets and offsets of ``turns`` in ticks as arrays.
+
+    ``turns`` is as for ``_turn_arrays``. The ticks of ``Turn`` instances are
+    those computed when they were created.
+    """
+    if len(turns) and isinstance(turns[0], Turn):
+        onsets = np.array([turn.onset_ticks for turn in turns], dtype='int64')
+        offsets = np.array([turn.offset_ticks for turn in turns],
+                           dtype='int64')
+        return onsets, offsets
+    onsets, offsets, _ = _turn_arrays(turns)
+    return _to_ticks(onsets), _to_ticks(offsets)
+
+
+def _speaker_intervals(turns):
+    """Return speaker ids and merged intervals of each speaker in ``turns``.
+
+    The intervals of each speaker are returned as an (onsets, offsets) pair
+    of sorted, disjoint intervals.
+    """
+    onsets, offsets, speaker_ids = _turn_arrays(turns)
+    speaker_classes, speaker_class_inds = np.unique(
+        speaker_ids, return_inverse=True)
+    intervals = [merge_intervals(onsets[speaker_class_inds == ii],
+                                 offsets[speaker_class_inds == ii])
+                 for ii in range(speaker_classes.size)]
+    return speaker_classes, intervals
+
+
+def _turn_confidences(turns):
+    """Return confidences of ``turns`` as array.
+
+    ``turns`` may be either a list of ``Turn`` instances or a sequence of
+    (onset, offset, speaker_id, confidence) tuples. Missing confidences are
+    returned as NaN.
+    """
+    if len(turns) == 0:
+        return np.zeros(0, dtype='float64')
+    if isinstance(turns[0], Turn):
+        confidences = [turn.confidence for turn in turns]
+    else:
+        confidences = [turn[3] if len(turn) > 3 else None for turn in turns]
+    return np.array([np.nan if confidence is None else confidence
+                     for confidence in confidences], dtype='float64')
+
+
+def _step_ticks(step):
+    """Return frame step size ``step`` in ticks."""
+    step_ticks = int(_to_ticks(step))
+    if step_ticks <= 0:
+        raise ValueError('Step size must be at least 1 tick: %r' % step)
+    return step_ticks
+
+
+def _n_frames(dur, step=0.010):
+    """Return number of whole frames in ``dur`` seconds."""
+    return int(_to_ticks(dur)) // _step_ticks(step)
+
+
+def _ticks_to_frames(ticks, n_frames, step=0.010):
+    """Return indices of first frames whose onsets are >= ``ticks``.
+
+    Indices are clipped to ``[0, n_frames]``.
+    """
+    step_ticks = _step_ticks(step)
+    inds = -(-np.asarray(ticks, dtype='int64') // step_ticks)
+    return np.clip(inds, 0, n_frames)
+
+
+def _times_to_frames(times, n_frames, step=0.010):
+    """Return indices of first frames whose onsets are >= ``times``."""
+    return _ticks_to_frames(_to_ticks(times), n_frames, step)
+
+
+def uem_mask(uem, n_frames, step=0.010):
+    """Return mask indicating which frames lie within scoring regions.
+
+    Parameters
+    ----------
+    uem : ndarray, (n_regions, 2)
+        Scoring regions as (onset, offset) pairs in seconds. Regions may
+        overlap.
+
+    n_frames : int
+        Number of frames.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    Returns
+    -------
+    mask : ndarray, (n_frames,)
+        Boolean array whose i-th entry is True IFF the i-th frame lies within
+        a scoring region.
+    """
+    uem = np.asarray(uem, dtype='float64').reshape(-1, 2)
+    bis = _times_to_frames(uem[:, 0], n_frames, step)
+    eis = _times_to_frames(uem[:, 1], n_frames, step)
+    # Number of regions covering each frame.
+    n_regions = np.zeros(n_frames + 1, dtype='int64')
+    np.add.at(n_regions, bis, 1)
+    np.add.at(n_regions, eis, -1)
+    return np.cumsum(n_regions[:-1]) > 0
+
+
+def _uem_dur(uem):
+    """Return offset of last scoring region in ``uem`` (0 if None)."""
+    if uem is None:
+        return 0.
+    return np.asarray(uem, dtype='float64').reshape(-1, 2)[:, 1].max(initial=0)
+
+
+def turns_to_activity(turns, n_frames, step=0.010):
+    """Return frame-level speaker activity matrix corresponding to diarization.
+
+    Parameters
+    ----------
+    turns : list of Turn
+        Speaker turns. May also be a sequence of (onset, offset, speaker_id)
+        triples.
+
+    n_frames : int
+        Number of frames.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    Returns
+    -------
+    speaker_classes : ndarray, (n_speakers,)
+        Speaker ids.
+
+    X : ndarray, (n_frames, n_speakers)
+        Boolean matrix whose i,j-th entry is True IFF the j-th speaker was
+        present at frame i.
+    """
+    speaker_ids = _turn_arrays(turns)[2]
+    onsets, offsets = _turn_ticks(turns)
+    speaker_classes, speaker_class_inds = np.unique(
+        speaker_ids, return_inverse=True)
+    X = np.zeros((n_frames, speaker_classes.size), dtype='bool')
+    bis = _ticks_to_frames(onsets, n_frames, step)
+    eis = _ticks_to_frames(offsets, n_frames, step)
+    for bi, ei, speaker_class_ind in zip(bis, eis, speaker_class_inds):
+        X[bi:ei, speaker_class_ind] = True
+    return speaker_classes, X
+
+
+def _activity_to_labels(X):
+    """Return frame-level labels corresponding to speaker activity matrix.
+
+    The label of each frame is the sum of ``2**j`` over the speakers ``j``
+    present, with non-speech frames assigned label ``2**n_speakers``.
+    """
+    pows = 2**np.arange(X.shape[1] + 1, dtype='int64')
+    is_nil = ~(X.any(axis=1))
+    return X.dot(pows[:-1]) + pows[-1]*is_nil
+
+
 def turns_to_frames(turns, dur=None, step=0.010, as_string=False):
     """Return frame-level labels corresponding to diarization.
 
     Parameters
     ----------
     turns : list of Turn
-        Speaker turns.
+        Speaker turns. May also be a sequence of (onset, offset, speaker_id)
+        triples.
 
     dur : float, optional
         Recording duration in seconds. If None, determined from ``turns``.
@@ -91,30 +352,17 @@ def turns_to_frames(turns, dur=None, step=0.010, as_string=False):
     labels : ndarray, (n_frames,)
         Frame-level labels.
     """
-    onsets = [turn.onset for turn in turns]
-    offsets = [turn.offset for turn in turns]
-    speaker_ids = [turn.speaker_id for turn in turns]
     if dur is None:
-        dur = max(offsets)
+        dur = _turn_arrays(turns)[1].max()
 
     # Create matrix whose i,j-th entry is True IFF the j-th speaker was
     # present at frame i.
-    speaker_classes, speaker_class_inds = np.unique(
-        speaker_ids, return_inverse=True)
+    n_frames = _n_frames(dur, step)
+    speaker_classes, X = turns_to_activity(turns, n_frames, step)
     speaker_classes = np.concatenate([speaker_classes, ['non-speech']])
-    n_frames = int(dur/step)
-    X = np.zeros((n_frames, speaker_classes.size), dtype='bool')
-    times = step*np.arange(n_frames)
-    bis = np.searchsorted(times, onsets)
-    eis = np.searchsorted(times, offsets)
-    for bi, ei, speaker_class_ind in zip(bis, eis, speaker_class_inds):
-        X[bi:ei, speaker_class_ind] = True
-    is_nil = ~(X.any(axis=1))
-    X[is_nil, -1] = True
 
     # Now, convert to frame-level labelings.
-    pows = 2**np.arange(X.shape[1])
-    labels = np.sum(pows*X, axis=1)
+    labels = _activity_to_labels(X)
     if as_string:
         def to_binary(n):
             return [bool(int(x))
@@ -132,60 +380,689 @@ def turns_to_frames(turns, dur=None, step=0.010, as_string=False):
     return labels
 
 
-def rttms_to_frames(ref_rttm_fn, sys_rttm_fn, step=0.010):
-    """Return frame-level labels corresponding to reference and system RTTMs.
+def scoring_mask(turns, n_frames, collar=0.250, ignore_overlaps=True,
+                 step=0.010, uem=None):
+    """Return mask indicating which frames are scored when computing DER.
 
     Parameters
     ----------
-    ref_rttm_fn : str
-        Path to reference RTTM file.
+    turns : list of Turn
+        Reference speaker turns. May also be a sequence of
+        (onset, offset, speaker_id) triples.
 
-    sys_rttm_fn : str
-        Path to system RTTM file.
+    n_frames : int
+        Number of frames.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Frames within +/- ``collar``
+        seconds of reference speaker boundaries will not be scored.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, frames covered by more than one reference turn will not be
+        scored. As with ``md-eval.pl``, this includes frames in which a
+        speaker's turns overlap each other.
+        (Default: True)
 
     step : float, optional
         Frame step size  in seconds.
         (Default: 0.01)
 
+    uem : ndarray, (n_regions, 2), optional
+        Scoring regions as (onset, offset) pairs in seconds. If None, the
+        extent of the reference turns is scored.
+        (Default: None)
+
+    Returns
+    -------
+    scored : ndarray, (n_frames,)
+        Boolean array whose i-th entry is True IFF the i-th frame is scored.
+    """
+    # As with md-eval.pl, in the absence of a UEM only the extent of the
+    # reference turns is scored.
+    onsets, offsets = _turn_ticks(turns)
+    scored = np.zeros(n_frames, dtype='bool')
+    if uem is not None:
+        scored = uem_mask(uem, n_frames, step)
+    elif onsets.size:
+        bi, ei = _ticks_to_frames(
+            [onsets.min(), offsets.max()], n_frames, step)
+        scored[bi:ei] = True
+    if collar > 0:
+        boundaries = np.concatenate([onsets, offsets])
+        collar = _to_ticks(collar)
+        bis = _ticks_to_frames(boundaries - collar, n_frames, step)
+        eis = _ticks_to_frames(boundaries + collar, n_frames, step)
+        # Number of collars covering each frame.
+        n_collars = np.zeros(n_frames + 1, dtype='int64')
+        np.add.at(n_collars, bis, 1)
+        np.add.at(n_collars, eis, -1)
+        scored &= np.cumsum(n_collars[:-1]) == 0
+    if ignore_overlaps:
+        # Overlaps are determined by counting turns rather than speakers, as
+        # in md-eval.pl.
+        bis = _ticks_to_frames(onsets, n_frames, step)
+        eis = np.maximum(_ticks_to_frames(offsets, n_frames, step), bis)
+        n_turns = np.zeros(n_frames + 1, dtype='int64')
+        np.add.at(n_turns, bis, 1)
+        np.add.at(n_turns, eis, -1)
+        scored &= np.cumsum(n_turns[:-1]) <= 1
+    return scored
+
+
+def _as_rec_id_to_turns(turns):
+    """Return mapping from recording ids to turns for in-memory diarization.
+
+    ``turns`` may be either a mapping from recording ids to turns or the turns
+    of a single recording, in which case the recording id is the empty
+    string.
+    """
+    if isinstance(turns, dict):
+        return turns
+    return {'': turns}
+
+
+def turns_dicts_to_frames(ref_rec_id_to_turns, sys_rec_id_to_turns,
+                          step=0.010, rec_id_to_uem=None):
+    """Return frame-level labels corresponding to reference and system turns.
+
+    Parameters
+    ----------
+    ref_rec_id_to_turns : dict
+        Mapping from recording ids to reference speaker turns.
+
+    sys_rec_id_to_turns : dict
+        Mapping from recording ids to system speaker turns.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    rec_id_to_uem : dict, optional
+        Mapping from recording ids to scoring regions (as returned by
+        ``load_uem``). Recordings present in this mapping are scored only
+        within their scoring regions; others are scored as if no UEM were
+        given.
+        (Default: None)
+
     Returns
     -------
     ref_labels : ndarray, (n_frames,)
-        Frame-level labels corresponding to reference RTTM.
+        Frame-level labels corresponding to reference turns.
 
     sys_labels : ndarray, (n_frames,)
-        Frame-level labels corresponding to system RTTM.
+        Frame-level labels corresponding to system turns.
     """
-    ref_rec_id_to_turns = rttm_to_turns(ref_rttm_fn)
-    sys_rec_id_to_turns = rttm_to_turns(sys_rttm_fn)
+    if rec_id_to_uem is None:
+        rec_id_to_uem = {}
     ref_labels = []
     sys_labels = []
     max_ref_label = max_sys_label = 0
     rec_ids = sorted(set(ref_rec_id_to_turns.keys()) &
                      set(sys_rec_id_to_turns.keys()))
     for rec_id in rec_ids:
-        # Determine recording duration.
+        # Determine recording duration. If there is a UEM, this is the end of
+        # the last scoring region, so that trailing non-speech is retained.
         ref_turns = ref_rec_id_to_turns[rec_id]
         sys_turns = sys_rec_id_to_turns[rec_id]
-        ref_dur = max(turn.offset for turn in ref_turns)
-        sys_dur = max(turn.offset for turn in sys_turns)
-        dur = min(ref_dur, sys_dur)
+        uem = rec_id_to_uem.get(rec_id)
+        if uem is None:
+            ref_dur = _turn_arrays(ref_turns)[1].max()
+            sys_dur = _turn_arrays(sys_turns)[1].max()
+            dur = min(ref_dur, sys_dur)
+        else:
+            dur = _uem_dur(uem)
 
         # Determine labels, ensuring that frames from different recordings
         # have distinct labels.
         ref_labels_ = turns_to_frames(ref_turns, dur, step) + max_ref_label
-        ref_labels.append(ref_labels_)
-        max_ref_label = ref_labels_.max()
         sys_labels_ = turns_to_frames(sys_turns, dur, step) + max_sys_label
+        if uem is not None:
+            mask = uem_mask(uem, ref_labels_.size, step)
+            ref_labels_ = ref_labels_[mask]
+            sys_labels_ = sys_labels_[mask]
+        ref_labels.append(ref_labels_)
+        max_ref_label = ref_labels_.max(initial=max_ref_label)
         sys_labels.append(sys_labels_)
-        max_sys_label = sys_labels_.max()
+        max_sys_label = sys_labels_.max(initial=max_sys_label)
     ref_labels = np.concatenate(ref_labels)
     sys_labels = np.concatenate(sys_labels)
 
     return ref_labels, sys_labels
 
 
+def rttms_to_frames(ref_rttm_fn, sys_rttm_fn, step=0.010, profiler=None,
+                    uem_fn=None):
+    """Return frame-level labels corresponding to reference and system RTTMs.
+
+    Parameters
+    ----------
+    ref_rttm_fn : str
+        Path to reference RTTM file.
+
+    sys_rttm_fn : str
+        Path to system RTTM file.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    profiler : scorelib.profiling.Profiler, optional
+        If not None, time and memory usage of the "parse" and "frames" stages
+        are recorded to this profiler.
+        (Default: None)
+
+    uem_fn : str, optional
+        Path to UEM file. If not None, only frames within the scoring regions
+        it specifies are returned.
+        (Default: None)
+
+    Returns
+    -------
+    ref_labels : ndarray, (n_frames,)
+        Frame-level labels corresponding to reference RTTM.
+
+    sys_labels : ndarray, (n_frames,)
+        Frame-level labels corresponding to system RTTM.
+    """
+    profiler = get_profiler(profiler)
+    with profiler.stage('parse'):
+        ref_rec_id_to_turns = rttm_to_turns(ref_rttm_fn)
+        sys_rec_id_to_turns = rttm_to_turns(sys_rttm_fn)
+        rec_id_to_uem = None if uem_fn is None else load_uem(uem_fn)
+    with profiler.stage('frames'):
+        ref_labels, sys_labels = turns_dicts_to_frames(
+            ref_rec_id_to_turns, sys_rec_id_to_turns, step, rec_id_to_uem)
+    return ref_labels, sys_labels
+
+
+class PreparedReference(object):
+    """Reference diarization with frame-level representations precomputed.
+
+    When scoring many systems against the same reference (e.g., in a
+    hyperparameter sweep), the speaker activity matrix, frame-level labels,
+    and DER scoring mask (collars, overlap exclusions, and UEM) of each
+    reference recording need only be computed once. Instances of this class
+    compute them on construction; each system is then scored via ``score``,
+    ``der``, or ``frames``, paying only for its own framing and comparison:
+
+        ref = PreparedReference(ref_turns, collar=0.250)
+        for sys_turns in systems:
+            metrics = ref.score(sys_turns)
+
+    Results are identical to those of ``score_turns``, ``frame_der``, and
+    ``turns_dicts_to_frames`` with the same arguments.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Only relevant for computing
+        DER.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking. Only relevant for computing DER.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+    """
+    def __init__(self, ref_turns, collar=0.250, ignore_overlaps=True,
+                 step=0.010, uem=None):
+        self.collar = collar
+        self.ignore_overlaps = ignore_overlaps
+        self.step = step
+        self.rec_id_to_turns = _as_rec_id_to_turns(ref_turns)
+        rec_id_to_uem = {} if uem is None else _as_rec_id_to_turns(uem)
+        self.rec_ids = sorted(self.rec_id_to_turns)
+        self.recordings = {}
+        for rec_id in self.rec_ids:
+            turns = self.rec_id_to_turns[rec_id]
+            uem = rec_id_to_uem.get(rec_id)
+            ref_dur = _turn_arrays(turns)[1].max(initial=0)
+            n_frames = _n_frames(max(ref_dur, _uem_dur(uem)), step)
+            _, X = turns_to_activity(turns, n_frames, step)
+            rec = {'dur': ref_dur,
+                   'uem': uem,
+                   'X': X,
+                   'labels': _activity_to_labels(X),
+                   'scored': scoring_mask(
+                       turns, n_frames, collar, ignore_overlaps, step, uem),
+                   'in_uem': None}
+            if uem is not None:
+                rec['in_uem'] = uem_mask(uem, n_frames, step)
+            self.recordings[rec_id] = rec
+
+    def _sys_rec_id_to_X(self, sys_rec_id_to_turns):
+        """Return activity matrices of system turns on reference frames."""
+        rec_id_to_X = {}
+        for rec_id in self.rec_ids:
+            n_frames = self.recordings[rec_id]['X'].shape[0]
+            sys_turns = sys_rec_id_to_turns.get(rec_id, [])
+            rec_id_to_X[rec_id] = turns_to_activity(
+                sys_turns, n_frames, self.step)[1]
+        return rec_id_to_X
+
+    def _der(self, sys_rec_id_to_X):
+        n_scored = n_errors = 0
+        for rec_id in self.rec_ids:
+            rec = self.recordings[rec_id]
+            n_ref, n_miss, n_fa, n_conf = metrics.der_components(
+                rec['X'], sys_rec_id_to_X[rec_id], rec['scored'])
+            n_scored += n_ref
+            n_errors += n_miss + n_fa + n_conf
+        return 100.*n_errors / max(n_scored, 1)
+
+    def _der_by_degree(self, sys_rec_id_to_X, max_degree):
+        """Return percent missed, false alarm, and confused speaker time
+        for each number of reference speakers from 0 to ``max_degree``.
+
+        Each is expressed as a percent of the total scored reference speaker
+        time, so that summing over degrees recovers the overall components of
+        DER.
+        """
+        n_scored = 0
+        n_errors = np.zeros((3, max_degree + 1))
+        for rec_id in self.rec_ids:
+            rec = self.recordings[rec_id]
+            ref_X = rec['X'][rec['scored']]
+            sys_X = sys_rec_id_to_X[rec_id][rec['scored']]
+            degrees = np.minimum(ref_X.sum(axis=1), max_degree)
+            n_scored += ref_X.sum()
+            for ii, n_errors_ in enumerate(metrics.frame_errors(ref_X, sys_X)):
+                n_errors[ii] += np.bincount(
+                    degrees, n_errors_, minlength=max_degree + 1)
+        return 100.*n_errors / max(n_scored, 1)
+
+    def _frames(self, sys_rec_id_to_turns, sys_rec_id_to_X,
+                return_degrees=False):
+        ref_labels = []
+        sys_labels = []
+        ref_degrees = []
+        max_ref_label = max_sys_label = 0
+        for rec_id in self.rec_ids:
+            if rec_id not in sys_rec_id_to_turns:
+                continue
+            rec = self.recordings[rec_id]
+            # As in turns_dicts_to_frames, frames extend to the end of the
+            # last scoring region or, absent a UEM, to the end of whichever
+            # of the reference and system turns ends first.
+            if rec['uem'] is None:
+                sys_dur = _turn_arrays(
+                    sys_rec_id_to_turns[rec_id])[1].max(initial=0)
+                n_frames = _n_frames(min(rec['dur'], sys_dur), self.step)
+                mask = slice(0, n_frames)
+            else:
+                n_frames = _n_frames(_uem_dur(rec['uem']), self.step)
+                mask = np.flatnonzero(rec['in_uem'][:n_frames])
+            ref_labels_ = rec['labels'][mask] + max_ref_label
+            sys_labels_ = _activity_to_labels(
+                sys_rec_id_to_X[rec_id][mask]) + max_sys_label
+            ref_labels.append(ref_labels_)
+            max_ref_label = ref_labels_.max(initial=max_ref_label)
+            sys_labels.append(sys_labels_)
+            max_sys_label = sys_labels_.max(initial=max_sys_label)
+            if return_degrees:
+                ref_degrees.append(rec['X'][mask].sum(axis=1))
+        if not ref_labels:
+            # No recording is shared with the system.
+            ref_labels = sys_labels = ref_degrees = [np.zeros(0, 'int64')]
+        ref_labels = np.concatenate(ref_labels)
+        sys_labels = np.concatenate(sys_labels)
+        if return_degrees:
+            return ref_labels, sys_labels, np.concatenate(ref_degrees)
+        return ref_labels, sys_labels
+
+    def der(self, sys_turns):
+        """Return overall percent diarization error rate of system.
+
+        ``sys_turns`` may be a mapping from recording ids to speaker turns or
+        the speaker turns of a single recording. Recordings missing from the
+        mapping are scored as entirely missed.
+        """
+        sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+        return self._der(self._sys_rec_id_to_X(sys_rec_id_to_turns))
+
+    def frames(self, sys_turns):
+        """Return frame-level reference and system labels.
+
+        Only recordings present in both reference and system are included.
+        """
+        sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+        return self._frames(
+            sys_rec_id_to_turns, self._sys_rec_id_to_X(sys_rec_id_to_turns))
+
+    def score(self, sys_turns, nats=False, profiler=None, max_degree=None):
+        """Score system against reference.
+
+        Parameters
+        ----------
+        sys_turns : dict or list
+            System diarization in same format as the reference.
+
+        nats : bool, optional
+            If True, use nats as unit for information theoretic metrics.
+            Otherwise, use bits.
+            (Default: False)
+
+        profiler : scorelib.profiling.Profiler, optional
+            If not None, time and memory usage of each stage of scoring
+            ("frames", "der", "contingency", and "metrics") are recorded to
+            this profiler.
+            (Default: None)
+
+        max_degree : int, optional
+            If not None, additionally break down metrics by overlap degree as
+            described in ``score``.
+            (Default: None)
+
+        Returns
+        -------
+        metrics : tuple
+            Same metrics, in the same order, as returned by ``score``.
+        """
+        return self._score(
+            _as_rec_id_to_turns(sys_turns), nats, profiler, max_degree)
+
+    def _score(self, sys_rec_id_to_turns, nats=False, profiler=None,
+               max_degree=None, der=None):
+        """Score system, using ``der`` in place of the in-process DER if it
+        is not None.
+        """
+        profiler = get_profiler(profiler)
+        with profiler.stage('frames'):
+            sys_rec_id_to_X = self._sys_rec_id_to_X(sys_rec_id_to_turns)
+        if der is None:
+            with profiler.stage('der'):
+                der = self._der(sys_rec_id_to_X)
+        if max_degree is None:
+            with profiler.stage('frames'):
+                ref_labels, sys_labels = self._frames(
+                    sys_rec_id_to_turns, sys_rec_id_to_X)
+            return (der, ) + _clustering_metrics(
+                ref_labels, sys_labels, nats, profiler)
+        with profiler.stage('der'):
+            der_by_degree = self._der_by_degree(sys_rec_id_to_X, max_degree)
+        with profiler.stage('frames'):
+            ref_labels, sys_labels, ref_degrees = self._frames(
+                sys_rec_id_to_turns, sys_rec_id_to_X, return_degrees=True)
+        overall, by_degree = _clustering_metrics(
+            ref_labels, sys_labels, nats, profiler, ref_degrees, max_degree)
+        by_degree = [tuple(der_by_degree[:, degree]) + by_degree[degree]
+                     for degree in range(max_degree + 1)]
+        return (der, ) + overall + (by_degree, )
+
+
+def frame_der(ref_rec_id_to_turns, sys_rec_id_to_turns, collar=0.250,
+              ignore_overlaps=True, step=0.010, rec_id_to_uem=None):
+    """Return overall diarization error rate computed from frame-level labels.
+
+    Unlike ``metrics.der``, which calls the NIST ``md-eval.pl`` tool, DER is
+    computed in-process from speaker activity matrices. As with
+    ``md-eval.pl``, each reference recording is scored over the extent of its
+    reference turns and reference and system speakers are mapped one-to-one
+    so as to maximize the total overlap, and if ``ignore_overlaps`` is True,
+    regions covered by more than one reference turn (including overlapping
+    turns of the same speaker) are excluded. Results agree with
+    ``md-eval.pl`` up to the resolution of the frame step.
+
+    Parameters
+    ----------
+    ref_rec_id_to_turns : dict
+        Mapping from recording ids to reference speaker turns.
+
+    sys_rec_id_to_turns : dict
+        Mapping from recording ids to system speaker turns. Recordings
+        missing from this mapping are scored as entirely missed.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    rec_id_to_uem : dict, optional
+        Mapping from recording ids to scoring regions (as returned by
+        ``load_uem``). Recordings present in this mapping are scored only
+        within their scoring regions; others are scored as if no UEM were
+        given.
+        (Default: None)
+
+    Returns
+    -------
+    der : float
+        Overall percent diarization error.
+    """
+    reference = PreparedReference(
+        ref_rec_id_to_turns, collar, ignore_overlaps, step, rec_id_to_uem)
+    return reference.der(sys_rec_id_to_turns)
+
+
+def _runs(mask):
+    """Return onset and offset indices of runs of True in boolean ``mask``."""
+    changes = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    onsets = np.flatnonzero(changes == 1)
+    offsets = np.flatnonzero(changes == -1)
+    return onsets, offsets
+
+
+def error_segments(ref_rec_id_to_turns, sys_rec_id_to_turns, collar=0.250,
+                   ignore_overlaps=True, step=0.010, rec_id_to_uem=None):
+    """Return segments of each recording in which scoring errors occur.
+
+    Errors are determined exactly as in ``frame_der`` and run-length encoded
+    into segments of the following types:
+
+    - miss  --  fewer system than reference speakers in a frame containing at
+      most one reference speaker
+    - overlap_miss  --  fewer system than reference speakers in a frame
+      containing overlapping reference speakers
+    - fa  --  more system than reference speakers
+    - confusion  --  a system speaker is not mapped to any of the reference
+      speakers present
+
+    Segments of different types may overlap.
+
+    Parameters
+    ----------
+    ref_rec_id_to_turns : dict
+        Mapping from recording ids to reference speaker turns.
+
+    sys_rec_id_to_turns : dict
+        Mapping from recording ids to system speaker turns. Recordings
+        missing from this mapping are treated as containing no speech.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    rec_id_to_uem : dict, optional
+        Mapping from recording ids to scoring regions (as returned by
+        ``load_uem``). Recordings present in this mapping are scored only
+        within their scoring regions; others are scored as if no UEM were
+        given.
+        (Default: None)
+
+    Returns
+    -------
+    rec_id_to_segments : dict
+        Mapping from recording ids to lists of error segments, each a
+        (onset, offset, error_type) tuple with times in seconds, ordered by
+        onset.
+    """
+    if rec_id_to_uem is None:
+        rec_id_to_uem = {}
+    rec_id_to_segments = {}
+    for rec_id in sorted(ref_rec_id_to_turns):
+        ref_turns = ref_rec_id_to_turns[rec_id]
+        sys_turns = sys_rec_id_to_turns.get(rec_id, [])
+        uem = rec_id_to_uem.get(rec_id)
+        dur = max(_turn_arrays(ref_turns)[1].max(initial=0), _uem_dur(uem))
+        n_frames = _n_frames(dur, step)
+        _, ref_X = turns_to_activity(ref_turns, n_frames, step)
+        _, sys_X = turns_to_activity(sys_turns, n_frames, step)
+        scored = scoring_mask(
+            ref_turns, n_frames, collar, ignore_overlaps, step, uem)
+        # As in frame_der, speakers are mapped using only scored frames.
+        n_miss, n_fa, n_conf = metrics.frame_errors(ref_X, sys_X, scored)
+        is_overlap = ref_X.sum(axis=1) > 1
+        is_miss = scored & (n_miss > 0)
+        masks = {'miss': is_miss & ~is_overlap,
+                 'overlap_miss': is_miss & is_overlap,
+                 'fa': scored & (n_fa > 0),
+                 'confusion': scored & (n_conf > 0)}
+        onsets = []
+        offsets = []
+        types = []
+        for error_type in ERROR_TYPES:
+            bis, eis = _runs(masks[error_type])
+            onsets.append(bis*step)
+            offsets.append(eis*step)
+            types.extend([error_type]*bis.size)
+        onsets = np.concatenate(onsets)
+        offsets = np.concatenate(offsets)
+        order = np.argsort(onsets, kind='mergesort')
+        rec_id_to_segments[rec_id] = [
+            (onsets[ii], offsets[ii], types[ii]) for ii in order]
+    return rec_id_to_segments
+
+
+def _cm_metrics(cm, nats=False):
+    """Return clustering metrics computed from contingency matrix."""
+    bcubed_precision, bcubed_recall, bcubed_f1 = metrics.bcubed(
+        None, None, cm)
+    tau_ref_sys, tau_sys_ref = metrics.goodman_kruskal_tau(None, None, cm)
+    ce = metrics.conditional_entropy(None, None, cm, nats) # H(ref | sys)
+    mi, nmi = metrics.mutual_information(None, None, cm, nats)
+    return (bcubed_precision, bcubed_recall, bcubed_f1,
+            tau_ref_sys, tau_sys_ref, ce, mi, nmi)
+
+
+def speaker_errors(ref_turns, sys_turns, uem=None):
+    """Return speaker mapping and per-speaker errors for in-memory diarization.
+
+    Errors are computed exactly from the turns by ``metrics.speaker_errors``,
+    without any collar or framing.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    sys_turns : dict or list
+        System diarization in same format as ``ref_turns``. Recordings
+        missing from the system are scored as entirely missed.
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+
+    Returns
+    -------
+    rows : list of tuple
+        One (rec_id, ref_speaker_id, sys_speaker_id, dur, miss, fa,
+        confusion, jer) tuple per reference speaker of each recording, with
+        durations in seconds and JER as a proportion. ``sys_speaker_id`` is
+        None for unmapped reference speakers. The overall Jaccard error rate
+        is the mean of ``jer`` over all rows.
+    """
+    ref_rec_id_to_turns = _as_rec_id_to_turns(ref_turns)
+    sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+    rec_id_to_uem = {} if uem is None else _as_rec_id_to_turns(uem)
+    rows = []
+    for rec_id in sorted(ref_rec_id_to_turns):
+        ref_speaker_ids, ref_intervals = _speaker_intervals(
+            ref_rec_id_to_turns[rec_id])
+        sys_speaker_ids, sys_intervals = _speaker_intervals(
+            sys_rec_id_to_turns.get(rec_id, []))
+        sys_inds, durs, miss, fa, confusion, jers = metrics.speaker_errors(
+            ref_intervals, sys_intervals, rec_id_to_uem.get(rec_id))
+        for ii, ref_speaker_id in enumerate(ref_speaker_ids):
+            sys_speaker_id = None
+            if sys_inds[ii] >= 0:
+                sys_speaker_id = sys_speaker_ids[sys_inds[ii]]
+            rows.append((rec_id, ref_speaker_id, sys_speaker_id, durs[ii],
+                         miss[ii], fa[ii], confusion[ii], jers[ii]))
+    return rows
+
+
+def _clustering_metrics(ref_labels, sys_labels, nats=False, profiler=None,
+                        ref_degrees=None, max_degree=None):
+    """Return clustering metrics between frame-level labelings.
+
+    If ``ref_degrees`` is not None, additionally return a list whose d-th
+    entry contains the metrics restricted to frames with d reference speakers
+    (or, for ``max_degree``, d or more). Since all frames sharing a reference
+    label share a degree, these are computed from row subsets of the same
+    contingency matrix. These are NaN for degrees whose frames have fewer
+    than two reference or system labels, between which they are undefined;
+    in particular, always for degree 0, whose frames are all non-speech. If
+    there are no frames at all, all metrics are NaN.
+    """
+    if ref_labels.size == 0:
+        overall = (np.nan, )*8
+        if ref_degrees is None:
+            return overall
+        return overall, [overall]*(max_degree + 1)
+    profiler = get_profiler(profiler)
+    with profiler.stage('contingency'):
+        cm, ref_classes, _ = metrics.contingency_matrix(
+            ref_labels, sys_labels)
+    with profiler.stage('metrics'):
+        overall = _cm_metrics(cm, nats)
+    if ref_degrees is None:
+        return overall
+    with profiler.stage('metrics'):
+        class_degrees = np.zeros(ref_classes.size, dtype='int64')
+        class_degrees[np.searchsorted(ref_classes, ref_labels)] = np.minimum(
+            ref_degrees, max_degree)
+        by_degree = []
+        for degree in range(max_degree + 1):
+            cm_ = cm[class_degrees == degree]
+            cm_ = cm_[:, cm_.sum(axis=0) > 0]
+            if min(cm_.shape) > 1:
+                by_degree.append(_cm_metrics(cm_, nats))
+            else:
+                by_degree.append((np.nan, )*len(overall))
+    return overall, by_degree
+
+
 def score(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True,
-          step=0.010, nats=False):
+          step=0.010, nats=False, profiler=None, uem_fn=None,
+          max_degree=None, der_components=False, on_der_error=None):
     """Score diarization.
 
     Parameters
@@ -216,6 +1093,37 @@ def score(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True,
         Otherwise, use bits.
         (Default: False)
 
+    profiler : scorelib.profiling.Profiler, optional
+        If not None, time and memory usage of each stage of scoring ("der",
+        "parse", "frames", "contingency", and "metrics") are recorded to this
+        profiler.
+        (Default: None)
+
+    uem_fn : str, optional
+        Path to UEM file specifying the scoring regions of each recording. If
+        not None, all metrics are computed only within these regions.
+        Recordings absent from the UEM are scored as if no UEM were given.
+        (Default: None)
+
+    max_degree : int, optional
+        If not None, additionally break down metrics by overlap degree; that
+        is, by the number of simultaneously active reference speakers, from
+        0 to ``max_degree`` (which includes frames with more than
+        ``max_degree`` speakers).
+        (Default: None)
+
+    der_components : bool, optional
+        If True, additionally return all quantities reported by
+        ``md-eval.pl`` (scored, missed, false alarm, and speaker error time,
+        etc.).
+        (Default: False)
+
+    on_der_error : callable, optional
+        Function called with the path to the system RTTM and the
+        ``metrics.MDEvalError`` raised if ``md-eval.pl`` fails, after which
+        DER (and its components) are NaN. If None, the error is raised.
+        (Default: None)
+
     Returns
     -------
     der : float
@@ -251,18 +1159,175 @@ def score(ref_rttm_fn, sys_rttm_fn, collar=0.250, ignore_overlaps=True,
 
     nmi : float
         Normalized mutual information.
+
+    by_degree : list of tuple
+        Only returned if ``max_degree`` is not None. The d-th entry contains
+        the missed, false alarm, and confused speaker time on frames with d
+        reference speakers (computed in-process as in ``frame_der``, each as a
+        percent of the total scored reference speaker time, so that they sum
+        to DER) followed by the clustering metrics restricted to these
+        frames. The clustering metrics are NaN if these frames have fewer
+        than two distinct reference or system labels (e.g., always for
+        d=0). Note that if ``ignore_overlaps`` is True, no speaker time on
+        frames with more than one reference speaker is scored.
+
+    der_result : metrics.MDEvalResult
+        Only returned if ``der_components`` is True. Overall quantities
+        reported by ``md-eval.pl``.
+
+    Raises
+    ------
+    metrics.MDEvalError
+        If ``md-eval.pl`` fails and ``on_der_error`` is None.
     """
-    try:
-        der = metrics.der(ref_rttm_fn, sys_rttm_fn, collar, ignore_overlaps)
-    except:
-        der = np.nan
-    ref_labels, sys_labels = rttms_to_frames(ref_rttm_fn, sys_rttm_fn, step)
-    cm, _, _ = metrics.contingency_matrix(ref_labels, sys_labels)
-    bcubed_precision, bcubed_recall, bcubed_f1 = metrics.bcubed(
-        None, None, cm)
-    tau_ref_sys, tau_sys_ref = metrics.goodman_kruskal_tau(
-        None, None, cm)
-    ce = metrics.conditional_entropy(None, None, cm, nats) # H(ref | sys)
-    mi, nmi = metrics.mutual_information(None, None, cm, nats)
-    return (der, bcubed_precision, bcubed_recall, bcubed_f1,
-            tau_ref_sys, tau_sys_ref, ce, mi, nmi)
+    return score_systems(
+        ref_rttm_fn, [sys_rttm_fn], collar, ignore_overlaps, step, nats,
+        profiler, uem_fn, max_degree, der_components=der_components,
+        on_der_error=on_der_error)[0]
+
+
+def score_systems(ref_rttm_fn, sys_rttm_fns, collar=0.250,
+                  ignore_overlaps=True, step=0.010, nats=False, profiler=None,
+                  uem_fn=None, max_degree=None, ref_turns=None, uem=None,
+                  der_components=False, on_der_error=None):
+    """Score several systems against the same reference.
+
+    Equivalent to calling ``score`` once for each system RTTM file, except
+    that the reference RTTM and UEM are parsed and the reference framed only
+    once (via ``PreparedReference``), after which each system pays only for
+    its own parsing, framing, and comparison.
+
+    Parameters
+    ----------
+    ref_rttm_fn : str
+        Path to reference RTTM file.
+
+    sys_rttm_fns : list of str
+        Paths to system RTTM files.
+
+    collar, ignore_overlaps, step, nats, profiler, uem_fn, max_degree
+        As for ``score``. If not None, ``profiler`` also records the
+        "prepare" stage, in which the reference is framed.
+
+    der_components, on_der_error
+        As for ``score``.
+
+    ref_turns : dict, optional
+        Mapping from recording ids to reference speaker turns. If not None,
+        used instead of parsing ``ref_rttm_fn``, which is still used to
+        compute DER.
+        (Default: None)
+
+    uem : dict, optional
+        Mapping from recording ids to scoring regions. If not None, used
+        instead of parsing ``uem_fn``, which is still used to compute DER.
+        (Default: None)
+
+    Returns
+    -------
+    results : list of tuple
+        For each system, the metrics returned by ``score``.
+    """
+    profiler = get_profiler(profiler)
+    with profiler.stage('parse'):
+        ref_rec_id_to_turns = ref_turns
+        if ref_rec_id_to_turns is None:
+            ref_rec_id_to_turns = rttm_to_turns(ref_rttm_fn)
+        rec_id_to_uem = uem
+        if rec_id_to_uem is None and uem_fn is not None:
+            rec_id_to_uem = load_uem(uem_fn)
+    with profiler.stage('prepare'):
+        reference = PreparedReference(
+            ref_rec_id_to_turns, collar, ignore_overlaps, step, rec_id_to_uem)
+    results = []
+    for sys_rttm_fn in sys_rttm_fns:
+        with profiler.stage('der'):
+            try:
+                der_result = metrics.mdeval(
+                    ref_rttm_fn, sys_rttm_fn, collar, ignore_overlaps,
+                    uem_fn).overall
+            except metrics.MDEvalError as e:
+                if on_der_error is None:
+                    raise
+                on_der_error(sys_rttm_fn, e)
+                der_result = metrics.MDEvalResult(
+                    *[np.nan]*len(metrics.MDEVAL_FIELDS))
+        with profiler.stage('parse'):
+            sys_rec_id_to_turns = rttm_to_turns(sys_rttm_fn)
+        result = reference._score(
+            sys_rec_id_to_turns, nats, profiler, max_degree, der_result.der)
+        if der_components:
+            result = result + (der_result, )
+        results.append(result)
+    return results
+
+
+def score_turns(ref_turns, sys_turns, collar=0.250, ignore_overlaps=True,
+                step=0.010, nats=False, profiler=None, uem=None,
+                max_degree=None):
+    """Score in-memory diarization.
+
+    Equivalent to ``score``, but takes speaker turns rather than paths to RTTM
+    files and computes DER in-process via ``frame_der`` rather than by calling
+    ``md-eval.pl``. Nothing is written to disk and no subprocesses are
+    spawned, so this is suitable for use in tight evaluation loops.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording. Turns may be lists of ``Turn`` instances or
+        sequences of (onset, offset, speaker_id) triples.
+
+    sys_turns : dict or list
+        System diarization in same format as ``ref_turns``.
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Diarization output will not be
+        evaluated within +/- ``collar`` seconds of reference speaker
+        boundaries. Only relevant for computing DER.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking. Only relevant for computing DER.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    nats : bool, optional
+        If True, use nats as unit for information theoretic metrics.
+        Otherwise, use bits.
+        (Default: False)
+
+    profiler : scorelib.profiling.Profiler, optional
+        If not None, time and memory usage of each stage of scoring ("der",
+        "frames", "contingency", and "metrics") are recorded to this
+        profiler.
+        (Default: None)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording as (onset, offset) pairs in seconds. If None, each
+        recording is scored as in ``score`` without a UEM.
+        (Default: None)
+
+    max_degree : int, optional
+        If not None, additionally break down metrics by overlap degree as
+        described in ``score``.
+        (Default: None)
+
+    Returns
+    -------
+    metrics : tuple
+        Same metrics, in the same order, as returned by ``score``.
+    """
+    profiler = get_profiler(profiler)
+    with profiler.stage('prepare'):
+        reference = PreparedReference(
+            ref_turns, collar, ignore_overlaps, step, uem)
+    return reference.score(sys_turns, nats, profiler, max_degree)
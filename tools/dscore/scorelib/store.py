@@ -0,0 +1,205 @@
+"""Storage of parsed reference diarization for sharing between processes."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import os
+
+import numpy as np
+
+from .score import load_uem, rttm_to_turns, Turn
+
+__all__ = ['ReferenceStore']
+
+
+def _parse_reference(args):
+    """Return turns of RTTM file as (rec_ids, speaker_ids, onsets, offsets,
+    confidences) lists, with missing confidences as NaN.
+    """
+    rttm_fn, enc = args
+    rec_id_to_turns = rttm_to_turns(rttm_fn, enc)
+    fields = ([], [], [], [], [])
+    for rec_id in sorted(rec_id_to_turns):
+        for turn in rec_id_to_turns[rec_id]:
+            confidence = turn.confidence
+            if confidence is None:
+                confidence = np.nan
+            for field, val in zip(fields, (rec_id, turn.speaker_id,
+                                           turn.onset, turn.offset,
+                                           confidence)):
+                field.append(val)
+    return fields
+
+
+class ReferenceStore(object):
+    """Parsed reference turns and scoring regions in memory-mapped arrays.
+
+    The store is created once (by ``ReferenceStore.create``) as a directory of
+    ``.npy`` files holding the turns of every reference RTTM file, as flat
+    arrays of onsets, offsets, confidences, and indices into tables of
+    recording and speaker ids, and the scoring regions of a UEM file. Each
+    process then attaches to the store by opening these files as memory
+    maps, so that the arrays are shared between processes via the page cache
+    rather than copied, and no file is parsed more than once regardless of
+    the number of processes.
+
+    Only the flat arrays are shared. ``turns`` builds new ``Turn`` instances
+    for a single file each time it is called, at a cost proportional to the
+    number of turns of that file, while the scoring regions returned by
+    ``uem`` are views of the memory maps.
+
+    Parameters
+    ----------
+    dirname : str
+        Path to store directory.
+    """
+    def __init__(self, dirname):
+        self.dirname = dirname
+        def load(name):
+            return np.load(os.path.join(dirname, name + '.npy'),
+                           mmap_mode='r')
+        self._fids = load('fids')
+        self._fid_bounds = load('fid_bounds')
+        self._rec_ids = load('rec_ids')
+        self._speaker_ids = load('speaker_ids')
+        self._turn_rec_inds = load('turn_rec_inds')
+        self._turn_speaker_inds = load('turn_speaker_inds')
+        self._onsets = load('onsets')
+        self._offsets = load('offsets')
+        self._confidences = load('confidences')
+        self._uem_rec_ids = load('uem_rec_ids')
+        self._uem_bounds = load('uem_bounds')
+        self._uem_regions = load('uem_regions')
+        self._fid_to_ind = dict(
+            (fid, ii) for ii, fid in enumerate(self._fids.tolist()))
+        self._rec_id_to_uem = None
+
+    @classmethod
+    def create(cls, dirname, fid_to_rttm_fn, uem_fn=None, enc='utf-8',
+               pool=None):
+        """Parse reference RTTM files and UEM into new store.
+
+        Parameters
+        ----------
+        dirname : str
+            Path to store directory, which is created if it does not exist.
+
+        fid_to_rttm_fn : dict
+            Mapping from file ids to paths to reference RTTM files.
+
+        uem_fn : str, optional
+            Path to UEM file.
+            (Default: None)
+
+        enc : str, optional
+            Encoding of RTTM and UEM files.
+            (Default: 'utf-8')
+
+        pool : multiprocessing.Pool, optional
+            If not None, RTTM files are parsed in parallel by the workers of
+            this pool.
+            (Default: None)
+
+        Returns
+        -------
+        store : ReferenceStore
+            Store attached to ``dirname``.
+        """
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        fids = sorted(fid_to_rttm_fn)
+        fid_bounds = [0]
+        rec_ids = []
+        rec_id_to_ind = {}
+        speaker_id_to_ind = {}
+        turn_rec_inds = []
+        turn_speaker_inds = []
+        onsets = []
+        offsets = []
+        confidences = []
+        args = [(fid_to_rttm_fn[fid], enc) for fid in fids]
+        if pool is None:
+            parsed = map(_parse_reference, args)
+        else:
+            parsed = pool.imap(_parse_reference, args)
+        for (turn_rec_ids, turn_speaker_ids, turn_onsets, turn_offsets,
+             turn_confidences) in parsed:
+            for rec_id in turn_rec_ids:
+                if rec_id not in rec_id_to_ind:
+                    rec_id_to_ind[rec_id] = len(rec_ids)
+                    rec_ids.append(rec_id)
+                turn_rec_inds.append(rec_id_to_ind[rec_id])
+            for speaker_id in turn_speaker_ids:
+                turn_speaker_inds.append(speaker_id_to_ind.setdefault(
+                    speaker_id, len(speaker_id_to_ind)))
+            onsets.extend(turn_onsets)
+            offsets.extend(turn_offsets)
+            confidences.extend(turn_confidences)
+            fid_bounds.append(len(onsets))
+        speaker_ids = sorted(speaker_id_to_ind,
+                             key=lambda speaker_id:
+                             speaker_id_to_ind[speaker_id])
+        rec_id_to_uem = {} if uem_fn is None else load_uem(uem_fn, enc)
+        uem_rec_ids = sorted(rec_id_to_uem)
+        uem_bounds = np.cumsum(
+            [0] + [len(rec_id_to_uem[rec_id]) for rec_id in uem_rec_ids])
+        uem_regions = np.zeros((0, 2), dtype='float64')
+        if uem_rec_ids:
+            uem_regions = np.concatenate(
+                [rec_id_to_uem[rec_id] for rec_id in uem_rec_ids])
+        def save(name, vals, dtype=None):
+            np.save(os.path.join(dirname, name + '.npy'),
+                    np.asarray(vals, dtype=dtype))
+        save('fids', fids, 'U')
+        save('fid_bounds', fid_bounds, 'int64')
+        save('rec_ids', rec_ids, 'U')
+        save('speaker_ids', speaker_ids, 'U')
+        save('turn_rec_inds', turn_rec_inds, 'int64')
+        save('turn_speaker_inds', turn_speaker_inds, 'int64')
+        save('onsets', onsets, 'float64')
+        save('offsets', offsets, 'float64')
+        save('confidences', confidences, 'float64')
+        save('uem_rec_ids', uem_rec_ids, 'U')
+        save('uem_bounds', uem_bounds, 'int64')
+        save('uem_regions', uem_regions, 'float64')
+        return cls(dirname)
+
+    def __contains__(self, fid):
+        return fid in self._fid_to_ind
+
+    def turns(self, fid):
+        """Return mapping from recording ids to reference turns of file
+        ``fid``, as returned by ``rttm_to_turns``.
+
+        The turns are built anew on each call.
+        """
+        ii = self._fid_to_ind[fid]
+        bi, ei = self._fid_bounds[ii:ii + 2]
+        rec_ids = self._rec_ids[self._turn_rec_inds[bi:ei]].tolist()
+        speaker_ids = self._speaker_ids[
+            self._turn_speaker_inds[bi:ei]].tolist()
+        rec_id_to_turns = {}
+        for rec_id, speaker_id, onset, offset, confidence in zip(
+                rec_ids, speaker_ids, self._onsets[bi:ei].tolist(),
+                self._offsets[bi:ei].tolist(),
+                self._confidences[bi:ei].tolist()):
+            if np.isnan(confidence):
+                confidence = None
+            rec_id_to_turns.setdefault(rec_id, []).append(
+                Turn(speaker_id, onset, offset, confidence))
+        return rec_id_to_turns
+
+    def uem(self):
+        """Return mapping from recording ids to scoring regions, as returned
+        by ``load_uem``, or None if the store has no UEM.
+
+        The scoring regions are views of the memory-mapped arrays.
+        """
+        if self._uem_rec_ids.size == 0:
+            return None
+        if self._rec_id_to_uem is None:
+            self._rec_id_to_uem = {}
+            for ii, rec_id in enumerate(self._uem_rec_ids.tolist()):
+                bi, ei = self._uem_bounds[ii:ii + 2]
+                self._rec_id_to_uem[rec_id] = self._uem_regions[bi:ei]
+        return self._rec_id_to_uem
@@ -0,0 +1,315 @@
+"""Functions for scoring hyperparameter sweeps of diarization systems."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import io
+import json
+import os
+import re
+import warnings
+
+import numpy as np
+
+from .dataframe import _to_python
+from .logging import getLogger
+
+__all__ = ['discover_systems', 'leaderboard', 'parse_pattern', 'SweepJournal',
+           'HIGHER_IS_BETTER']
+
+
+# Suffixes of names of metrics for which higher values are better. Metrics
+# not matching any of these are ranked in increasing order.
+HIGHER_IS_BETTER = ['Accuracy', 'Detection', 'F1', 'MI', 'Precision',
+                    'Recall', 'TauRefSys', 'TauSysRef']
+
+PLACEHOLDER_REO = re.compile(r'{(\w+)}')
+
+# Named, so that importing this module does not configure the root logger;
+# messages propagate to whatever handlers the calling tool has set up.
+logger = getLogger(__name__)
+
+
+def parse_pattern(pattern):
+    """Return regular expression and parameter names of path pattern.
+
+    A path pattern is a path relative to the sweep root in which each
+    parameter is replaced by its name within braces. For instance, the
+    pattern
+
+        nc{NClusters}/thr{Threshold}
+
+    matches the directory ``nc4/thr0.5``, assigning parameter "NClusters" the
+    value 4 and "Threshold" the value 0.5. Paths use ``/`` as the separator
+    regardless of platform, and each parameter matches within a single path
+    component.
+
+    Parameters
+    ----------
+    pattern : str
+        Path pattern.
+
+    Returns
+    -------
+    regex : re.Pattern
+        Compiled regular expression matching the whole relative path.
+
+    param_names : list of str
+        Names of parameters, in the order they appear in ``pattern``.
+    """
+    param_names = []
+    parts = []
+    pos = 0
+    for match in PLACEHOLDER_REO.finditer(pattern):
+        param_name = match.group(1)
+        if param_name in param_names:
+            raise ValueError(
+                'Parameter "%s" occurs more than once in pattern "%s".' %
+                (param_name, pattern))
+        param_names.append(param_name)
+        parts.append(re.escape(pattern[pos:match.start()]))
+        parts.append('(?P<%s>[^/]+?)' % param_name)
+        pos = match.end()
+    parts.append(re.escape(pattern[pos:]))
+    return re.compile('^' + ''.join(parts) + '$'), param_names
+
+
+def _parse_value(val):
+    """Convert parameter value to int or float where possible."""
+    for type_ in (int, float):
+        try:
+            return type_(val)
+        except ValueError:
+            pass
+    return val
+
+
+def discover_systems(root, pattern=None):
+    """Return systems found under sweep root.
+
+    Every directory under ``root`` (including ``root`` itself) that contains
+    at least one ``.rttm`` file is taken to hold the output of one system,
+    which is named by its path relative to ``root``.
+
+    Parameters
+    ----------
+    root : str
+        Sweep root directory.
+
+    pattern : str, optional
+        Path pattern (see ``parse_pattern``) from which parameters of each
+        system are parsed. Directories whose relative paths do not match are
+        skipped. If None, all directories are kept and no parameters parsed.
+        (Default: None)
+
+    Returns
+    -------
+    systems : list of tuple
+        List of (name, directory, params) triples, sorted by name, where
+        ``params`` is a list of parameter values in the order given by
+        ``param_names``.
+
+    param_names : list of str
+        Names of parameters.
+    """
+    regex, param_names = None, []
+    if pattern is not None:
+        regex, param_names = parse_pattern(pattern)
+    systems = []
+    for dirpath, dirnames, fns in os.walk(root):
+        dirnames.sort()
+        if not any(fn.endswith('.rttm') for fn in fns):
+            continue
+        name = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        params = []
+        if regex is not None:
+            match = regex.match(name)
+            if match is None:
+                continue
+            params = [_parse_value(match.group(param_name))
+                      for param_name in param_names]
+        systems.append((name, dirpath, params))
+    systems.sort(key=lambda system: system[0])
+    return systems, param_names
+
+
+class SweepJournal(object):
+    """Append-only record of scored rows, from which an interrupted sweep is
+    resumed.
+
+    The journal is a JSON Lines file whose first line records the settings
+    of the sweep and each subsequent line one row of scores. Rows are flushed
+    to disk as they are appended, so that at most the rows being written
+    when a sweep is interrupted are lost. A journal whose settings differ
+    from those of the current sweep is rejected rather than resumed.
+
+    Parameters
+    ----------
+    fn : str
+        Path to journal.
+
+    settings : dict
+        Settings of the sweep; e.g., the scoring mode and collar.
+
+    Attributes
+    ----------
+    rows : list of list
+        Rows recorded by previous runs, each beginning with the system name
+        and file id.
+    """
+    def __init__(self, fn, settings):
+        self.fn = fn
+        self.settings = json.loads(json.dumps(settings))
+        self.rows = []
+        if os.path.exists(fn):
+            self._load()
+            if self._header is None:
+                # Interrupted before the settings were fully written.
+                os.remove(fn)
+        self._f = io.open(fn, 'a', encoding='utf-8')
+        if os.path.getsize(fn) == 0:
+            self._write({'settings': self.settings})
+        elif not self._ends_with_newline():
+            # Terminate partially written final line so that it does not
+            # corrupt the next row.
+            self._f.write('\n')
+
+    def _load(self):
+        self._header = None
+        with io.open(self.fn, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            self._header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return
+        if self._header.get('settings') != self.settings:
+            raise ValueError(
+                'Journal %s was written with different settings; delete it to '
+                'start the sweep afresh.' % self.fn)
+        for line in lines[1:]:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Partially written final line of an interrupted run.
+                continue
+            self.rows.append([np.nan if val is None else val for val in row])
+
+    def _ends_with_newline(self):
+        with open(self.fn, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._f.flush()
+
+    def done(self):
+        """Return set of (system name, file id) pairs already scored."""
+        return set((row[0], row[1]) for row in self.rows)
+
+    def append(self, row):
+        """Record ``row``."""
+        self._write([_to_python(val) for val in row])
+
+    def close(self, remove=False):
+        """Close journal, deleting it if ``remove`` is True."""
+        self._f.close()
+        if remove:
+            os.remove(self.fn)
+
+
+def leaderboard(rows, col_names, rank_by, param_names=None, systems=None):
+    """Return leaderboard ranking systems by metric.
+
+    Parameters
+    ----------
+    rows : list of list
+        Rows of scores, each beginning with the system name and file id. If
+        a system has a row with file id "ALL" (as for metrics pooled over
+        files), its metrics are used; otherwise, metrics are averaged over
+        the system's files, ignoring NaNs.
+
+    col_names : list of str
+        Names of the columns of ``rows``.
+
+    rank_by : str
+        Name of the column by which systems are ranked. Systems are ranked
+        in decreasing order if the name ends with any of
+        ``HIGHER_IS_BETTER`` and in increasing order otherwise, with NaNs
+        ranked last. As metrics averaged over different files are not
+        comparable, systems missing any of the files scored for other
+        systems (e.g., those of a partially completed sweep) are ranked
+        after all complete systems, and a warning is logged.
+
+    param_names : list of str, optional
+        Names of parameter columns to output after the system name.
+        (Default: None)
+
+    systems : list of tuple, optional
+        (name, directory, params) triples as returned by
+        ``discover_systems``, from which parameter values are taken.
+        (Default: None)
+
+    Returns
+    -------
+    board_rows : list of list
+        One row per system, in order of rank, containing the rank, system
+        name, parameter values, number of files scored, and metrics.
+
+    board_col_names : list of str
+        Names of the columns of ``board_rows``.
+    """
+    param_names = param_names or []
+    name_to_params = {}
+    for name, _, params in systems or []:
+        name_to_params[name] = params
+    metric_col_names = col_names[2:]
+    if rank_by not in metric_col_names:
+        raise ValueError('Unknown metric "%s".' % rank_by)
+    name_to_metrics = {}
+    name_to_pooled = {}
+    name_to_fids = {}
+    for row in rows:
+        name, fid = row[0], row[1]
+        if fid == 'ALL':
+            name_to_pooled[name] = row[2:]
+        else:
+            name_to_metrics.setdefault(name, []).append(row[2:])
+            name_to_fids.setdefault(name, set()).add(fid)
+    names = sorted(set(name_to_metrics) | set(name_to_pooled))
+    all_fids = set().union(*name_to_fids.values())
+    incomplete = set(name for name in names
+                     if name_to_fids.get(name, set()) != all_fids)
+    if incomplete:
+        logger.warning(
+            '%d of %d systems were not scored on all %d files and are ranked '
+            'after the complete systems: %s' % (
+                len(incomplete), len(names), len(all_fids),
+                ', '.join(sorted(incomplete))))
+    board_rows = []
+    for name in names:
+        n_files = len(name_to_metrics.get(name, []))
+        if name in name_to_pooled:
+            vals = list(name_to_pooled[name])
+        else:
+            with warnings.catch_warnings():
+                # Metrics that are NaN for every file remain NaN.
+                warnings.simplefilter('ignore', RuntimeWarning)
+                vals = list(np.nanmean(np.array(
+                    name_to_metrics[name], dtype='float64'), axis=0))
+        board_rows.append(
+            [name] + list(name_to_params.get(name, [np.nan]*len(param_names)))
+            + [n_files] + vals)
+    sign = 1
+    if any(rank_by.endswith(suffix) for suffix in HIGHER_IS_BETTER):
+        sign = -1
+    rank_ind = len(param_names) + 2 + metric_col_names.index(rank_by)
+    def key(row):
+        val = float(row[rank_ind])
+        return (row[0] in incomplete, np.isnan(val),
+                sign*val if not np.isnan(val) else 0)
+    board_rows.sort(key=key)
+    board_rows = [[rank + 1] + row for rank, row in enumerate(board_rows)]
+    board_col_names = (['Rank', 'System'] + param_names + ['NFiles'] +
+                       metric_col_names)
+    return board_rows, board_col_names
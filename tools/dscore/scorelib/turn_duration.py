@@ -0,0 +1,218 @@
+"""Functions for scoring diarization stratified by reference turn duration."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from . import metrics
+from .score import (_as_rec_id_to_turns, _ticks_to_frames, _turn_arrays,
+                    _turn_ticks, load_uem, rttm_to_turns, PreparedReference)
+
+__all__ = ['score_turn_durations', 'turn_duration_components',
+           'turn_duration_metrics', 'turn_errors', 'BIN_EDGES']
+
+
+# Default edges (in seconds) of reference turn duration bins.
+BIN_EDGES = [0.5, 1.0, 2.0, 5.0]
+
+
+def _cumsum0(x):
+    """Return cumulative sum along first axis with a leading row of zeros."""
+    return np.concatenate([np.zeros((1, ) + x.shape[1:]), np.cumsum(x, 0)])
+
+
+def turn_errors(rec, sys_X, ref_turns, step=0.010):
+    """Return errors on each reference turn of one recording in frames.
+
+    Errors are first determined per (frame, reference speaker) pair. A
+    reference speaker is correct at a frame if the system speaker it is
+    mapped to is also present. Otherwise, the frame's missed and confused
+    speaker counts (as in ``metrics.frame_errors``) are divided evenly among
+    its incorrect reference speakers, so that summing over turns recovers the
+    totals used in computing DER (except where turns of the same speaker
+    overlap, in which case the shared frames count towards each). The errors
+    of each turn are then read off of cumulative sums over frames, so that
+    each turn costs two lookups regardless of its length.
+
+    Parameters
+    ----------
+    rec : dict
+        Prepared reference recording (an entry of
+        ``PreparedReference.recordings``).
+
+    sys_X : ndarray, (n_frames, n_sys_speakers)
+        System speaker activity on the frames of ``rec``.
+
+    ref_turns : list of Turn
+        Reference speaker turns from which ``rec`` was prepared.
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    Returns
+    -------
+    durs : ndarray, (n_turns,)
+        Turn durations in seconds.
+
+    n_scored : ndarray, (n_turns,)
+        Scored frames of each turn.
+
+    n_miss : ndarray, (n_turns,)
+        Missed frames of each turn.
+
+    n_conf : ndarray, (n_turns,)
+        Confused frames of each turn.
+
+    n_correct : ndarray, (n_turns,)
+        Frames of each turn on which the mapped system speaker is present.
+    """
+    ref_X = rec['X']
+    scored = rec['scored']
+    n_frames = ref_X.shape[0]
+    ref_inds, sys_inds = metrics.speaker_mapping(
+        ref_X[scored], sys_X[scored])
+    correct = np.zeros_like(ref_X)
+    correct[:, ref_inds] = ref_X[:, ref_inds] & sys_X[:, sys_inds]
+    correct &= scored[:, None]
+    incorrect = ref_X & ~correct & scored[:, None]
+    n_ref = ref_X.sum(axis=1)
+    n_sys = sys_X.sum(axis=1)
+    n_correct = correct.sum(axis=1)
+    n_incorrect = np.maximum(n_ref - n_correct, 1)
+    miss_share = np.maximum(n_ref - n_sys, 0) / n_incorrect
+    conf_share = (np.minimum(n_ref, n_sys) - n_correct) / n_incorrect
+
+    onsets, offsets, speaker_ids = _turn_arrays(ref_turns)
+    _, speaker_inds = np.unique(speaker_ids, return_inverse=True)
+    onset_ticks, offset_ticks = _turn_ticks(ref_turns)
+    bis = _ticks_to_frames(onset_ticks, n_frames, step)
+    eis = _ticks_to_frames(offset_ticks, n_frames, step)
+    def turn_sums(x):
+        cs = _cumsum0(x)
+        return cs[eis, speaker_inds] - cs[bis, speaker_inds]
+    return (offsets - onsets,
+            turn_sums(ref_X & scored[:, None]),
+            turn_sums(incorrect*miss_share[:, None]),
+            turn_sums(incorrect*conf_share[:, None]),
+            turn_sums(correct))
+
+
+def turn_duration_components(ref_turns, sys_turns, bin_edges=None,
+                             collar=0.0, ignore_overlaps=False, step=0.010,
+                             uem=None, min_coverage=0.5):
+    """Return frame counts needed to compute turn duration metrics.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    sys_turns : dict or list
+        System diarization in same format as ``ref_turns``. Recordings
+        missing from the system are scored as entirely missed.
+
+    bin_edges : list of float, optional
+        Increasing edges in seconds of turn duration bins. Bin ``i`` contains
+        turns whose durations ``d`` satisfy
+        ``bin_edges[i-1] <= d < bin_edges[i]``, with the first and last bins
+        unbounded below and above. If None, ``BIN_EDGES``.
+        (Default: None)
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Note that collars discard
+        all of any turn shorter than twice their size.
+        (Default: 0.0)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking.
+        (Default: False)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording.
+        (Default: None)
+
+    min_coverage : float, optional
+        A turn is counted as detected if its mapped system speaker is present
+        for at least this proportion of its scored frames.
+        (Default: 0.5)
+
+    Returns
+    -------
+    counts : ndarray, (5, n_bins)
+        For each bin, the number of turns with scored frames, the number of
+        scored frames, the number of missed and confused frames, and the
+        number of detected turns.
+    """
+    if bin_edges is None:
+        bin_edges = BIN_EDGES
+    n_bins = len(bin_edges) + 1
+    reference = PreparedReference(
+        ref_turns, collar, ignore_overlaps, step, uem)
+    sys_rec_id_to_turns = _as_rec_id_to_turns(sys_turns)
+    sys_rec_id_to_X = reference._sys_rec_id_to_X(sys_rec_id_to_turns)
+    counts = np.zeros((5, n_bins))
+    for rec_id in reference.rec_ids:
+        durs, n_scored, n_miss, n_conf, n_correct = turn_errors(
+            reference.recordings[rec_id], sys_rec_id_to_X[rec_id],
+            reference.rec_id_to_turns[rec_id], step)
+        is_scored = n_scored > 0
+        is_detected = n_correct >= min_coverage*n_scored
+        bins = np.digitize(durs[is_scored], bin_edges)
+        for ii, x in enumerate([
+                np.ones(bins.size), n_scored[is_scored], n_miss[is_scored],
+                n_conf[is_scored], is_detected[is_scored]]):
+            counts[ii] += np.bincount(bins, x, minlength=n_bins)
+    return counts
+
+
+def _metrics_from_counts(counts, step=0.010):
+    n_turns, n_scored, n_miss, n_conf, n_detected = counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return list(zip(n_turns.astype('int64'), step*n_scored,
+                        100.*n_miss / n_scored, 100.*n_conf / n_scored,
+                        100.*n_detected / n_turns))
+
+
+def turn_duration_metrics(ref_turns, sys_turns, bin_edges=None, collar=0.0,
+                          ignore_overlaps=False, step=0.010, uem=None,
+                          min_coverage=0.5):
+    """Return metrics for reference turns binned by duration.
+
+    Takes the same arguments as ``turn_duration_components``.
+
+    Returns
+    -------
+    bin_metrics : list of tuple
+        For each bin, a tuple containing the number of scored turns, the
+        scored reference speaker time in seconds, the percent of this time
+        missed and confused, and the percent of turns detected.
+    """
+    return _metrics_from_counts(turn_duration_components(
+        ref_turns, sys_turns, bin_edges, collar, ignore_overlaps, step, uem,
+        min_coverage), step)
+
+
+def score_turn_durations(ref_rttm_fn, sys_rttm_fn, bin_edges=None,
+                         collar=0.0, ignore_overlaps=False, step=0.010,
+                         uem_fn=None, min_coverage=0.5):
+    """Score RTTM files by reference turn duration.
+
+    Equivalent to ``turn_duration_metrics``, but takes paths to reference and
+    system RTTM files and, optionally, a UEM file.
+    """
+    rec_id_to_uem = None if uem_fn is None else load_uem(uem_fn)
+    return turn_duration_metrics(
+        rttm_to_turns(ref_rttm_fn), rttm_to_turns(sys_rttm_fn), bin_edges,
+        collar, ignore_overlaps, step, rec_id_to_uem, min_coverage)
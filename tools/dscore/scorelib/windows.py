@@ -0,0 +1,232 @@
+"""Functions for computing time-resolved metrics over sliding windows."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from . import metrics
+from .score import _activity_to_labels, _as_rec_id_to_turns, PreparedReference
+
+__all__ = ['sliding_window_metrics', 'window_bounds', 'WINDOW_FIELDS']
+
+
+# Fields of the structured arrays returned by ``sliding_window_metrics``.
+WINDOW_FIELDS = ['onset', 'offset', 'ref_time', 'miss', 'fa', 'confusion',
+                 'der', 'b3_precision', 'b3_recall', 'b3_f1', 'nmi']
+
+EPS = np.finfo(float).eps
+
+
+def window_bounds(n_frames, width, hop):
+    """Return onset and offset frame indices of sliding windows.
+
+    Windows of ``width`` frames start every ``hop`` frames until the end of
+    the recording, the last windows being truncated at ``n_frames``.
+    """
+    starts = np.arange(0, max(n_frames, 1), hop)
+    ends = np.minimum(starts + width, n_frames)
+    return starts, ends
+
+
+class _WindowSummer(object):
+    """Sums per-frame statistics over windows.
+
+    The window boundaries cut the frames into segments. Per-frame statistics
+    are summed within segments in a single pass and then accumulated, so that
+    the sum over any window is the difference of two cumulative sums and
+    costs O(1) regardless of its width.
+    """
+    def __init__(self, starts, ends, n_frames):
+        self.cuts = np.unique(np.concatenate([starts, ends, [0, n_frames]]))
+        self.n_segs = self.cuts.size - 1
+        self.seg_inds = np.searchsorted(
+            self.cuts, np.arange(n_frames), side='right') - 1
+        self.start_inds = np.searchsorted(self.cuts, starts)
+        self.end_inds = np.searchsorted(self.cuts, ends)
+
+    def _window_sums(self, seg_sums):
+        cum = np.concatenate(
+            [np.zeros((1, ) + seg_sums.shape[1:]), np.cumsum(seg_sums, 0)])
+        return cum[self.end_inds] - cum[self.start_inds]
+
+    def sum(self, x, mask=None):
+        """Return sum of per-frame values ``x`` over each window."""
+        seg_inds = self.seg_inds
+        if mask is not None:
+            seg_inds = seg_inds[mask]
+            x = x[mask]
+        return self._window_sums(
+            np.bincount(seg_inds, x, minlength=self.n_segs))
+
+    def count(self, inds, n_inds, mask=None):
+        """Return counts of each of ``n_inds`` per-frame indices ``inds`` over
+        each window as an array of shape (n_windows, n_inds).
+        """
+        seg_inds = self.seg_inds
+        if mask is not None:
+            seg_inds = seg_inds[mask]
+            inds = inds[mask]
+        counts = np.bincount(seg_inds*n_inds + inds,
+                             minlength=self.n_segs*n_inds)
+        return self._window_sums(counts.reshape(self.n_segs, n_inds))
+
+
+def _windowed_clustering_metrics(summer, ref_labels, sys_labels, mask=None,
+                                 nats=False):
+    """Return B-cubed precision, recall, F1, and NMI for each window.
+
+    Rather than building a contingency matrix per window, co-occurrence
+    counts of each (reference label, system label) pair present in the
+    recording are summed over windows, and the metrics are computed from
+    these for all windows at once.
+    """
+    log = np.log if nats else np.log2
+    ref_classes, ref_inds = np.unique(ref_labels, return_inverse=True)
+    sys_classes, sys_inds = np.unique(sys_labels, return_inverse=True)
+    pairs, pair_inds = np.unique(
+        ref_inds*sys_classes.size + sys_inds, return_inverse=True)
+    pair_ref_inds = pairs // sys_classes.size
+    pair_sys_inds = pairs % sys_classes.size
+
+    # Contingency counts of each pair and marginals of its ref/sys labels.
+    cm = summer.count(pair_inds, pairs.size, mask)
+    ref_marginals = cm.dot(np.eye(ref_classes.size)[pair_ref_inds])
+    sys_marginals = cm.dot(np.eye(sys_classes.size)[pair_sys_inds])
+    N = cm.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nz = cm > 0
+        precision = np.where(
+            nz, cm**2 / sys_marginals[:, pair_sys_inds], 0).sum(1) / N
+        recall = np.where(
+            nz, cm**2 / ref_marginals[:, pair_ref_inds], 0).sum(1) / N
+        f1 = 2*(precision*recall)/(precision + recall)
+        outer = (ref_marginals[:, pair_ref_inds] *
+                 sys_marginals[:, pair_sys_inds])
+        mi = np.where(nz, (cm / N[:, None]) * (
+            log(cm) - log(outer) + log(N[:, None])), 0).sum(1)
+        def h(marginals):
+            p = marginals / N[:, None]
+            return -np.where(p > 0, p*log(p), 0).sum(1)
+        nmi = mi / np.sqrt(h(ref_marginals)*h(sys_marginals) + EPS)
+        nmi = np.maximum(nmi, 0)  # Round-off can leave it slightly negative.
+        nmi[N == 0] = np.nan
+    return precision, recall, f1, nmi
+
+
+def sliding_window_metrics(ref_turns, sys_turns, width=60.0, hop=None,
+                           collar=0.250, ignore_overlaps=True, step=0.010,
+                           uem=None, nats=False):
+    """Return DER components and clustering metrics over sliding windows.
+
+    Each recording is divided into windows of ``width`` seconds starting
+    every ``hop`` seconds. Per-frame missed, false alarm, and confused
+    speaker counts (as for ``frame_der``) and co-occurrence counts of
+    reference and system frame labels (as for the clustering metrics) are
+    computed in a single pass over each recording, after which the
+    statistics of every window are obtained from cumulative sums at a cost
+    that does not depend on its width.
+
+    Reference and system speakers are mapped once per recording, so that
+    confusion within a window reflects the recording-level mapping rather
+    than the best mapping for that window alone.
+
+    Parameters
+    ----------
+    ref_turns : dict or list
+        Reference diarization. Either a mapping from recording ids to speaker
+        turns (as returned by ``rttm_to_turns``) or the speaker turns of a
+        single recording.
+
+    sys_turns : dict or list
+        System diarization in same format as ``ref_turns``. Recordings
+        missing from the system are scored as entirely missed.
+
+    width : float, optional
+        Window width in seconds.
+        (Default: 60.0)
+
+    hop : float, optional
+        Interval between window onsets in seconds. If None, ``width``, so
+        that windows do not overlap.
+        (Default: None)
+
+    collar : float, optional
+        Size of forgiveness collar in seconds. Only relevant for DER
+        components.
+        (Default: 0.250)
+
+    ignore_overlaps : bool, optional
+        If True, ignore regions in the reference diarization in which more
+        than one speaker is speaking. Only relevant for DER components.
+        (Default: True)
+
+    step : float, optional
+        Frame step size  in seconds.
+        (Default: 0.01)
+
+    uem : dict or ndarray, optional
+        Scoring regions. Either a mapping from recording ids to scoring
+        regions (as returned by ``load_uem``) or the scoring regions of a
+        single recording. Windows still span all time, but only frames
+        within these regions are scored.
+        (Default: None)
+
+    nats : bool, optional
+        If True, use nats as unit for NMI. Otherwise, use bits.
+        (Default: False)
+
+    Returns
+    -------
+    rec_id_to_windows : dict
+        Mapping from recording ids to structured arrays with one record per
+        window and fields ``WINDOW_FIELDS``: window onset and offset in
+        seconds, scored reference speaker time in seconds, percent missed,
+        false alarm, and confused speaker time and DER (relative to the
+        scored speaker time of the window; NaN if the window contains no
+        scored reference speech), and B-cubed precision, recall,
+        F1, and NMI computed from the frames of the window.
+    """
+    if hop is None:
+        hop = width
+    width_frames = max(int(round(width/step)), 1)
+    hop_frames = max(int(round(hop/step)), 1)
+    reference = PreparedReference(
+        ref_turns, collar, ignore_overlaps, step, uem)
+    sys_rec_id_to_X = reference._sys_rec_id_to_X(
+        _as_rec_id_to_turns(sys_turns))
+    dtype = [(field, 'float64') for field in WINDOW_FIELDS]
+    rec_id_to_windows = {}
+    for rec_id in reference.rec_ids:
+        rec = reference.recordings[rec_id]
+        ref_X = rec['X']
+        sys_X = sys_rec_id_to_X[rec_id]
+        n_frames = ref_X.shape[0]
+        starts, ends = window_bounds(n_frames, width_frames, hop_frames)
+        summer = _WindowSummer(starts, ends, n_frames)
+        windows = np.zeros(starts.size, dtype=dtype)
+        windows['onset'] = step*starts
+        windows['offset'] = step*ends
+
+        # DER components.
+        scored = rec['scored']
+        n_ref = summer.sum(ref_X.sum(axis=1), scored)
+        errors = metrics.frame_errors(ref_X[scored], sys_X[scored])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(n_ref > 0, 100. / n_ref, np.nan)
+        windows['ref_time'] = step*n_ref
+        for field, n_errors in zip(['miss', 'fa', 'confusion'], errors):
+            x = np.zeros(n_frames)
+            x[scored] = n_errors
+            windows[field] = scale*summer.sum(x)
+        windows['der'] = (
+            windows['miss'] + windows['fa'] + windows['confusion'])
+
+        # Clustering metrics.
+        (windows['b3_precision'], windows['b3_recall'], windows['b3_f1'],
+         windows['nmi']) = _windowed_clustering_metrics(
+             summer, rec['labels'], _activity_to_labels(sys_X),
+             rec['in_uem'], nats)
+        rec_id_to_windows[rec_id] = windows
+    return rec_id_to_windows
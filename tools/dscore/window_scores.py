@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Score diarization over sliding windows and write to a dataframe.
+
+To compute missed speech, false alarm speech, speaker confusion, diarization
+error rate (DER), B-cubed precision/recall/F1, and normalized mutual
+information (NMI) over 5 minute windows starting every minute for the system
+RTTM file ``sys.rttm`` relative to the gold standard RTTM ``ref.rttm`` and
+write the results to ``windows.tsv``:
+
+    python window_scores.py --width 300 --hop 60 ref.rttm sys.rttm windows.tsv
+
+This is useful for locating where within long recordings (e.g., day-long
+child-centered recordings) a system breaks down. The output dataframe
+contains one row per window of each recording, with the following columns:
+
+- FID  --  the recording id
+- Onset  --  window onset in seconds
+- Offset  --  window offset in seconds
+- RefTime  --  scored reference speaker time within the window in seconds
+- Miss  --  missed speech as a percent of RefTime
+- FA  --  false alarm speech as a percent of RefTime
+- Confusion  --  speaker confusion as a percent of RefTime
+- DER  --  diarization error rate
+- B3Precision  --  B-cubed precision
+- B3Recall  --  B-cubed recall
+- B3F1  --  B-cubed F1
+- NMI  --  normalized mutual information (bits)
+
+DER and its components are computed in-process from frames, as for
+``score_turns``, with reference and system speakers mapped once per
+recording. The remaining metrics are computed from the frame-level labelings
+of the window, without collars. All statistics are accumulated in a single
+pass over each recording, so that the cost of each window does not depend on
+its width.
+
+As with ``score.py``, the ``--collar``, ``--score_overlaps``, ``--step``, and
+``-u`` flags control scoring. The format of the output dataframe is
+determined as in ``score_batch.py``.
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import sys
+
+from scorelib import __version__ as VERSION
+from scorelib.dataframe import check_format, FORMATS
+from scorelib.logging import getLogger
+
+logger = getLogger()
+
+COL_NAMES = ['FID', 'Onset', 'Offset', 'RefTime', 'Miss', 'FA', 'Confusion',
+             'DER', 'B3Precision', 'B3Recall', 'B3F1', 'NMI']
+
+
+def iter_rows(rec_id_to_windows):
+    """Yield dataframe rows for windows returned by
+    ``scorelib.windows.sliding_window_metrics``.
+    """
+    for rec_id in sorted(rec_id_to_windows):
+        for window in rec_id_to_windows[rec_id]:
+            yield [rec_id] + list(window.tolist())
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(
+        description='Score RTTMs over sliding windows.', add_help=True,
+        usage='%(prog)s [options] ref_rttm sys_rttm outf')
+    parser.add_argument(
+        'ref_rttm', nargs=None, help='reference RTTM')
+    parser.add_argument(
+        'sys_rttm', nargs=None, help='system RTTM')
+    parser.add_argument(
+        'outf', nargs=None, help='output dataframe')
+    parser.add_argument(
+        '--width', nargs=None, default=60.0, type=float, metavar='FLOAT',
+        help='window width in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '--hop', nargs=None, default=None, type=float, metavar='FLOAT',
+        help='interval between window onsets in seconds (Default: width)')
+    parser.add_argument(
+        '--collar', nargs=None, default=0.250, type=float, metavar='FLOAT',
+        help='collar size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '--score_overlaps', action='store_false', default=True,
+        dest='ignore_overlaps',
+        help='score overlaps')
+    parser.add_argument(
+        '--step', nargs=None, default=0.010, type=float, metavar='FLOAT',
+        help='step size in seconds (Default: %(default)s)')
+    parser.add_argument(
+        '-u', '--uem', nargs=None, default=None, metavar='FILE', dest='uemf',
+        help='UEM file specifying scoring regions (Default: None)')
+    parser.add_argument(
+        '--format', nargs=None, default=None, choices=FORMATS, dest='fmt',
+        help='output format (Default: determined from extension of outf, '
+             'else tsv)')
+    parser.add_argument(
+        '--version', action='version',
+        version='%(prog)s ' + VERSION)
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    if args.width <= 0 or (args.hop is not None and args.hop <= 0):
+        parser.error('--width and --hop must be positive')
+    try:
+        check_format(args.outf, args.fmt)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+    from scorelib.dataframe import write_dataframe
+    from scorelib.score import load_uem, rttm_to_turns
+    from scorelib.windows import sliding_window_metrics
+    rec_id_to_uem = None if args.uemf is None else load_uem(args.uemf)
+    rec_id_to_windows = sliding_window_metrics(
+        rttm_to_turns(args.ref_rttm), rttm_to_turns(args.sys_rttm),
+        args.width, args.hop, args.collar, args.ignore_overlaps, args.step,
+        rec_id_to_uem)
+    write_dataframe(args.outf, COL_NAMES, iter_rows(rec_id_to_windows),
+                    args.fmt)